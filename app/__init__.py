@@ -23,6 +23,8 @@ login_manager = LoginManager()
 login_manager.login_view = 'admin.login'
 csrf = CSRFProtect()
 mail = Mail()  # new
+from .cache import response_cache
+from .ratelimit import login_throttle
 
 def encode_mongo_uri(mongo_uri):
     """
@@ -63,6 +65,27 @@ def create_app():
     app.config['UPLOAD_FOLDER'] = os.path.join(app.root_path, 'static', 'uploads')
     app.config['MAX_CONTENT_LENGTH'] = 4 * 1024 * 1024  # 4MB
 
+    # --- Response cache for public pages (memory | mongo | none) ---
+    app.config['RESPONSE_CACHE_BACKEND'] = os.getenv('RESPONSE_CACHE_BACKEND', 'memory')
+    app.config['RESPONSE_CACHE_SIZE'] = int(os.getenv('RESPONSE_CACHE_SIZE', 512))
+    app.config['RESPONSE_CACHE_TTL'] = int(os.getenv('RESPONSE_CACHE_TTL', 300))
+
+    # --- Password hashing (Werkzeug method string, e.g. scrypt:32768:8:1 or pbkdf2:sha256:600000) ---
+    app.config['PASSWORD_HASH_METHOD'] = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+
+    # --- Login/signup throttling (memory | mongo | none) ---
+    app.config['RATE_LIMIT_BACKEND'] = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+    app.config['RATE_LIMIT_MAX_KEYS'] = int(os.getenv('RATE_LIMIT_MAX_KEYS', 10000))
+    app.config['LOGIN_LIMIT_PER_IP'] = int(os.getenv('LOGIN_LIMIT_PER_IP', 20))
+    app.config['LOGIN_LIMIT_PER_USERNAME'] = int(os.getenv('LOGIN_LIMIT_PER_USERNAME', 10))
+    app.config['LOGIN_LIMIT_WINDOW'] = int(os.getenv('LOGIN_LIMIT_WINDOW', 300))
+
+    # Behind a reverse proxy (e.g. Render), trust this many X-Forwarded-For hops for the client IP
+    proxy_hops = int(os.getenv('PROXY_FIX_X_FOR', 0))
+    if proxy_hops:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_hops, x_proto=proxy_hops)
+
     # Session cookie settings to help CSRF token delivery in browsers (safe defaults)
     app.config.setdefault('SESSION_COOKIE_SAMESITE', 'Lax')
     app.config.setdefault('SESSION_COOKIE_SECURE', False)
@@ -76,6 +99,9 @@ def create_app():
     app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
     app.config['MAIL_DEFAULT_SENDER'] = os.getenv('MAIL_DEFAULT_SENDER')
 
+    # --- Outbound email via the job queue: brevo | fake (in-memory outbox) ---
+    app.config['MAIL_BACKEND'] = os.getenv('MAIL_BACKEND', 'brevo')
+
     
 
     # Initialize extensions
@@ -103,15 +129,47 @@ def create_app():
     global ME
     ME = me
 
+    # Optionally compare declared and live MongoDB indexes at startup
+    if os.getenv('CHECK_INDEXES') == "True":
+        from .indexes import index_report, print_index_report
+        try:
+            print_index_report(index_report())
+        except Exception as e:
+            print(f"⚠️  Index check failed: {e}")
+
     login_manager.init_app(app)
     csrf.init_app(app)
     mail.init_app(app)
+    response_cache.init_app(app)
+    login_throttle.init_app(app)
+
+    # Admin allow-list: parsed once here, re-read on SIGHUP
+    from . import roles
+    roles.init_app(app)
+
+    # Fails fast on an unsupported PASSWORD_HASH_METHOD
+    from . import passwords
+    passwords.init_app(app)
+
+    # <docid:...> URL segments accept both legacy integer ids and ObjectIds
+    from .ids import DocIdConverter
+    app.url_map.converters['docid'] = DocIdConverter
 
     # Register Blueprints
     from .routes import main_bp, admin_bp
     app.register_blueprint(main_bp)
     app.register_blueprint(admin_bp, url_prefix='/admin')
 
+    # Single-service hosting: run the job worker as a thread instead of scripts/run_worker.py
+    if os.getenv('JOB_WORKER_THREAD') == "True":
+        from .jobs import start_worker_thread
+        start_worker_thread(app)
+
+    # Same for periodic maintenance (featured expiry etc.) instead of scripts/run_scheduler.py
+    if os.getenv('SCHEDULER_THREAD') == "True":
+        from .scheduler import start_scheduler_thread
+        start_scheduler_thread(app)
+
     # Ensure upload folder exists
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
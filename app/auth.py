@@ -0,0 +1,75 @@
+"""
+Loading the logged-in user.
+Flask-Login calls the user_loader on every request from a logged-in user.
+The user document is fetched without `password_hash` and kept in a small
+per-process LRU cache for USER_CACHE_TTL seconds, so most authenticated
+page loads skip the database entirely. Each request still gets its own
+User instance. Saving or deleting a User drops its entry here; other
+worker processes notice at the latest when the TTL runs out.
+"""
+import os
+import threading
+import time
+
+from .cache import LRUCache
+from .ids import parse_id
+
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 1024))
+USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', 30))
+
+# Never needed to serve a request; only password checks read it
+EXCLUDED_FIELDS = {'password_hash': 0}
+
+_user_cache = LRUCache(USER_CACHE_SIZE)
+_stats_lock = threading.Lock()
+_stats = {'db_loads': 0, 'db_ms': 0.0}
+
+
+def _cache_key(user_id):
+    return str(parse_id(user_id))
+
+
+def load_user_document(user_id):
+    """
+    Return a User for the session's user id without its password hash,
+    from the cache when possible. Returns None if the user does not exist.
+    """
+    from .models import User
+
+    key = _cache_key(user_id)
+    son = _user_cache.get(key)
+    if son is None:
+        started = time.perf_counter()
+        son = User._get_collection().find_one({'_id': parse_id(user_id)}, EXCLUDED_FIELDS)
+        with _stats_lock:
+            _stats['db_loads'] += 1
+            _stats['db_ms'] += (time.perf_counter() - started) * 1000
+        if son is None:
+            return None
+        _user_cache.set(key, son, USER_CACHE_TTL)
+    # A fresh instance per request: nothing a request changes leaks into the cache
+    return User._from_son(dict(son))
+
+
+def invalidate_user(user_id):
+    _user_cache.delete(_cache_key(user_id))
+
+
+def clear_user_cache():
+    _user_cache.clear()
+
+
+def user_cache_metrics():
+    """Hit rate and database time of the user loader in this worker process."""
+    with _stats_lock:
+        db_loads, db_ms = _stats['db_loads'], _stats['db_ms']
+    hits, misses = _user_cache.hits, _user_cache.misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / (hits + misses), 3) if hits + misses else None,
+        'db_loads': db_loads,
+        'avg_db_ms': round(db_ms / db_loads, 2) if db_loads else None,
+        'entries': len(_user_cache),
+        'ttl_seconds': USER_CACHE_TTL,
+    }
@@ -0,0 +1,233 @@
+"""
+Server-side response cache for public pages.
+Entries are keyed by path, query string and auth state, and tagged with the
+data they were rendered from (e.g. `celebrity:<slug>`), so a celebrity write
+invalidates exactly the pages that showed it.
+
+Backends:
+  memory - bounded in-process LRU with TTL (default, per worker)
+  mongo  - shared across workers via a TTL collection in the app database
+  none   - caching disabled
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, g, request, session, make_response
+from flask_login import current_user
+
+# Stands in for the per-session CSRF token inside cached HTML
+CSRF_PLACEHOLDER = '__CELEBHUB_CSRF_TOKEN__'
+
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU mapping with per-entry TTL and tag index."""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # key -> (expires_at, value, tags)
+        self._tags = {}  # tag -> set of keys
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl, tags=()):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (time.monotonic() + ttl, value, tuple(tags))
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._data) > self.max_entries:
+                self._remove(next(iter(self._data)))
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def invalidate_tags(self, tags):
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._tags.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def _remove(self, key):
+        _, _, tags = self._data.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class MongoCacheBackend:
+    """Response cache shared by all workers, stored in a TTL-indexed collection."""
+
+    COLLECTION = 'response_cache'
+
+    def __init__(self):
+        self._indexed = False
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def collection(self):
+        from mongoengine.connection import get_db
+        collection = get_db()[self.COLLECTION]
+        if not self._indexed:
+            collection.create_index('expires_at', expireAfterSeconds=0)
+            collection.create_index('tags')
+            self._indexed = True
+        return collection
+
+    def get(self, key):
+        doc = self.collection.find_one({'_id': key, 'expires_at': {'$gt': datetime.utcnow()}})
+        if doc is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return doc['status'], [tuple(h) for h in doc['headers']], bytes(doc['body'])
+
+    def set(self, key, value, ttl, tags=()):
+        status, headers, body = value
+        self.collection.replace_one(
+            {'_id': key},
+            {
+                'status': status,
+                'headers': [list(h) for h in headers],
+                'body': body,
+                'tags': list(tags),
+                'expires_at': datetime.utcnow() + timedelta(seconds=ttl),
+            },
+            upsert=True,
+        )
+
+    def invalidate_tags(self, tags):
+        self.collection.delete_many({'tags': {'$in': list(tags)}})
+
+    def clear(self):
+        self.collection.delete_many({})
+
+
+class ResponseCache:
+    """Caches full GET responses of view functions decorated with `cached()`."""
+
+    def __init__(self):
+        self.backend = None
+        self.ttl = 300
+
+    def init_app(self, app):
+        app.config.setdefault('RESPONSE_CACHE_BACKEND', 'memory')
+        app.config.setdefault('RESPONSE_CACHE_SIZE', 512)
+        app.config.setdefault('RESPONSE_CACHE_TTL', 300)
+        self.ttl = int(app.config['RESPONSE_CACHE_TTL'])
+        kind = app.config['RESPONSE_CACHE_BACKEND']
+        if kind == 'mongo':
+            self.backend = MongoCacheBackend()
+        elif kind == 'memory':
+            self.backend = LRUCache(int(app.config['RESPONSE_CACHE_SIZE']))
+        else:
+            self.backend = None
+
+    def make_key(self):
+        auth = f"user:{current_user.get_id()}" if current_user.is_authenticated else 'anon'
+        return f"{request.path}?{request.query_string.decode('latin-1')}|{auth}"
+
+    def cached(self, tags=None):
+        """
+        Decorator for GET views. `tags` is a list of tags or a callable taking the
+        view's keyword arguments and returning one; `invalidate()` drops tagged pages.
+        Requests with pending flash messages and non-200 responses are never cached.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if self.backend is None or request.method not in ('GET', 'HEAD') or session.get('_flashes'):
+                    return view(*args, **kwargs)
+
+                key = self.make_key()
+                try:
+                    hit = self.backend.get(key)
+                except Exception as e:
+                    print(f"⚠️  Response cache read failed: {e}")
+                    return view(*args, **kwargs)
+                if hit is not None:
+                    return self._rebuild(hit)
+
+                response = make_response(view(*args, **kwargs))
+                response.vary.add('Cookie')
+                if response.status_code == 200 and not response.direct_passthrough:
+                    entry_tags = tags(**kwargs) if callable(tags) else (tags or [])
+                    try:
+                        self.backend.set(key, self._freeze(response), self.ttl, entry_tags)
+                    except Exception as e:
+                        print(f"⚠️  Response cache write failed: {e}")
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            return wrapper
+        return decorator
+
+    def invalidate(self, *tags):
+        if self.backend is not None and tags:
+            try:
+                self.backend.invalidate_tags(tags)
+            except Exception as e:
+                print(f"⚠️  Response cache invalidation failed: {e}")
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    @staticmethod
+    def _freeze(response):
+        body = response.get_data()
+        # Forms embed this session's CSRF token; keep a placeholder in the cache
+        token = g.get('csrf_token')
+        if token:
+            body = body.replace(token.encode(), CSRF_PLACEHOLDER.encode())
+        headers = [(k, v) for k, v in response.headers.items() if k.lower() not in ('set-cookie', 'content-length')]
+        return response.status_code, headers, body
+
+    @staticmethod
+    def _rebuild(entry):
+        status, headers, body = entry
+        if CSRF_PLACEHOLDER.encode() in body:
+            from flask_wtf.csrf import generate_csrf
+            body = body.replace(CSRF_PLACEHOLDER.encode(), generate_csrf().encode())
+        response = current_app.response_class(body, status=status, headers=headers)
+        response.headers['X-Cache'] = 'HIT'
+        # Cached pages that carry ETag/Last-Modified still answer conditional GETs with 304
+        return response.make_conditional(request)
+
+
+response_cache = ResponseCache()
+
+
+def cache_tags_for(obj):
+    """Tags of the cached pages a pending write to `obj` affects (call before saving)."""
+    tags_fn = getattr(obj, 'cache_tags', None)
+    return tags_fn() if callable(tags_fn) else []
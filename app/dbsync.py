@@ -0,0 +1,153 @@
+"""
+One-way incremental sync of a MongoDB database (e.g. local) to another (e.g. Atlas).
+Source collections are streamed in batches and every document is hashed.
+The hashes pushed by the previous run are kept in a state collection in the
+*source* database, so a run only writes what changed:
+  - new or changed documents  -> ReplaceOne(upsert) on the target
+  - documents gone from source -> DeleteOne on the target
+all as unordered bulk_writes. Reading is local; traffic to the target is
+proportional to the change volume. Documents written directly on the target
+are left alone unless full=True, which also deletes target documents that
+are missing from the source.
+
+Credentials come from the environment (or instance/.env):
+  SYNC_SOURCE_URI   source server (default mongodb://localhost:27017/)
+  SYNC_TARGET_URI   target server (default MONGO_URI)
+  SYNC_SOURCE_DB / SYNC_TARGET_DB   database names (default: the one in each URI)
+"""
+import hashlib
+import os
+import re
+from collections import Counter
+
+import bson
+from pymongo import MongoClient, ReplaceOne, DeleteOne, UpdateOne
+
+STATE_COLLECTION = 'sync_state'
+DEFAULT_BATCH_SIZE = 500
+
+
+def target_key(target_uri, db_name):
+    """Identifies a target in the state collection, so one source can feed several targets."""
+    address = re.sub(r'//[^@/]*@', '//', target_uri).split('?')[0].rstrip('/')
+    return hashlib.sha256(f"{address}|{db_name}".encode()).hexdigest()[:16]
+
+
+def document_hash(doc):
+    return hashlib.sha1(bson.encode(doc)).hexdigest()
+
+
+def _state(source_db):
+    state = source_db[STATE_COLLECTION]
+    state.create_index([('t', 1), ('c', 1), ('d', 1)], unique=True, name='target_collection_doc')
+    return state
+
+
+def _batches(cursor, batch_size):
+    batch = []
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def sync_collection(source_db, target_db, name, key, batch_size=DEFAULT_BATCH_SIZE, dry_run=False, full=False):
+    """
+    Push the changes of one collection since the last sync to the target identified by `key`.
+    Returns: Counter with scanned, inserted, updated, unchanged and deleted
+    """
+    state = _state(source_db)
+    source, target = source_db[name], target_db[name]
+    counts = Counter()
+    seen = set()
+
+    if full and not dry_run:
+        state.delete_many({'t': key, 'c': name})
+
+    for batch in _batches(source.find({}, batch_size=batch_size).sort('_id', 1), batch_size):
+        ids = [doc['_id'] for doc in batch]
+        seen.update(ids)
+        known = {} if full else {
+            s['d']: s['h'] for s in state.find({'t': key, 'c': name, 'd': {'$in': ids}}, {'d': 1, 'h': 1})
+        }
+        writes, hashes = [], []
+        for doc in batch:
+            digest = document_hash(doc)
+            previous = known.get(doc['_id'])
+            if previous == digest:
+                counts['unchanged'] += 1
+                continue
+            counts['updated' if previous else 'inserted'] += 1
+            writes.append(ReplaceOne({'_id': doc['_id']}, doc, upsert=True))
+            hashes.append(UpdateOne({'t': key, 'c': name, 'd': doc['_id']}, {'$set': {'h': digest}}, upsert=True))
+        counts['scanned'] += len(batch)
+        if writes and not dry_run:
+            # Target first: if the run dies in between, the next one simply re-sends these
+            target.bulk_write(writes, ordered=False)
+            state.bulk_write(hashes, ordered=False)
+
+    # Deletes: documents pushed before (or present on the target, with full) that the source no longer has
+    if full:
+        stale = [doc['_id'] for doc in target.find({}, {'_id': 1}) if doc['_id'] not in seen]
+    else:
+        stale = [s['d'] for s in state.find({'t': key, 'c': name}, {'d': 1}) if s['d'] not in seen]
+    counts['deleted'] = len(stale)
+    if stale and not dry_run:
+        for start in range(0, len(stale), batch_size):
+            chunk = stale[start:start + batch_size]
+            target.bulk_write([DeleteOne({'_id': doc_id}) for doc_id in chunk], ordered=False)
+            state.delete_many({'t': key, 'c': name, 'd': {'$in': chunk}})
+    return counts
+
+
+def sync_databases(source_db, target_db, key, collections=None, batch_size=DEFAULT_BATCH_SIZE, dry_run=False,
+                   full=False, report=print):
+    """
+    Sync every collection in `collections` (default: all non-system collections of the source).
+    `key` identifies the target (see target_key()).
+    Returns: {collection: Counter}
+    """
+    names = collections or sorted(
+        n for n in source_db.list_collection_names() if not n.startswith('system.') and n != STATE_COLLECTION
+    )
+    summary = {}
+    for name in names:
+        report(f"📦 {name}...")
+        summary[name] = sync_collection(source_db, target_db, name, key, batch_size, dry_run=dry_run, full=full)
+    return summary
+
+
+def connect_from_env(source_db=None, target_db=None):
+    """
+    Open the source and target databases named by the SYNC_* variables.
+    Returns: (source database, target database, target key)
+    Raises: ValueError if no target URI is configured
+    """
+    from . import encode_mongo_uri
+    source_uri = os.getenv('SYNC_SOURCE_URI', 'mongodb://localhost:27017/')
+    target_uri = os.getenv('SYNC_TARGET_URI') or os.getenv('MONGO_URI')
+    if not target_uri:
+        raise ValueError('Set SYNC_TARGET_URI (or MONGO_URI) to the target database')
+    source_client = MongoClient(encode_mongo_uri(source_uri))
+    target_client = MongoClient(encode_mongo_uri(target_uri))
+    source_name = source_db or os.getenv('SYNC_SOURCE_DB')
+    target_name = target_db or os.getenv('SYNC_TARGET_DB')
+    source = source_client[source_name] if source_name else source_client.get_default_database()
+    target = target_client[target_name] if target_name else target_client.get_default_database()
+    return source, target, target_key(target_uri, target.name)
+
+
+def print_summary(summary, dry_run=False):
+    total = Counter()
+    for name, counts in summary.items():
+        total.update(counts)
+        print(
+            f"  {name:<28} {counts['inserted']:>6} new  {counts['updated']:>6} changed  "
+            f"{counts['deleted']:>6} deleted  {counts['unchanged']:>7} unchanged"
+        )
+    changes = total['inserted'] + total['updated'] + total['deleted']
+    outcome = 'to apply (dry run, nothing written)' if dry_run else 'applied'
+    print(f"\n✨ {changes} change(s) {outcome}; {total['scanned']} documents scanned in {len(summary)} collection(s)")
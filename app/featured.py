@@ -0,0 +1,45 @@
+"""
+Featured listing expiry.
+A paid listing is featured until `featured_until`; listings featured by an
+admin without an end date never expire. Queries use active_featured() so an
+expired listing disappears at once; expire_featured_listings() then clears
+the `featured` flag in bulk so expired rows stop being scanned at all.
+"""
+from datetime import datetime
+
+from .cache import response_cache
+from .models import Celebrity
+
+
+def active_featured(queryset=None, now=None):
+    """Featured celebrities whose listing has not run out (no end date counts as active)."""
+    queryset = Celebrity.objects if queryset is None else queryset
+    # $not/$lte also matches documents without featured_until, so no $or is needed
+    return queryset.filter(featured=True, featured_until__not__lte=now or datetime.utcnow())
+
+
+def expired_featured(now=None):
+    return Celebrity.objects(featured=True, featured_until__lte=now or datetime.utcnow())
+
+
+def expire_featured_listings(now=None):
+    """
+    Un-feature every listing past `featured_until` with one update_many.
+    Bumps `version`/`updated_at` so profile ETags change, and drops the
+    cached pages that showed the listings.
+    Returns: number of listings expired
+    """
+    now = now or datetime.utcnow()
+    expired = list(expired_featured(now).scalar('id', 'slug'))
+    if not expired:
+        return 0
+    ids = [doc_id for doc_id, _ in expired]
+    # Re-check the expiry so a renewal paid in the meantime is left alone
+    count = Celebrity.objects(id__in=ids, featured=True, featured_until__lte=now).update(
+        set__featured=False,
+        set__feature_status='expired',
+        set__updated_at=now,
+        inc__version=1,
+    )
+    response_cache.invalidate('celebrity-list', *[f'celebrity:{slug}' for _, slug in expired])
+    return count
@@ -0,0 +1,173 @@
+"""
+Primary key allocation for the MongoEngine models.
+ID_STRATEGY selects how new documents get their `id`:
+  block     - hi/lo allocation: each worker reserves ID_BLOCK_SIZE ids from the
+              counter in one round trip and hands them out locally (default)
+  sequence  - mongoengine SequenceField, one counter round trip per insert
+  objectid  - native ObjectIds, no counter at all; existing integer ids stay valid
+All strategies share the `mongoengine.counters` documents, so switching between
+`sequence` and `block` needs no migration (see scripts/migrate_ids.py).
+"""
+import os
+import re
+import threading
+
+from bson import ObjectId
+from mongoengine import SequenceField
+from mongoengine.base import BaseField
+from mongoengine.connection import get_db
+from pymongo import ReturnDocument
+from werkzeug.routing import BaseConverter
+
+ID_STRATEGY = os.getenv('ID_STRATEGY', 'block')
+ID_BLOCK_SIZE = int(os.getenv('ID_BLOCK_SIZE', 50))
+
+_OBJECTID_RE = re.compile(r'^[0-9a-f]{24}$')
+
+
+def parse_id(value):
+    """
+    Convert an id taken from a URL, session or cursor to its stored type.
+    Returns: int for legacy sequence ids, ObjectId for 24-hex strings, otherwise the value unchanged
+    """
+    if isinstance(value, str):
+        if _OBJECTID_RE.match(value):
+            return ObjectId(value)
+        if value.isdigit():
+            return int(value)
+    return value
+
+
+class BlockSequenceField(SequenceField):
+    """
+    SequenceField that reserves ids in blocks (hi/lo).
+    One `$inc` of `block_size` on the shared counter reserves a contiguous range
+    for this process; inserts then take ids from memory until it runs out.
+    Ids stay unique across workers but are no longer strictly in insert order.
+    """
+
+    def __init__(self, block_size=None, *args, **kwargs):
+        self.block_size = block_size or ID_BLOCK_SIZE
+        self._lock = threading.Lock()
+        self._pid = None
+        self._next = 1
+        self._last = 0
+        super().__init__(*args, **kwargs)
+
+    def _counter(self):
+        sequence_id = f"{self.get_sequence_name()}.{self.name}"
+        return get_db(alias=self.db_alias)[self.collection_name], sequence_id
+
+    def allocate(self, count):
+        """Reserve `count` contiguous ids straight from the counter; returns a range."""
+        collection, sequence_id = self._counter()
+        counter = collection.find_one_and_update(
+            filter={"_id": sequence_id},
+            update={"$inc": {"next": count}},
+            return_document=ReturnDocument.AFTER,
+            upsert=True,
+        )
+        return range(counter["next"] - count + 1, counter["next"] + 1)
+
+    def generate(self):
+        with self._lock:
+            # A block reserved before a fork (gunicorn --preload) must not be shared
+            if self._pid != os.getpid() or self._next > self._last:
+                block = self.allocate(self.block_size)
+                self._next, self._last, self._pid = block.start, block.stop - 1, os.getpid()
+            value = self._next
+            self._next += 1
+        return self.value_decorator(value)
+
+
+class CompatObjectIdField(BaseField):
+    """
+    Primary key that generates ObjectIds for new documents while still accepting
+    the integer ids of documents created under a sequence strategy.
+    """
+
+    _auto_gen = True
+
+    def generate(self):
+        return ObjectId()
+
+    def allocate(self, count):
+        return [ObjectId() for _ in range(count)]
+
+    def __get__(self, instance, owner):
+        value = super().__get__(instance, owner)
+        if value is None and instance is not None and instance._initialised:
+            value = self.generate()
+            instance._data[self.name] = value
+            instance._mark_as_changed(self.name)
+        return value
+
+    def to_python(self, value):
+        return parse_id(value)
+
+    def to_mongo(self, value):
+        return parse_id(value)
+
+    def prepare_query_value(self, op, value):
+        if isinstance(value, (list, tuple, set)):
+            return [parse_id(v) for v in value]
+        return parse_id(value)
+
+    def validate(self, value):
+        if not isinstance(value, (int, ObjectId)) or isinstance(value, bool):
+            self.error('Id must be an ObjectId or a legacy integer id')
+
+
+def id_field(strategy=None):
+    """Primary key field for the configured ID_STRATEGY."""
+    strategy = strategy or ID_STRATEGY
+    if strategy == 'objectid':
+        return CompatObjectIdField(primary_key=True)
+    if strategy == 'sequence':
+        return SequenceField(primary_key=True)
+    return BlockSequenceField(primary_key=True)
+
+
+def allocate_ids(model, count):
+    """
+    Primary keys for `count` new documents of `model`, reserved together where the
+    strategy allows it (one counter round trip for `block`, none for `objectid`).
+    """
+    field = model._fields['id']
+    if hasattr(field, 'allocate'):
+        return list(field.allocate(count))
+    return [field.generate() for _ in range(count)]
+
+
+def sync_counter(model):
+    """
+    Raise the model's id counter to at least the largest integer id stored.
+    Needed after imports that insert explicit ids; never lowers a counter.
+    Returns: the counter value after the update, or None for ObjectId keys
+    """
+    field = model._fields['id']
+    if not isinstance(field, SequenceField):
+        return None
+    newest = model._get_collection().find_one(
+        {'_id': {'$type': 'number'}}, sort=[('_id', -1)], projection={'_id': 1}
+    )
+    collection = get_db(alias=field.db_alias)[field.collection_name]
+    counter = collection.find_one_and_update(
+        filter={"_id": f"{field.get_sequence_name()}.{field.name}"},
+        update={"$max": {"next": int(newest['_id']) if newest else 0}},
+        return_document=ReturnDocument.AFTER,
+        upsert=True,
+    )
+    return counter["next"]
+
+
+class DocIdConverter(BaseConverter):
+    """URL converter for `<docid:...>`: matches both integer and ObjectId primary keys."""
+
+    regex = r'(?:\d+|[0-9a-f]{24})'
+
+    def to_python(self, value):
+        return parse_id(value)
+
+    def to_url(self, value):
+        return str(value)
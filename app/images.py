@@ -0,0 +1,145 @@
+"""
+Upload pipeline for celebrity photos.
+An upload is decoded once, rotated upright, stripped of EXIF/metadata and
+written as a fixed set of renditions in WebP and JPEG:
+
+  <stem>-card.webp / .jpg       homepage and admin cards
+  <stem>-profile.webp / .jpg    profile header
+  <stem>-original.webp / .jpg   full size (bounded), re-encoded
+
+`photo_filename` stores the original JPEG name, so older code that builds
+/static/uploads/<photo_filename> keeps working; files uploaded before the
+pipeline existed have no renditions and are served as they are.
+Content-addressed stems (see storage.py) are served from /media/ with
+immutable cache headers.
+"""
+import os
+import re
+from functools import lru_cache
+
+from flask import current_app
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+UPLOAD_URL_PREFIX = '/static/uploads/'
+MEDIA_URL_PREFIX = '/media/'
+HASH_LENGTH = 32  # hex characters of the SHA-256 digest used as a content-addressed stem
+
+# rendition -> maximum width in pixels; aspect ratio is preserved and smaller
+# images are never upscaled, so srcset reads the real widths from the files
+RENDITIONS = {
+    'card': 480,
+    'profile': 640,
+    'original': 1600,
+}
+
+# extension -> (Pillow format, save options)
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+_PROCESSED_RE = re.compile(r'^(?P<stem>[\w.-]+)-original\.jpg$')
+_HASHED_NAME_RE = re.compile(r'^[0-9a-f]{%d}-[a-z]+\.[a-z]+$' % HASH_LENGTH)
+
+
+def rendition_name(stem, rendition, fmt):
+    return f"{stem}-{rendition}.{fmt}"
+
+
+def photo_stem(photo_filename):
+    """Return the rendition stem of a processed upload, or None for legacy files."""
+    match = _PROCESSED_RE.match(photo_filename or '')
+    return match.group('stem') if match else None
+
+
+def is_content_addressed(filename):
+    """True for rendition files named by content hash, whose bytes never change."""
+    return bool(_HASHED_NAME_RE.match(filename or ''))
+
+
+def _url_prefix(filename):
+    return MEDIA_URL_PREFIX if is_content_addressed(filename) else UPLOAD_URL_PREFIX
+
+
+def _flatten(image):
+    """Convert to RGB, compositing transparency onto white (JPEG has no alpha)."""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def process_upload(file_storage, upload_folder, stem):
+    """
+    Decode `file_storage` once and write every rendition into `upload_folder`.
+    Returns: the original JPEG filename to store in `photo_filename`
+    Raises: ValueError if the upload is not a readable image
+    """
+    try:
+        with Image.open(file_storage.stream) as source:
+            source.load()
+            image = _flatten(ImageOps.exif_transpose(source))
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise ValueError('Uploaded file is not a readable image') from e
+
+    for rendition, width in RENDITIONS.items():
+        resized = image
+        if image.width > width:
+            resized = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+        for ext, (pil_format, options) in FORMATS.items():
+            # Metadata (EXIF, GPS, ICC) is dropped because none is passed to save()
+            resized.save(os.path.join(upload_folder, rendition_name(stem, rendition, ext)), pil_format, **options)
+    return rendition_name(stem, 'original', 'jpg')
+
+
+def rendition_files(photo_filename):
+    """All files belonging to a stored photo (just the file itself for legacy uploads)."""
+    stem = photo_stem(photo_filename)
+    if not stem:
+        return [photo_filename] if photo_filename else []
+    return [rendition_name(stem, r, ext) for r in RENDITIONS for ext in FORMATS]
+
+
+def photo_rendition_url(photo_filename, rendition='original', fmt='jpg'):
+    """URL of one rendition; legacy uploads fall back to the stored file."""
+    if not photo_filename:
+        return None
+    stem = photo_stem(photo_filename)
+    if not stem:
+        return UPLOAD_URL_PREFIX + photo_filename
+    name = rendition_name(stem, rendition, fmt)
+    return _url_prefix(name) + name
+
+
+@lru_cache(maxsize=4096)
+def _cached_width(path):
+    # Raises on an unreadable file, so a failure is never cached
+    with Image.open(path) as image:
+        return image.width
+
+
+def rendition_width(path):
+    """Pixel width of a rendition file (header only), or None if it cannot be read. Rendition files never change."""
+    try:
+        return _cached_width(path)
+    except (UnidentifiedImageError, OSError):
+        return None
+
+
+def photo_srcset(photo_filename, fmt='jpg', upload_folder=None):
+    """
+    `srcset` value listing every rendition by its actual width; empty for legacy uploads.
+    Renditions that came out the same width (a small upload) are listed once.
+    """
+    stem = photo_stem(photo_filename)
+    if not stem:
+        return ''
+    upload_folder = upload_folder or current_app.config['UPLOAD_FOLDER']
+    candidates = {}
+    for rendition, target in sorted(RENDITIONS.items(), key=lambda item: item[1]):
+        name = rendition_name(stem, rendition, fmt)
+        width = rendition_width(os.path.join(upload_folder, name)) or target
+        candidates.setdefault(width, name)
+    return ', '.join(f"{_url_prefix(name)}{name} {width}w" for width, name in sorted(candidates.items()))
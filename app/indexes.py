@@ -0,0 +1,161 @@
+"""
+MongoDB index verification.
+Compares the indexes declared in the models' `meta` with the ones that exist
+on the server, reports indexes nothing uses, and explains the query behind
+every query helper in routes.py (and payments.py) so a collection scan is caught before deploy.
+"""
+import re
+from datetime import datetime
+
+from .models import Celebrity, User, CelebritySubmission, OnboardingRegistration, Job, Payment
+
+MODELS = [Celebrity, User, CelebritySubmission, OnboardingRegistration, Job, Payment]
+
+
+def ensure_all_indexes(models=MODELS):
+    """Create any declared index that does not exist yet."""
+    for model in models:
+        model.ensure_indexes()
+
+
+def _index_usage(model):
+    """Return {index name: number of operations} from $indexStats (since server start)."""
+    try:
+        stats = model._get_collection().aggregate([{'$indexStats': {}}])
+        return {s['name']: int(s.get('accesses', {}).get('ops', 0)) for s in stats}
+    except Exception:
+        # $indexStats is unavailable on some hosted tiers and on mocks
+        return {}
+
+
+def index_report(models=MODELS):
+    """
+    Compare declared and live indexes for each model.
+    Returns: list of dicts with collection, missing, extra and unused index keys
+    """
+    report = []
+    for model in models:
+        diff = model.compare_indexes()
+        usage = _index_usage(model)
+        live = model._get_collection().index_information()
+        unused = [
+            name for name, ops in usage.items()
+            if ops == 0 and name != '_id_' and name in live
+        ]
+        report.append({
+            'collection': model._get_collection_name(),
+            'missing': diff['missing'],
+            'extra': [key for key in diff['extra'] if key != [('_id', 1)]],
+            'unused': sorted(unused),
+        })
+    return report
+
+
+def print_index_report(report):
+    """Print index_report() output; returns True when nothing is missing."""
+    ok = True
+    for entry in report:
+        status = '✓' if not entry['missing'] else '✗'
+        print(f"{status} {entry['collection']}")
+        for key in entry['missing']:
+            ok = False
+            print(f"   - missing index: {key}")
+        for key in entry['extra']:
+            print(f"   - undeclared index on server: {key}")
+        for name in entry['unused']:
+            print(f"   - unused since server start: {name}")
+    return ok
+
+
+def query_plans():
+    """
+    Representative queryset for each query helper in routes.py, keyed by helper name.
+    Querysets come from the helpers themselves wherever they return one; listings
+    are explained as pagination.page_query() runs them, for the first page and
+    for a page reached through a cursor.
+    """
+    from . import routes
+    from .featured import expired_featured
+    from .pagination import page_query, encode_cursor
+    from .payments import _sources
+    from .reconcile import stale_query
+
+    now = datetime.utcnow()
+    cursor = encode_cursor(Celebrity(id=1, created_at=now))
+
+    def pages(name, queryset):
+        return {name: page_query(queryset)[0], f'{name}:after': page_query(queryset, after=cursor)[0]}
+
+    return {
+        'get_user_by_id': User.objects(pk=1),
+        'get_user_by_username': User.objects(username='explain'),
+        'users_with_role': User.objects(roles='explain'),
+        'get_celebrity_by_id': Celebrity.objects(id=1),
+        'get_celebrity_by_slug': Celebrity.objects(slug='explain'),
+        'get_celebrities_by_ids': Celebrity.objects(id__in=[1, 2]),
+        'get_celebrity_version_by_slug': Celebrity.objects(slug='explain').only('id', 'version', 'updated_at', 'created_at'),
+        **pages('get_celebrity_submissions_pending', routes.get_celebrity_submissions_pending()),
+        'get_submission_by_id': CelebritySubmission.objects(id=1),
+        'bulk_moderate_submissions': CelebritySubmission.objects(id__in=[1, 2], status='pending'),
+        'get_featured_celebrities': routes.get_featured_celebrities(),
+        **pages('search_featured_celebrities', routes.search_featured_celebrities('explain')),
+        **pages('get_onboarding_registrations_all', routes.get_onboarding_registrations_all()),
+        'get_payment_by_ref': Payment.objects(ref='explain').only('ref', 'user_id', 'status', 'result_desc'),
+        'slug_counter_seed': Celebrity.objects(slug=re.compile(r'^explain(?:-(\d+))?$')).only('slug'),
+        **pages('admin_celebrity_listing', Celebrity.objects),
+        'mpesa_callback': Payment.objects(checkout_request_id='explain', status__in=_sources('paid')),
+        'mpesa_callback_by_ref': Payment.objects(ref='explain', status__in=_sources('paid')),
+        'feature_paid_celebrity': Celebrity.objects(slug='explain'),
+        'expire_featured_listings': expired_featured(now).only('id', 'slug'),
+        'reconcile_stale_payments': stale_query(now, 100),
+        'reconcile_stale_payments:after': stale_query(now, 100, last=Payment(id=1, created_at=now)),
+        'search_index_sync': Celebrity.objects(updated_at__gt=now).only('name', 'category', 'bio', 'featured', 'featured_until'),
+        'job_claim': Job.objects(status='pending', run_at__lte=now).order_by('run_at'),
+    }
+
+
+def _plan_stages(plan):
+    """Yield every stage name in an explain() plan tree."""
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            yield plan['stage']
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _plan_stages(item)
+
+
+def explain_report(plans=None):
+    """
+    Explain each query in `plans` (default: query_plans()).
+    Returns: list of dicts with helper name, winning plan stages and collscan flag
+    """
+    plans = plans if plans is not None else query_plans()
+    report = []
+    for name, queryset in plans.items():
+        explained = queryset.explain()
+        winning = explained.get('queryPlanner', {}).get('winningPlan', {})
+        stages = list(_plan_stages(winning))
+        report.append({
+            'helper': name,
+            'stages': stages,
+            'collscan': 'COLLSCAN' in stages,
+            'in_memory_sort': 'SORT' in stages,
+        })
+    return report
+
+
+def print_explain_report(report):
+    """Print explain_report() output; returns True when no query scans a collection."""
+    ok = True
+    for entry in report:
+        if entry['collscan']:
+            ok = False
+            status = '✗ COLLSCAN'
+        elif entry['in_memory_sort']:
+            status = '⚠ in-memory sort'
+        else:
+            status = '✓'
+        print(f"{status} {entry['helper']}: {' > '.join(entry['stages']) or 'n/a'}")
+    return ok
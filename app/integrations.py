@@ -0,0 +1,158 @@
+"""
+Shared HTTP clients for third-party APIs (M-Pesa Daraja, Brevo).
+Each upstream gets one pooled `requests.Session`, so connections and TLS
+sessions are kept alive between calls instead of being set up per request.
+Every call has explicit (connect, read) timeouts; only idempotent methods
+are retried on read errors and 502/503/504, while connection failures
+(nothing was sent yet) are retried for any method. Latency and error
+counts are kept per upstream for /admin/metrics.
+
+  from .integrations import mpesa_client
+  r = mpesa_client.get(url, auth=(key, secret))
+"""
+import os
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_TIMEOUT = (3.05, 15)  # connect, read seconds
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+
+
+class UpstreamMetrics:
+    """Call counts and latency of one upstream; keeps the last `window` samples for percentiles."""
+
+    def __init__(self, window=500):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=window)
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, elapsed_ms, ok):
+        with self._lock:
+            self.calls += 1
+            self.errors += 0 if ok else 1
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+            self._samples.append(elapsed_ms)
+
+    def snapshot(self):
+        with self._lock:
+            samples = sorted(self._samples)
+            calls, errors, total_ms, max_ms = self.calls, self.errors, self.total_ms, self.max_ms
+
+        def percentile(p):
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))], 1) if samples else None
+
+        return {
+            'calls': calls,
+            'errors': errors,
+            'avg_ms': round(total_ms / calls, 1) if calls else None,
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'max_ms': round(max_ms, 1),
+        }
+
+
+class RateLimiter:
+    """Token bucket shared by threads: at most `rate` calls per second, bursts of up to `burst`."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a call is allowed."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class Upstream:
+    """Pooled, keep-alive client for one third-party API."""
+
+    def __init__(self, name, timeout=DEFAULT_TIMEOUT, retries=2, pool_size=10, backoff_factor=0.3):
+        self.name = name
+        self.timeout = timeout
+        self.retries = retries
+        self.pool_size = pool_size
+        self.backoff_factor = backoff_factor
+        self.metrics = UpstreamMetrics()
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        # Pooled sockets must not be shared with a forked worker (gunicorn --preload)
+        if self._session is None or self._pid != os.getpid():
+            with self._lock:
+                if self._session is None or self._pid != os.getpid():
+                    self._session, self._pid = self._build_session(), os.getpid()
+        return self._session
+
+    def _build_session(self):
+        retry = Retry(
+            total=self.retries,
+            connect=self.retries,
+            read=self.retries,
+            status=self.retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=IDEMPOTENT_METHODS,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def request(self, method, url, timeout=None, **kwargs):
+        started = time.perf_counter()
+        ok = False
+        try:
+            response = self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+            ok = getattr(response, 'status_code', 200) < 500
+            return response
+        finally:
+            self.metrics.record((time.perf_counter() - started) * 1000, ok)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            self._session = None
+
+
+mpesa_client = Upstream('mpesa', timeout=(3.05, 15))
+brevo_client = Upstream('brevo', timeout=(3.05, 20))
+
+UPSTREAMS = {client.name: client for client in (mpesa_client, brevo_client)}
+
+
+def integration_metrics():
+    """Latency and error counts per upstream, for this worker process."""
+    return {name: client.metrics.snapshot() for name, client in UPSTREAMS.items()}
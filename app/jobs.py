@@ -0,0 +1,134 @@
+"""
+Durable background jobs stored in MongoDB.
+The web app only enqueues (one insert); a worker process claims due jobs
+atomically, runs the registered handler and retries failures with
+exponential backoff. A job whose worker died is picked up again once its
+lease expires.
+
+  enqueue('send_email', {...})          # from a request
+  python scripts/run_worker.py          # separate worker process
+"""
+import random
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+
+from .models import Job
+
+HANDLERS = {}
+
+LEASE_SECONDS = 120
+BACKOFF_BASE_SECONDS = 10
+BACKOFF_MAX_SECONDS = 3600
+
+
+def job_handler(kind):
+    """Register the function that runs jobs of `kind`; it receives the job payload."""
+    def decorator(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return decorator
+
+
+def enqueue(kind, payload, delay=0, max_attempts=5):
+    """Queue a job to run after `delay` seconds. Returns the saved Job."""
+    job = Job(
+        kind=kind,
+        payload=payload,
+        max_attempts=max_attempts,
+        run_at=datetime.utcnow() + timedelta(seconds=delay),
+    )
+    job.save()
+    return job
+
+
+def backoff_seconds(attempts):
+    """Delay before retry number `attempts` (1-based): exponential with jitter, capped."""
+    delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim_next(lease_seconds=LEASE_SECONDS, kinds=None):
+    """
+    Atomically take the oldest due job (or one whose lease expired), only of
+    `kinds` if given. Returns a Job or None.
+    """
+    now = datetime.utcnow()
+    due = {'$or': [
+        {'status': 'pending', 'run_at': {'$lte': now}},
+        {'status': 'running', 'locked_until': {'$lte': now}},
+    ]}
+    if kinds:
+        due['kind'] = {'$in': list(kinds)}
+    doc = Job._get_collection().find_one_and_update(
+        due,
+        {
+            '$set': {'status': 'running', 'locked_until': now + timedelta(seconds=lease_seconds)},
+            '$inc': {'attempts': 1},
+        },
+        sort=[('run_at', 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+    return Job._from_son(doc) if doc else None
+
+
+def run_job(job):
+    """Run one claimed job and record the outcome. Returns True on success."""
+    handler = HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job kind '{job.kind}'")
+        handler(job.payload)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        if job.attempts >= job.max_attempts:
+            Job.objects(id=job.id).update_one(
+                set__status='failed', set__last_error=error, set__finished_at=datetime.utcnow(), unset__locked_until=True
+            )
+            print(f"❌ Job {job.id} ({job.kind}) failed permanently: {error}")
+        else:
+            retry_at = datetime.utcnow() + timedelta(seconds=backoff_seconds(job.attempts))
+            Job.objects(id=job.id).update_one(
+                set__status='pending', set__last_error=error, set__run_at=retry_at, unset__locked_until=True
+            )
+            print(f"⚠️  Job {job.id} ({job.kind}) attempt {job.attempts} failed, retrying at {retry_at}: {error}")
+        if not isinstance(e, LookupError):
+            traceback.print_exc()
+        return False
+    Job.objects(id=job.id).update_one(
+        set__status='done', set__finished_at=datetime.utcnow(), unset__locked_until=True, unset__last_error=True
+    )
+    return True
+
+
+def work(app, once=False, poll_interval=1.0, stop_event=None, kinds=None):
+    """
+    Process jobs (only of `kinds` if given) until stopped. With once=True, drain
+    the due jobs and return the number processed (handy in tests and cron-style runs).
+    """
+    processed = 0
+    with app.app_context():
+        while not (stop_event and stop_event.is_set()):
+            job = claim_next(kinds=kinds)
+            if job is None:
+                if once:
+                    break
+                time.sleep(poll_interval)
+                continue
+            run_job(job)
+            processed += 1
+    return processed
+
+
+def start_worker_thread(app, poll_interval=1.0):
+    """Run a worker inside the web process (for single-service hosting)."""
+    stop_event = threading.Event()
+    thread = threading.Thread(
+        target=work, args=(app,), kwargs={'poll_interval': poll_interval, 'stop_event': stop_event},
+        name='job-worker', daemon=True,
+    )
+    thread.start()
+    return stop_event
@@ -0,0 +1,66 @@
+"""
+Outbound email.
+Routes call queue_email(), which only enqueues a `send_email` job; the
+worker (scripts/run_worker.py) delivers it through the backend chosen by
+MAIL_BACKEND:
+  brevo - Brevo transactional email API (default)
+  fake  - appends to `outbox` in memory, for tests and local development
+"""
+import os
+
+from flask import current_app
+
+from .integrations import brevo_client
+from .jobs import enqueue, job_handler
+
+BREVO_URL = "https://api.brevo.com/v3/smtp/email"
+
+# Messages "sent" by the fake backend
+outbox = []
+
+
+class BrevoMailer:
+    """Sends a Brevo `smtp/email` payload; raises so the job is retried on failure."""
+
+    def send(self, message):
+        headers = {
+            "api-key": os.getenv("BREVO_API_KEY"),
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        }
+        r = brevo_client.post(BREVO_URL, json=message, headers=headers)
+        if r.status_code >= 400:
+            raise RuntimeError(f"Brevo returned {r.status_code}: {r.text[:200]}")
+        return r
+
+
+class FakeMailer:
+    """Records messages in `outbox` instead of sending them."""
+
+    def send(self, message):
+        outbox.append(message)
+
+
+def get_mailer():
+    if current_app.config.get('MAIL_BACKEND') == 'fake':
+        return FakeMailer()
+    return BrevoMailer()
+
+
+def queue_email(subject, html, to, sender):
+    """
+    Enqueue an email for background delivery.
+    `to` is an address or list of addresses, `sender` a {"name", "email"} dict.
+    """
+    recipients = list(to) if isinstance(to, (list, tuple)) else [to]
+    return enqueue('send_email', {
+        "sender": sender,
+        "to": [{"email": address} for address in recipients],
+        "subject": subject,
+        "htmlContent": html,
+    })
+
+
+@job_handler('send_email')
+def send_email(message):
+    get_mailer().send(message)
@@ -0,0 +1,235 @@
+"""
+Streaming copy of the legacy SQLite tables (legacy_models.py) into MongoDB.
+Rows are read in id order with yield_per, converted in batches and written
+with one unordered bulk write per batch:
+  - into an empty collection, with insert_many
+  - otherwise as upserts on the table's natural key, so rows that already
+    exist are left alone (or updated from SQLite with overwrite=True)
+After every batch the last migrated id is saved to a checkpoint file, so an
+interrupted run resumes where it stopped. Checkpoints are keyed by the target
+server and database, and a table's entry is dropped once it has been copied
+in full, so a later run (or one into another database) copies everything again.
+Imported documents keep their SQLite ids; the id counters are raised past them
+at the end.
+"""
+import json
+import os
+import time
+from datetime import datetime
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from .cache import response_cache
+from .dbsync import target_key
+from .ids import sync_counter
+from .models import Celebrity, User, CelebritySubmission, OnboardingRegistration
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_CHECKPOINT = os.path.join(os.path.dirname(__file__), '..', 'instance', 'migration_checkpoint.json')
+
+
+def celebrity_fields(row):
+    return dict(
+        id=row.id, name=row.name, slug=row.slug, bio=row.bio, category=row.category,
+        photo_filename=row.photo_filename, youtube=row.youtube, tiktok=row.tiktok,
+        spotify=row.spotify, featured=bool(row.featured), created_at=row.created_at,
+    )
+
+
+def user_fields(row):
+    # Legacy accounts have no email; a reserved .invalid address keeps the unique index satisfied
+    return dict(id=row.id, username=row.username, email=f"{row.username}@legacy.invalid", password_hash=row.password_hash)
+
+
+def submission_fields(row):
+    return dict(
+        id=row.id, name=row.name, email=row.email, phone=row.phone, category=row.category,
+        bio=row.bio, youtube=row.youtube, tiktok=row.tiktok, spotify=row.spotify,
+        photo_filename=row.photo_filename, status=row.status, created_at=row.created_at,
+    )
+
+
+def onboarding_fields(row):
+    return dict(
+        id=row.id, name=row.name, email=row.email, phone=row.phone, message=row.message,
+        status=row.status, created_at=row.created_at,
+    )
+
+
+# table -> (legacy model name, MongoEngine model, natural key matched on upsert, row converter,
+#           fields only written on insert, never by overwrite)
+TABLES = {
+    'celebrities': ('LegacyCelebrity', Celebrity, 'slug', celebrity_fields, ()),
+    'users': ('LegacyUser', User, 'username', user_fields, ('email',)),
+    'submissions': ('LegacyCelebritySubmission', CelebritySubmission, '_id', submission_fields, ()),
+    'onboarding': ('LegacyOnboardingRegistration', OnboardingRegistration, '_id', onboarding_fields, ()),
+}
+
+
+def checkpoint_target(collection):
+    """Identifies the server and database a checkpoint entry was written for."""
+    return target_key(os.getenv('MONGO_URI') or 'mongodb://localhost:27017', collection.database.name)
+
+
+def load_checkpoint(path):
+    """Return {table: {'target': ..., 'after': last migrated id}}; empty if there is no checkpoint yet."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_checkpoint(path, state):
+    """Write `state`, or remove the checkpoint file once no table has a run in progress."""
+    if not state:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        return
+    # Written to a temporary file first, so a crash never leaves a truncated checkpoint
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def stream_batches(legacy_model, after_id=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield lists of legacy rows in id order, holding at most one batch in memory."""
+    query = legacy_model.query.order_by(legacy_model.id)
+    if after_id is not None:
+        query = query.filter(legacy_model.id > after_id)
+    batch = []
+    for row in query.yield_per(batch_size):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def to_documents(model, rows, convert):
+    """Convert legacy rows to raw documents, applying the model's defaults (e.g. roles, version)."""
+    return [model(**convert(row)).to_mongo().to_dict() for row in rows]
+
+
+def write_batch(collection, docs, key, insert=False, overwrite=()):
+    """
+    Write one batch with a single unordered bulk operation.
+    `overwrite` names the fields replaced on documents that already exist;
+    by default existing documents are left untouched.
+    Returns: (inserted, already present, list of error messages)
+    """
+    try:
+        if insert:
+            result = collection.insert_many(docs, ordered=False)
+            return len(result.inserted_ids), 0, []
+        if overwrite:
+            now = datetime.utcnow()
+            ops = []
+            for doc in docs:
+                update = {
+                    '$set': {k: v for k, v in doc.items() if k in overwrite},
+                    '$setOnInsert': {k: v for k, v in doc.items() if k not in overwrite and k != 'version'},
+                }
+                if 'version' in doc:
+                    # Bump versioned documents so profile ETags and the search index sync see the change
+                    update['$set']['updated_at'] = now
+                    update['$setOnInsert'].pop('updated_at', None)
+                    update['$inc'] = {'version': 1}
+                ops.append(UpdateOne({key: doc[key]}, update, upsert=True))
+        else:
+            ops = [UpdateOne({key: doc[key]}, {'$setOnInsert': doc}, upsert=True) for doc in docs]
+        result = collection.bulk_write(ops, ordered=False)
+        return result.upserted_count, result.matched_count, []
+    except BulkWriteError as e:
+        details = e.details
+        errors = [err.get('errmsg', str(err)) for err in details.get('writeErrors', [])]
+        inserted = details.get('nInserted', 0) + details.get('nUpserted', 0)
+        return inserted, details.get('nMatched', 0), errors
+
+
+def migrate_table(table, batch_size=DEFAULT_BATCH_SIZE, checkpoint=None, checkpoint_path=None,
+                  overwrite=False, report=print):
+    """
+    Copy one legacy table, resuming after the id recorded in `checkpoint` for
+    the same target database. The table's entry is removed once it completes.
+    Returns: dict with rows, inserted, existing, errors and seconds
+    """
+    from . import legacy_models
+    legacy_name, model, key, convert, insert_only = TABLES[table]
+    legacy_model = getattr(legacy_models, legacy_name)
+    collection = model._get_collection()
+    checkpoint = checkpoint if checkpoint is not None else {}
+    target = checkpoint_target(collection)
+    saved = checkpoint.get(table)
+    after_id = None
+    if isinstance(saved, dict) and saved.get('target') == target:
+        after_id = saved.get('after')
+    elif saved is not None:
+        report(f"   ⚠️  {table}: checkpoint was written for another database, starting from the first row")
+    # A fresh restore into an empty collection needs no per-row key matching
+    insert = after_id is None and collection.estimated_document_count() == 0
+
+    stats = {'rows': 0, 'inserted': 0, 'existing': 0, 'errors': 0, 'seconds': 0.0}
+    started = time.monotonic()
+    for rows in stream_batches(legacy_model, after_id, batch_size):
+        docs = to_documents(model, rows, convert)
+        replaced = ()
+        if overwrite:
+            # Only the columns the legacy table owns; defaults such as roles or version are kept
+            replaced = {model._fields[name].db_field for name in convert(rows[0])} - {'_id', *insert_only}
+        inserted, existing, errors = write_batch(collection, docs, key, insert=insert, overwrite=replaced)
+        stats['rows'] += len(rows)
+        stats['inserted'] += inserted
+        stats['existing'] += existing
+        stats['errors'] += len(errors)
+        for message in errors[:3]:
+            report(f"   ⚠️  {table}: {message}")
+        checkpoint[table] = {'target': target, 'after': rows[-1].id}
+        if checkpoint_path:
+            save_checkpoint(checkpoint_path, checkpoint)
+        elapsed = time.monotonic() - started
+        report(f"   {table}: {stats['rows']} rows, {stats['rows'] / max(elapsed, 1e-6):.0f} rows/s")
+    # Finished: nothing to resume, and a later run must not skip these rows
+    checkpoint.pop(table, None)
+    if checkpoint_path:
+        save_checkpoint(checkpoint_path, checkpoint)
+    stats['seconds'] = time.monotonic() - started
+    return stats
+
+
+def migrate(tables=None, batch_size=DEFAULT_BATCH_SIZE, checkpoint_path=DEFAULT_CHECKPOINT,
+            restart=False, overwrite=False, report=print):
+    """
+    Copy every table in `tables` (default: all of TABLES), then raise the id counters.
+    Returns: {table: stats} as returned by migrate_table()
+    """
+    checkpoint = {} if restart or not checkpoint_path else load_checkpoint(checkpoint_path)
+    summary = {}
+    for table in tables or TABLES:
+        summary[table] = migrate_table(
+            table, batch_size=batch_size, checkpoint=checkpoint, checkpoint_path=checkpoint_path,
+            overwrite=overwrite, report=report,
+        )
+    # Imported documents carry explicit ids; new ones must be allocated past them
+    for table in summary:
+        sync_counter(TABLES[table][1])
+    response_cache.clear()
+    return summary
+
+
+def print_summary(summary):
+    print("=" * 70)
+    print("Migration Summary:")
+    for table, stats in summary.items():
+        rate = stats['rows'] / stats['seconds'] if stats['seconds'] else 0
+        print(
+            f"  {table:<12} {stats['rows']:>7} rows  {stats['inserted']:>7} inserted  "
+            f"{stats['existing']:>7} already present  {stats['errors']:>4} errors  "
+            f"({stats['seconds']:.1f}s, {rate:.0f} rows/s)"
+        )
+    print("=" * 70)
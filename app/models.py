@@ -1,16 +1,38 @@
 import os
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
-from mongoengine import Document, StringField, DateTimeField, BooleanField, IntField, SequenceField
+from mongoengine import Document, StringField, DateTimeField, BooleanField, IntField, DictField, ListField, DynamicField
 from flask_login import UserMixin
+from .ids import id_field
+from .cache import response_cache
+from .auth import invalidate_user
+from .search import index_celebrity, unindex_celebrity
+from . import images
+from . import passwords
 
 # Export the flag used by routes.py
 USE_MONGO = True  # models.py is MongoEngine-only
 
 
 class Celebrity(Document):
-    meta = {'collection': 'celebrities'}
-    id = SequenceField(primary_key=True)
+    meta = {
+        'collection': 'celebrities',
+        'indexes': [
+            # Homepage listing: featured filter + newest-first sort; the name
+            # key lets the search regex be checked without fetching documents.
+            {'fields': ['featured', '-created_at', '-id', 'name'], 'name': 'featured_created_name'},
+            # Admin listings: keyset pagination on (created_at, id)
+            {'fields': ['-created_at', '-id'], 'name': 'created_id'},
+            # Reference of the latest feature payment (support lookups)
+            {'fields': ['feature_payment_id'], 'sparse': True, 'name': 'feature_payment_id'},
+            # Featured expiry sweep (featured.expire_featured_listings)
+            {'fields': ['featured', 'featured_until'], 'name': 'featured_until'},
+            # Search index sync: writes since the last sync (search.SearchIndex.sync)
+            {'fields': ['updated_at'], 'name': 'updated_at'},
+            # Idempotency key of approvals: one celebrity per submission (moderation.py)
+            {'fields': ['source_submission_id'], 'unique': True, 'sparse': True, 'name': 'source_submission_id'},
+        ],
+    }
+    id = id_field()
     name = StringField(max_length=140, required=True)
     slug = StringField(max_length=160, required=True, unique=True)
     bio = StringField()
@@ -22,49 +44,134 @@ class Celebrity(Document):
     featured = BooleanField(default=False)
     # Payment / feature tracking
     feature_amount = IntField(default=0)  # amount paid (in KES)
-    feature_status = StringField(max_length=20, default="none")  # none | pending | paid | failed
+    feature_status = StringField(max_length=20, default="none")  # none | pending | paid | failed | expired
     feature_payment_id = StringField(max_length=200)  # payment / transaction id from MPESA
     featured_until = DateTimeField(required=False)
     created_at = DateTimeField(default=datetime.utcnow)
+    # Content version, bumped on every save; profile ETags are built from it
+    version = IntField(default=0)
+    updated_at = DateTimeField()
+    # Submission this celebrity was approved from (int or ObjectId, like the submission's id)
+    source_submission_id = DynamicField()
+
+    def save(self, *args, **kwargs):
+        self.version = (self.version or 0) + 1
+        self.updated_at = datetime.utcnow()
+        result = super().save(*args, **kwargs)
+        index_celebrity(self)
+        return result
+
+    def delete(self, *args, **kwargs):
+        super().delete(*args, **kwargs)
+        unindex_celebrity(self.pk)
+
+    @property
+    def last_modified(self):
+        return self.updated_at or self.created_at
 
     @property
     def photo_url(self):
-        if self.photo_filename:
-            return f"/static/uploads/{self.photo_filename}"
-        return None
+        return images.photo_rendition_url(self.photo_filename)
+
+    def photo_rendition_url(self, rendition='original', fmt='jpg'):
+        """URL of a photo rendition (card, profile, original) in jpg or webp."""
+        return images.photo_rendition_url(self.photo_filename, rendition, fmt)
+
+    def photo_srcset(self, fmt='jpg'):
+        """srcset of all renditions in `fmt`; empty for photos uploaded before renditions existed."""
+        return images.photo_srcset(self.photo_filename, fmt)
+
+    def cache_tags(self):
+        """Response cache tags of the pages that render this celebrity (call before saving)."""
+        tags = [f'celebrity:{self.slug}']
+        changed = set(self._get_changed_fields())
+        if self.featured or 'featured' in changed:
+            tags.append('celebrity-list')
+        if 'slug' in changed and not self._created:
+            # The page under the previous slug must stop being served
+            tags.append('celebrity-profiles')
+        return tags
 
     def mark_featured(self, days=30, payment_id=None, amount=0):
-        """Helper to mark a celebrity as featured for `days` days and record payment info."""
+        """
+        Mark this celebrity as featured for `days` days and record payment info.
+        Applied as one atomic update, so it never overwrites concurrent edits.
+        """
         from datetime import timedelta
-        self.featured = True
-        self.feature_amount = amount
-        self.feature_status = 'paid'
-        self.feature_payment_id = payment_id
-        self.featured_until = datetime.utcnow() + timedelta(days=days)
-        self.save()
+        now = datetime.utcnow()
+        fields = {
+            'featured': True,
+            'feature_amount': amount,
+            'feature_status': 'paid',
+            'feature_payment_id': payment_id,
+            'featured_until': now + timedelta(days=days),
+            'updated_at': now,
+        }
+        Celebrity.objects(id=self.id).update_one(inc__version=1, **{f'set__{k}': v for k, v in fields.items()})
+        for name, value in fields.items():
+            setattr(self, name, value)
+        self.version = (self.version or 0) + 1
+        self._clear_changed_fields()
+        index_celebrity(self)
+        response_cache.invalidate(f'celebrity:{self.slug}', 'celebrity-list')
 
 
 class User(UserMixin, Document):
-    meta = {'collection': 'users'}
-    id = SequenceField(primary_key=True)
+    meta = {
+        'collection': 'users',
+        'indexes': [
+            {'fields': ['roles'], 'name': 'roles'},
+        ],
+    }
+    id = id_field()
     username = StringField(max_length=80, required=True, unique=True)
     email = StringField(max_length=120, required=True, unique=True)
     full_name = StringField(max_length=120)  # Celebrity's display name
     password_hash = StringField(max_length=200, required=True)
     is_admin = BooleanField(default=False)  # Admin flag
     is_celebrity = BooleanField(default=True)  # Celebrity/user flag
+    roles = ListField(StringField(max_length=40))  # e.g. ['admin']; see roles.py
     created_at = DateTimeField(default=datetime.utcnow)
 
+    def save(self, *args, **kwargs):
+        result = super().save(*args, **kwargs)
+        invalidate_user(self.pk)
+        return result
+
+    def delete(self, *args, **kwargs):
+        super().delete(*args, **kwargs)
+        invalidate_user(self.pk)
+
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = passwords.hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return passwords.verify_password(self.password_hash, password)
+
+    def rehash_password_if_needed(self, password):
+        """
+        After a successful check_password(): re-hash with the configured method if
+        the stored hash uses older parameters. Only replaces the exact hash that
+        was checked, so a concurrent password change always wins.
+        Returns: True if the stored hash was upgraded
+        """
+        if not passwords.needs_rehash(self.password_hash):
+            return False
+        new_hash = passwords.hash_password(password)
+        updated = User.objects(id=self.id, password_hash=self.password_hash).update_one(set__password_hash=new_hash)
+        if updated:
+            self.password_hash = new_hash
+        return bool(updated)
 
 
 class CelebritySubmission(Document):
-    meta = {'collection': 'celebrity_submissions'}
-    id = SequenceField(primary_key=True)
+    meta = {
+        'collection': 'celebrity_submissions',
+        'indexes': [
+            {'fields': ['status', '-created_at', '-id'], 'name': 'status_created_id'},
+        ],
+    }
+    id = id_field()
     name = StringField(max_length=120, required=True)
     email = StringField(max_length=120, required=True)
     phone = StringField(max_length=60, required=True)
@@ -79,8 +186,13 @@ class CelebritySubmission(Document):
 
 
 class OnboardingRegistration(Document):
-    meta = {'collection': 'onboarding_registrations'}
-    id = SequenceField(primary_key=True)
+    meta = {
+        'collection': 'onboarding_registrations',
+        'indexes': [
+            {'fields': ['-created_at', '-id'], 'name': 'created_id'},
+        ],
+    }
+    id = id_field()
     name = StringField(max_length=120, required=True)
     email = StringField(max_length=120, required=True)
     phone = StringField(max_length=50, required=True)
@@ -93,3 +205,62 @@ class OnboardingRegistration(Document):
 
 
 
+
+
+class StoredPhoto(Document):
+    """Reference count of a content-addressed upload; `id` is its photo_filename."""
+    meta = {'collection': 'stored_photos'}
+    id = StringField(primary_key=True, max_length=255)
+    refs = IntField(default=0)
+    created_at = DateTimeField(default=datetime.utcnow)
+
+
+class Job(Document):
+    """Background job queued by the web app and run by scripts/run_worker.py (see jobs.py)."""
+    meta = {
+        'collection': 'jobs',
+        'indexes': [
+            {'fields': ['status', 'run_at'], 'name': 'status_run_at'},
+            {'fields': ['status', 'locked_until'], 'name': 'status_locked_until'},
+        ],
+    }
+    kind = StringField(max_length=60, required=True)
+    payload = DictField()
+    status = StringField(max_length=20, default="pending")  # pending | running | done | failed
+    attempts = IntField(default=0)
+    max_attempts = IntField(default=5)
+    run_at = DateTimeField(default=datetime.utcnow)
+    locked_until = DateTimeField()
+    last_error = StringField()
+    created_at = DateTimeField(default=datetime.utcnow)
+    finished_at = DateTimeField()
+
+
+class Payment(Document):
+    """
+    One M-Pesa STK push attempt; written before the push so /pay can return at once.
+    `status` only moves along payments.TRANSITIONS, via payments.transition().
+    """
+    meta = {
+        'collection': 'payments',
+        'indexes': [
+            {'fields': ['ref'], 'unique': True, 'name': 'ref'},
+            {'fields': ['checkout_request_id'], 'unique': True, 'sparse': True, 'name': 'checkout_request_id'},
+            # Sweeping unfinished payments that never got a callback
+            {'fields': ['status', 'created_at'], 'name': 'status_created'},
+        ],
+    }
+    id = id_field()
+    ref = StringField(max_length=64, required=True)  # sent to Daraja as AccountReference
+    user_id = StringField(max_length=64)
+    celebrity_slug = StringField(max_length=200)
+    phone = StringField(max_length=20)
+    amount = IntField(default=0)
+    status = StringField(max_length=20, default="initiated")  # initiated | pushed | paid | failed | expired
+    checkout_request_id = StringField(max_length=100)
+    result_code = IntField()
+    result_desc = StringField()
+    mpesa_receipt = StringField(max_length=50)
+    paid_at = DateTimeField()
+    created_at = DateTimeField(default=datetime.utcnow)
+    updated_at = DateTimeField(default=datetime.utcnow)
@@ -0,0 +1,214 @@
+"""
+Approving and rejecting celebrity submissions, one at a time or in bulk.
+A bulk approval of N submissions costs a fixed number of round trips however
+large N is: one read of the pending submissions, one slug reservation per
+distinct name, one id reservation, one insert_many for the celebrities, one
+update_many for the statuses and one bulk write for the photo references.
+
+Approval is atomic and safe to retry:
+  - on a replica set (or sharded cluster) the three writes commit together in
+    one transaction, so a crash leaves either all of them or none
+  - on a standalone server every celebrity carries its submission's id in
+    `source_submission_id` (unique index), so a retried approval finds the
+    celebrity created by the interrupted one instead of adding a duplicate
+MONGO_TRANSACTIONS=auto|on|off chooses between them (auto asks the server).
+Submissions that fail are reported back and left pending.
+"""
+import os
+from datetime import datetime
+
+from flask import current_app
+from mongoengine.connection import get_db
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from .cache import response_cache
+from .ids import allocate_ids
+from .models import Celebrity, CelebritySubmission
+from .search import index_celebrity
+from .slugs import allocate_many, MAX_ATTEMPTS
+from .storage import acquire_photos, release_photo
+from .utils import extract_youtube_id, extract_tiktok_id, extract_spotify_id
+
+MAX_BULK = 500  # submissions per bulk request
+DUPLICATE_KEY = 11000
+MONGO_TRANSACTIONS = os.getenv('MONGO_TRANSACTIONS', 'auto')
+
+_transactions = None
+
+
+class SelectionChanged(Exception):
+    """Some of the submissions were moderated by someone else mid-approval."""
+
+
+def transactions_supported():
+    """True if approvals can use multi-document transactions (replica set or sharded cluster)."""
+    global _transactions
+    if _transactions is None:
+        if MONGO_TRANSACTIONS in ('on', 'off'):
+            _transactions = MONGO_TRANSACTIONS == 'on'
+        else:
+            try:
+                hello = get_db().command('hello')
+                _transactions = bool(hello.get('setName') or hello.get('msg') == 'isdbgrid')
+            except Exception:
+                _transactions = False
+    return _transactions
+
+
+def celebrity_from_submission(sub):
+    """Unsaved Celebrity built from a submission's data (no slug yet)."""
+    return Celebrity(
+        name=sub.name,
+        category=sub.category,
+        bio=sub.bio,
+        photo_filename=sub.photo_filename,
+        youtube=sub.youtube or extract_youtube_id(sub.youtube) or sub.youtube,
+        tiktok=sub.tiktok or extract_tiktok_id(sub.tiktok) or sub.tiktok,
+        spotify=sub.spotify or extract_spotify_id(sub.spotify) or sub.spotify,
+        source_submission_id=sub.id,
+    )
+
+
+def slug_name(sub):
+    return sub.name or f'celeb-{sub.id}'
+
+
+def _prepare(pairs):
+    """Give the new celebrities ids, slugs and the fields save() would have set."""
+    now = datetime.utcnow()
+    ids = allocate_ids(Celebrity, len(pairs))
+    slugs = allocate_many([slug_name(sub) for sub, _ in pairs])
+    for (_, celeb), doc_id, slug in zip(pairs, ids, slugs):
+        celeb.id, celeb.slug = doc_id, slug
+        celeb.version, celeb.updated_at = 1, now
+
+
+def _resolve_conflicts(pairs):
+    """
+    After a duplicate key error: split `pairs` into submissions that already have
+    a celebrity (an earlier, interrupted approval) and the rest, whose slugs are
+    re-allocated if they were taken meanwhile.
+    Returns: ({submission id: existing slug}, remaining pairs)
+    """
+    existing = dict(
+        Celebrity.objects(source_submission_id__in=[sub.id for sub, _ in pairs]).scalar('source_submission_id', 'slug')
+    )
+    remaining = [(sub, celeb) for sub, celeb in pairs if sub.id not in existing]
+    taken = set(Celebrity.objects(slug__in=[celeb.slug for _, celeb in remaining]).scalar('slug'))
+    clashing = [(sub, celeb) for sub, celeb in remaining if celeb.slug in taken]
+    for (_, celeb), slug in zip(clashing, allocate_many([slug_name(sub) for sub, _ in clashing])):
+        celeb.slug = slug
+    return existing, remaining
+
+
+def _commit(pairs, sub_ids, session):
+    """The transaction body: insert the celebrities, mark every submission approved, take photo references."""
+    if pairs:
+        Celebrity._get_collection().insert_many([celeb.to_mongo() for _, celeb in pairs], session=session)
+        acquire_photos([celeb.photo_filename for _, celeb in pairs], session=session)
+    result = CelebritySubmission._get_collection().update_many(
+        {'_id': {'$in': sub_ids}, 'status': 'pending'}, {'$set': {'status': 'approved'}}, session=session,
+    )
+    if result.modified_count != len(sub_ids):
+        raise SelectionChanged()
+
+
+def _approve_in_transaction(pairs):
+    """Returns: (approved [(sub id, slug)], failed [(sub id, error)], skipped [sub id])"""
+    client = get_db().client
+    existing, skipped = {}, []
+    for _ in range(MAX_ATTEMPTS):
+        sub_ids = [sub.id for sub, _ in pairs] + list(existing)
+        try:
+            with client.start_session() as session:
+                session.with_transaction(lambda s: _commit(pairs, sub_ids, s))
+            return [(sub.id, celeb.slug) for sub, celeb in pairs] + list(existing.items()), [], skipped
+        except SelectionChanged:
+            # Aborted, nothing written: drop what another moderator handled and go again
+            pending = set(CelebritySubmission.objects(id__in=sub_ids, status='pending').scalar('id'))
+            skipped += [i for i in sub_ids if i not in pending]
+            pairs = [(sub, celeb) for sub, celeb in pairs if sub.id in pending]
+            existing = {i: slug for i, slug in existing.items() if i in pending}
+        except (BulkWriteError, DuplicateKeyError):
+            found, pairs = _resolve_conflicts(pairs)
+            existing.update(found)
+        if not pairs and not existing:
+            return [], [], skipped
+    return [], [(i, 'approval kept conflicting, please retry') for i in sub_ids], skipped
+
+
+def _approve_idempotent(pairs):
+    """
+    Standalone servers: insert, then mark approved, relying on the unique
+    source_submission_id so that repeating either step is harmless.
+    Returns: (approved [(sub id, slug)], failed [(sub id, error)], skipped [sub id])
+    """
+    # References are taken first: a crash can then only leak one, never free a photo still in use
+    acquire_photos([celeb.photo_filename for _, celeb in pairs])
+    approved, failed, surplus = [], [], []
+    for _ in range(MAX_ATTEMPTS):
+        try:
+            Celebrity._get_collection().insert_many([celeb.to_mongo() for _, celeb in pairs], ordered=False)
+            approved += [(sub.id, celeb.slug) for sub, celeb in pairs]
+            pairs = []
+            break
+        except BulkWriteError as e:
+            errors = {error['index']: error for error in e.details.get('writeErrors', [])}
+            approved += [(sub.id, celeb.slug) for i, (sub, celeb) in enumerate(pairs) if i not in errors]
+            duplicates = []
+            for i, error in errors.items():
+                if error.get('code') == DUPLICATE_KEY:
+                    duplicates.append(pairs[i])
+                else:
+                    failed.append(pairs[i])
+            existing, pairs = _resolve_conflicts(duplicates)
+            # Created by an interrupted approval, which already holds the photo reference
+            surplus += [celeb for sub, celeb in duplicates if sub.id in existing]
+            approved += list(existing.items())
+        if not pairs:
+            break
+    failed += pairs
+    for celeb in surplus + [celeb for _, celeb in failed]:
+        release_photo(celeb.photo_filename, current_app.config['UPLOAD_FOLDER'])
+
+    if approved:
+        CelebritySubmission.objects(id__in=[sub_id for sub_id, _ in approved], status='pending').update(set__status='approved')
+    return approved, [(sub.id, 'could not be inserted') for sub, _ in failed], []
+
+
+def approve_submissions(ids):
+    """
+    Turn the pending submissions among `ids` into celebrities.
+    Returns: dict with `approved` [(submission id, slug)], `skipped` [ids that are
+    missing or no longer pending] and `failed` [(submission id, error)]
+    """
+    ids = list(dict.fromkeys(ids))[:MAX_BULK]
+    subs = list(CelebritySubmission.objects(id__in=ids, status='pending'))
+    found = {sub.id for sub in subs}
+    report = {'approved': [], 'skipped': [i for i in ids if i not in found], 'failed': []}
+    if not subs:
+        return report
+
+    pairs = [(sub, celebrity_from_submission(sub)) for sub in subs]
+    _prepare(pairs)
+    approve = _approve_in_transaction if transactions_supported() else _approve_idempotent
+    approved, failed, skipped = approve(pairs)
+    report['approved'], report['failed'] = approved, failed
+    report['skipped'] += skipped
+
+    slugs = {slug for _, slug in approved}
+    for _, celeb in pairs:
+        if celeb.slug in slugs:
+            index_celebrity(celeb)
+    response_cache.invalidate(*[f'celebrity:{slug}' for slug in slugs])
+    return report
+
+
+def reject_submissions(ids):
+    """
+    Reject the pending submissions among `ids` with one update_many.
+    Returns: dict with the `rejected` count and `skipped` count (missing or no longer pending)
+    """
+    ids = list(dict.fromkeys(ids))[:MAX_BULK]
+    rejected = CelebritySubmission.objects(id__in=ids, status='pending').update(set__status='rejected')
+    return {'rejected': rejected, 'skipped': len(ids) - rejected}
@@ -1,8 +1,14 @@
 import os
 import base64
-import requests
-from datetime import datetime
+import hashlib
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
 from flask import Blueprint, request, jsonify
+from pymongo.errors import DuplicateKeyError
+
+from .integrations import mpesa_client
 
 mpesa_bp = Blueprint('mpesa', __name__)
 
@@ -13,9 +19,189 @@ PASSKEY = os.getenv("MPESA_PASSKEY")
 SHORTCODE = os.getenv("MPESA_SHORTCODE", "174379")  # Sandbox default
 CALLBACK_URL = os.getenv("MPESA_CALLBACK_URL")
 
+# Refresh this many seconds before Daraja says the token expires
+TOKEN_REFRESH_MARGIN = 120
+# How long one worker may spend refreshing before another may take over
+TOKEN_LEASE_SECONDS = 15
+
+
+def mpesa_base_url():
+    if os.getenv('MPESA_BASE_URL'):
+        # Explicit override, e.g. a local stand-in for Daraja in tests
+        return os.getenv('MPESA_BASE_URL').rstrip('/')
+    if os.getenv('MPESA_ENV', 'sandbox') == 'production':
+        return 'https://api.safaricom.co.ke'
+    return 'https://sandbox.safaricom.co.ke'
+
+
+def fetch_token():
+    """
+    Request a new OAuth token from Daraja.
+    Returns: (access_token, expires_at) with expires_at as a UTC datetime
+    """
+    url = f"{mpesa_base_url()}/oauth/v1/generate?grant_type=client_credentials"
+    r = mpesa_client.get(
+        url,
+        auth=(os.getenv('MPESA_CONSUMER_KEY'), os.getenv('MPESA_CONSUMER_SECRET')),
+        timeout=(3.05, 10),
+    )
+    r.raise_for_status()
+    data = r.json()
+    expires_in = int(data.get('expires_in') or 3599)
+    return data.get('access_token'), datetime.utcnow() + timedelta(seconds=expires_in)
+
+
+class MongoTokenStore:
+    """
+    Token shared by all workers in one document of the app database.
+    A short lease on the same document makes sure only one worker refreshes it.
+    """
+
+    COLLECTION = 'mpesa_tokens'
+
+    def __init__(self, key=None):
+        self._key = key
+
+    @property
+    def key(self):
+        if self._key:
+            return self._key
+        # One token per Daraja environment and app credentials
+        raw = f"{mpesa_base_url()}|{os.getenv('MPESA_CONSUMER_KEY', '')}"
+        return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+    @property
+    def collection(self):
+        from mongoengine.connection import get_db
+        return get_db()[self.COLLECTION]
+
+    def load(self):
+        doc = self.collection.find_one({'_id': self.key})
+        if doc and doc.get('access_token'):
+            return doc['access_token'], doc['expires_at']
+        return None
+
+    def save(self, token, expires_at):
+        self.collection.update_one(
+            {'_id': self.key},
+            {'$set': {'access_token': token, 'expires_at': expires_at}, '$unset': {'lease_until': '', 'lease_owner': ''}},
+            upsert=True,
+        )
+
+    def acquire_lease(self, owner, seconds):
+        """Returns True if this caller may refresh the token."""
+        now = datetime.utcnow()
+        try:
+            result = self.collection.update_one(
+                {'_id': self.key, '$or': [{'lease_until': {'$exists': False}}, {'lease_until': {'$lte': now}}]},
+                {'$set': {'lease_owner': owner, 'lease_until': now + timedelta(seconds=seconds)}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # The document exists and another worker holds the lease
+            return False
+        return result.modified_count == 1 or result.upserted_id is not None
+
+    def release_lease(self, owner):
+        self.collection.update_one(
+            {'_id': self.key, 'lease_owner': owner},
+            {'$unset': {'lease_until': '', 'lease_owner': ''}},
+        )
+
+    def clear(self):
+        self.collection.update_one({'_id': self.key}, {'$unset': {'access_token': '', 'expires_at': ''}})
+
+
+class TokenProvider:
+    """
+    Caches the Daraja access token until shortly before it expires.
+    Refreshes are single-flight: one thread per process (lock) and, with a
+    shared store, one worker across processes (lease); everyone else waits
+    for and reuses the new token instead of calling /oauth/v1/generate.
+    """
+
+    def __init__(self, fetch=fetch_token, store=None, margin=TOKEN_REFRESH_MARGIN, lease_seconds=TOKEN_LEASE_SECONDS):
+        self.fetch = fetch
+        self.store = store
+        self.margin = margin
+        self.lease_seconds = lease_seconds
+        self._token = None
+        self._expires_at = None
+        self._lock = threading.Lock()
+        self.fetches = 0
+
+    def _fresh(self, expires_at):
+        return expires_at is not None and expires_at - timedelta(seconds=self.margin) > datetime.utcnow()
+
+    def get_token(self):
+        token = self._token
+        if token and self._fresh(self._expires_at):
+            return token
+        with self._lock:
+            if self._token and self._fresh(self._expires_at):
+                return self._token
+            self._token, self._expires_at = self._refresh()
+            return self._token
+
+    def invalidate(self):
+        """Forget the cached token (e.g. after Daraja rejected it with 401)."""
+        with self._lock:
+            self._token = self._expires_at = None
+            if self.store is not None:
+                try:
+                    self.store.clear()
+                except Exception as e:
+                    print(f"⚠️  Could not clear shared M-Pesa token: {e}")
+
+    def _fetch(self):
+        self.fetches += 1
+        return self.fetch()
+
+    def _refresh(self):
+        if self.store is None:
+            return self._fetch()
+        # Only the store calls are guarded: a failing Daraja must not be blamed on
+        # the store, nor be called a second time
+        owner = uuid.uuid4().hex
+        try:
+            shared = self.store.load()
+            if shared and self._fresh(shared[1]):
+                return shared
+            leased = self.store.acquire_lease(owner, self.lease_seconds)
+        except Exception as e:
+            print(f"⚠️  Shared M-Pesa token store unavailable: {e}")
+            return self._fetch()
+
+        if leased:
+            try:
+                token, expires_at = self._fetch()
+                try:
+                    self.store.save(token, expires_at)
+                except Exception as e:
+                    print(f"⚠️  Could not share the new M-Pesa token: {e}")
+                return token, expires_at
+            finally:
+                try:
+                    self.store.release_lease(owner)
+                except Exception as e:
+                    print(f"⚠️  Could not release the M-Pesa token lease: {e}")
+
+        # Another worker is refreshing: wait for its token
+        deadline = time.monotonic() + self.lease_seconds
+        try:
+            while time.monotonic() < deadline:
+                time.sleep(0.1)
+                shared = self.store.load()
+                if shared and self._fresh(shared[1]):
+                    return shared
+        except Exception as e:
+            print(f"⚠️  Shared M-Pesa token store unavailable: {e}")
+        return self._fetch()
+
+
+token_provider = TokenProvider(store=MongoTokenStore() if os.getenv('MPESA_TOKEN_STORE', 'mongo') == 'mongo' else None)
+
+
 # Generate token
 def generate_token():
-    url = "https://sandbox.safaricom.co.ke/oauth/v1/generate?grant_type=client_credentials"
-    r = requests.get(url, auth=(CONSUMER_KEY, CONSUMER_SECRET))
-    return r.json().get("access_token")
-
+    return token_provider.get_token()
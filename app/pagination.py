@@ -0,0 +1,131 @@
+"""
+Keyset (cursor) pagination for MongoEngine querysets.
+Listings are ordered newest first by (created_at, id). A page is addressed by
+an opaque cursor holding the sort key of its boundary document, so fetching
+any page is an index range scan of page_size + 1 documents - never a skip.
+"""
+import base64
+import json
+from datetime import datetime
+
+from flask import request
+from mongoengine.queryset.visitor import Q
+
+from .ids import parse_id
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(doc):
+    """Encode the (created_at, id) sort key of `doc` as a URL-safe token."""
+    doc_id = doc.id if isinstance(doc.id, int) else str(doc.id)
+    raw = json.dumps([doc.created_at.isoformat(), doc_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a token produced by encode_cursor().
+    Returns: (created_at, id) tuple, or None if the token is missing or malformed
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, doc_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), parse_id(doc_id)
+    except (ValueError, TypeError):
+        return None
+
+
+class Page:
+    """One page of results plus the cursors needed to reach its neighbours."""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def page_query(queryset, after=None, before=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    The query paginate() runs for one page: `queryset` narrowed to the cursor,
+    ordered by the sort key and limited to page_size + 1 documents.
+    Returns: (queryset, backwards) - backwards is True when going towards newer documents
+    """
+    page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+    before_key = decode_cursor(before)
+    if before_key:
+        created_at, doc_id = before_key
+        queryset = queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=doc_id))
+        return queryset.order_by('created_at', 'id').limit(page_size + 1), True
+
+    after_key = decode_cursor(after)
+    if after_key:
+        created_at, doc_id = after_key
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=doc_id))
+    return queryset.order_by('-created_at', '-id').limit(page_size + 1), False
+
+
+def paginate(queryset, after=None, before=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Return a Page of `queryset` ordered by (-created_at, -id).
+    `after` continues towards older documents, `before` goes back towards newer ones.
+    One extra document is fetched to find out whether another page exists.
+    """
+    page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+    query, backwards = page_query(queryset, after=after, before=before, page_size=page_size)
+    rows = list(query)
+    has_more = len(rows) > page_size
+
+    if backwards:
+        items = rows[:page_size][::-1]
+        prev_cursor = encode_cursor(items[0]) if has_more and items else None
+        next_cursor = encode_cursor(items[-1]) if items else None
+        return Page(items, next_cursor=next_cursor, prev_cursor=prev_cursor)
+
+    items = rows[:page_size]
+    next_cursor = encode_cursor(items[-1]) if has_more else None
+    prev_cursor = encode_cursor(items[0]) if decode_cursor(after) and items else None
+    return Page(items, next_cursor=next_cursor, prev_cursor=prev_cursor)
+
+
+def paginate_list(items, offset=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Return a Page of an in-memory list, such as ranked search hits.
+    Cursors are plain offsets into the list; a malformed one starts from the top.
+    """
+    page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+    try:
+        start = max(0, int(offset or 0))
+    except (TypeError, ValueError):
+        start = 0
+    next_cursor = str(start + page_size) if start + page_size < len(items) else None
+    prev_cursor = str(max(0, start - page_size)) if start else None
+    return Page(items[start:start + page_size], next_cursor=next_cursor, prev_cursor=prev_cursor)
+
+
+def paginate_request(queryset, page_size=DEFAULT_PAGE_SIZE):
+    """Paginate using the `after`, `before` and `per_page` query string arguments."""
+    per_page = request.args.get('per_page', type=int) or page_size
+    return paginate(
+        queryset,
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        page_size=per_page,
+    )
@@ -0,0 +1,54 @@
+"""
+Password hashing with a per-deployment algorithm and work factor.
+PASSWORD_HASH_METHOD takes a Werkzeug method string:
+  scrypt:<n>:<r>:<p>           e.g. scrypt:32768:8:1 (Werkzeug's default)
+  pbkdf2:<hash>:<iterations>   e.g. pbkdf2:sha256:600000
+Stored hashes carry the parameters they were made with; a hash made with
+other parameters is replaced on the user's next successful login.
+Use scripts/bench_password_hash.py to see what a setting costs per login.
+"""
+import os
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_METHOD = 'scrypt'
+
+_method = None  # normalised method string, e.g. 'scrypt:32768:8:1'
+
+
+def normalize_method(method):
+    """
+    Expand a method with defaulted parameters ('pbkdf2' -> 'pbkdf2:sha256:<iterations>').
+    Raises: ValueError for a method Werkzeug does not support
+    """
+    return generate_password_hash('probe', method=method).split('$', 1)[0]
+
+
+def configure(method=None):
+    """Set the hashing method (default: PASSWORD_HASH_METHOD or scrypt). Returns the normalised method."""
+    global _method
+    _method = normalize_method(method or os.getenv('PASSWORD_HASH_METHOD') or DEFAULT_METHOD)
+    return _method
+
+
+def current_method():
+    return _method or configure()
+
+
+def init_app(app):
+    app.config['PASSWORD_HASH_METHOD'] = configure(app.config.get('PASSWORD_HASH_METHOD'))
+
+
+def hash_password(password, method=None):
+    return generate_password_hash(password, method=method or current_method())
+
+
+def verify_password(password_hash, password):
+    return bool(password_hash) and check_password_hash(password_hash, password)
+
+
+def needs_rehash(password_hash, method=None):
+    """True if `password_hash` was not made with the configured method and parameters."""
+    if not password_hash or '$' not in password_hash:
+        return False
+    return password_hash.split('$', 1)[0] != (method or current_method())
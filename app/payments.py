@@ -0,0 +1,255 @@
+"""
+M-Pesa payments: STK push off the request thread and the payment state machine.
+/pay stores a Payment in state `initiated` and hands its ref to a small,
+bounded thread pool; the pool talks to Daraja and moves the payment to
+`pushed` (prompt shown on the phone) or `failed`. The browser polls
+/pay/<ref>/status, so a slow Safaricom never holds a web worker.
+
+Every status change is one conditional update that only matches while the
+payment is in an allowed source state, so a transition is applied exactly
+once no matter how often Safaricom repeats a callback:
+
+  initiated -> pushed | paid | failed | expired
+  pushed    -> paid | failed | expired
+  expired   -> paid    (a success reported after the timeout: the customer was charged)
+  paid, failed are final
+"""
+import base64
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+from urllib3.exceptions import NewConnectionError
+
+from .integrations import mpesa_client
+from .models import Payment, Celebrity
+from .mpesa import token_provider, mpesa_base_url
+
+PUSH_WORKERS = int(os.getenv('MPESA_PUSH_WORKERS', 4))
+# Pushes allowed to wait for a free pool thread; beyond this /pay answers 503
+PUSH_QUEUE_SIZE = int(os.getenv('MPESA_PUSH_QUEUE', 32))
+
+# Payments still unfinished after this long are settled by expire_stale_payments()
+PAYMENT_TIMEOUT_MINUTES = int(os.getenv('MPESA_PAYMENT_TIMEOUT_MINUTES', 15))
+FEATURE_DAYS = 30
+
+TRANSITIONS = {
+    'initiated': {'pushed', 'paid', 'failed', 'expired'},
+    'pushed': {'paid', 'failed', 'expired'},
+    'paid': set(),
+    'failed': set(),
+    'expired': {'paid'},
+}
+# Still waiting for M-Pesa; anything else is an outcome the customer can be shown
+OPEN_STATUSES = ('initiated', 'pushed')
+
+_executor = ThreadPoolExecutor(max_workers=PUSH_WORKERS, thread_name_prefix='stk-push')
+_slots = threading.BoundedSemaphore(PUSH_WORKERS + PUSH_QUEUE_SIZE)
+
+
+def stk_credentials():
+    """BusinessShortCode, Password and Timestamp fields shared by STK push and query requests."""
+    shortcode = os.getenv('MPESA_SHORTCODE')
+    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+    password = base64.b64encode(f"{shortcode}{os.getenv('MPESA_PASSKEY')}{timestamp}".encode()).decode('utf-8')
+    return {"BusinessShortCode": shortcode, "Password": password, "Timestamp": timestamp}
+
+
+def build_stk_payload(payment):
+    credentials = stk_credentials()
+    shortcode = credentials["BusinessShortCode"]
+    return {
+        **credentials,
+        "TransactionType": "CustomerPayBillOnline",
+        "Amount": payment.amount,
+        "PartyA": payment.phone,
+        "PartyB": shortcode,
+        "PhoneNumber": payment.phone,
+        "CallBackURL": os.getenv('MPESA_CALLBACK_URL'),
+        "AccountReference": payment.ref,  # M-Pesa returns this in metadata
+        "TransactionDesc": f"Payment for {payment.celebrity_slug}",
+    }
+
+
+def _sources(status):
+    return [source for source, targets in TRANSITIONS.items() if status in targets]
+
+
+def transition(lookup, status, **fields):
+    """
+    Atomically move the payment matching `lookup` (e.g. {'ref': ...} or
+    {'checkout_request_id': ...}) to `status`, setting `fields` as well.
+    Returns: the updated Payment, or None if it was not in a state that allows the move
+    """
+    updates = {f"set__{name}": value for name, value in fields.items()}
+    return Payment.objects(status__in=_sources(status), **lookup).modify(
+        new=True, set__status=status, set__updated_at=datetime.utcnow(), **updates
+    )
+
+
+def fail_payment(lookup, **fields):
+    """Move a payment to `failed` and release the celebrity waiting on it. Returns the Payment or None."""
+    payment = transition(lookup, 'failed', **fields)
+    if payment is not None:
+        release_pending_celebrity(payment)
+    return payment
+
+
+def _never_sent(error):
+    """True if a failed request provably never reached the server (no connection was made)."""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if isinstance(error, requests.ConnectionError) and error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def _leave_open(ref):
+    """The push may have reached Safaricom: keep the payment open for its callback or reconciliation."""
+    Payment.objects(ref=ref, status='initiated').update_one(set__result_desc='Waiting for M-Pesa to confirm')
+
+
+def push_stk(ref):
+    """
+    Send the STK push for payment `ref` and record whether Daraja accepted it.
+    The payment fails only when Daraja rejects the push or was never reached;
+    if the outcome is unknown (e.g. a read timeout) it stays open for the
+    callback or for reconciliation.
+    """
+    payment = Payment.objects(ref=ref).first()
+    if payment is None or payment.status != 'initiated':
+        return
+    process_url = f"{mpesa_base_url()}/mpesa/stkpush/v1/processrequest"
+    payload = build_stk_payload(payment)
+    try:
+        headers = {"Authorization": f"Bearer {token_provider.get_token()}", "Content-Type": "application/json"}
+    except Exception as e:
+        print(f"❌ STK push for {ref} failed, no access token: {e}")
+        fail_payment({'ref': ref}, result_desc='Could not reach M-Pesa, please try again')
+        return
+    try:
+        res = mpesa_client.post(process_url, json=payload, headers=headers, timeout=(3.05, 15))
+        if res.status_code == 401:
+            # Token revoked or expired early: fetch a new one and try once more
+            token_provider.invalidate()
+            headers["Authorization"] = f"Bearer {token_provider.get_token()}"
+            res = mpesa_client.post(process_url, json=payload, headers=headers, timeout=(3.05, 15))
+    except Exception as e:
+        if isinstance(e, requests.RequestException) and not _never_sent(e):
+            print(f"⚠️  STK push for {ref} has no answer, leaving it open: {e}")
+            _leave_open(ref)
+            return
+        print(f"❌ STK push for {ref} failed: {e}")
+        fail_payment({'ref': ref}, result_desc='Could not reach M-Pesa, please try again')
+        return
+
+    try:
+        data = res.json()
+    except ValueError:
+        data = {}
+    if str(data.get('ResponseCode')) == '0':
+        transition({'ref': ref}, 'pushed', checkout_request_id=data.get('CheckoutRequestID'),
+                   result_desc=data.get('CustomerMessage') or data.get('ResponseDescription'))
+    elif 'ResponseCode' in data or (400 <= res.status_code < 500 and data.get('errorCode')):
+        fail_payment({'ref': ref}, result_desc=data.get('errorMessage') or data.get('ResponseDescription') or 'STK push rejected')
+    else:
+        # e.g. a 5xx page from a gateway: Safaricom may still have sent the prompt
+        print(f"⚠️  STK push for {ref} got an unclear answer (HTTP {res.status_code}), leaving it open")
+        _leave_open(ref)
+
+
+def submit_push(app, ref):
+    """
+    Queue the STK push for `ref` on the background pool.
+    Returns: False when the pool is saturated (the caller should answer 503)
+    """
+    if not _slots.acquire(blocking=False):
+        return False
+
+    def run():
+        try:
+            with app.app_context():
+                push_stk(ref)
+        except Exception as e:
+            print(f"❌ Could not record STK push result for {ref}: {e}")
+        finally:
+            _slots.release()
+
+    _executor.submit(run)
+    return True
+
+
+def _metadata(stk_callback):
+    items = stk_callback.get('CallbackMetadata', {}).get('Item', [])
+    return {item.get('Name'): item.get('Value') for item in items}
+
+
+def process_callback(stk_callback):
+    """
+    Apply one `stkCallback` body from Daraja.
+    Looks the payment up by CheckoutRequestID, falling back to our
+    AccountReference. Repeated callbacks match no payment and change nothing.
+    Returns: the Payment that changed state, or None for a duplicate/unknown callback
+    """
+    metadata = _metadata(stk_callback)
+    result_code = stk_callback.get('ResultCode', -1)
+    checkout_request_id = stk_callback.get('CheckoutRequestID')
+    ref = metadata.get('AccountReference')
+    fields = {'result_code': int(result_code), 'result_desc': stk_callback.get('ResultDesc', 'Unknown')}
+
+    if int(result_code) != 0:
+        payment = _callback_transition('failed', ref, checkout_request_id, **fields)
+        if payment is not None:
+            release_pending_celebrity(payment)
+        return payment
+
+    fields.update(paid_at=datetime.utcnow())
+    if metadata.get('MpesaReceiptNumber'):
+        fields['mpesa_receipt'] = str(metadata['MpesaReceiptNumber'])
+    payment = _callback_transition('paid', ref, checkout_request_id, **fields)
+    if payment is not None:
+        feature_paid_celebrity(payment)
+    return payment
+
+
+def _callback_transition(status, ref, checkout_request_id, **fields):
+    payment = None
+    if checkout_request_id:
+        payment = transition({'checkout_request_id': checkout_request_id}, status, **fields)
+    if payment is None and ref:
+        # The push result (and with it the CheckoutRequestID) may not be recorded yet
+        payment = transition({'ref': ref}, status, **fields)
+    return payment
+
+
+def feature_paid_celebrity(payment):
+    """Feature the celebrity a paid payment was for. Runs once per payment (after its `paid` transition)."""
+    celeb = Celebrity.objects(slug=payment.celebrity_slug).first() if payment.celebrity_slug else None
+    if celeb is None:
+        print(f"⚠️  No celebrity found for payment_ref={payment.ref}")
+        return None
+    celeb.mark_featured(days=FEATURE_DAYS, payment_id=payment.ref, amount=payment.amount or 500)
+    print(f"✓ Celebrity '{celeb.name}' marked as featured")
+    return celeb
+
+
+def release_pending_celebrity(payment):
+    """Clear the celebrity's `pending` feature status if it still points at this unsuccessful payment."""
+    if payment.celebrity_slug:
+        Celebrity.objects(slug=payment.celebrity_slug, feature_payment_id=payment.ref, feature_status='pending').update_one(
+            set__feature_status='failed'
+        )
+
+
+def expire_stale_payments(older_than_minutes=PAYMENT_TIMEOUT_MINUTES):
+    """
+    Settle payments still open after the timeout. Each goes through
+    reconcile.reconcile_payment(): a pushed payment is checked with the STK
+    status query and closed only on M-Pesa's final answer; a payment that
+    never reached Safaricom is expired.
+    Returns: the number of payments settled
+    """
+    from .reconcile import reconcile
+    summary = reconcile(older_than_minutes=older_than_minutes, timeout_minutes=older_than_minutes)
+    return summary['paid'] + summary['failed'] + summary['expired']
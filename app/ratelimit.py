@@ -0,0 +1,142 @@
+"""
+Sliding-window rate limiting for the login and signup forms.
+Attempts are counted per client IP and per username. Each key keeps only
+two counters (this window and the previous one); the previous count is
+weighted by how much of it still overlaps the sliding window, which
+approximates a true sliding log in O(1) memory per key.
+
+Backends (RATE_LIMIT_BACKEND):
+  memory - per process, at most RATE_LIMIT_MAX_KEYS keys (LRU) (default)
+  mongo  - shared by all workers through a TTL-indexed collection
+  none   - disabled
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+
+
+def _weighted(previous, current, now, window):
+    elapsed = (now % window) / window
+    return previous * (1 - elapsed) + current
+
+
+class MemoryRateLimiter:
+    """In-process sliding-window counters with a bounded number of keys."""
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._counters = OrderedDict()  # key -> [window index, previous count, current count]
+        self._lock = threading.Lock()
+
+    def hit(self, key, limit, window):
+        """Count one attempt. Returns the estimated attempts in the sliding window, including this one."""
+        now = time.time()
+        index = int(now // window)
+        with self._lock:
+            entry = self._counters.get(key)
+            if entry is None or entry[0] < index - 1:
+                entry = [index, 0, 0]
+            elif entry[0] == index - 1:
+                entry = [index, entry[2], 0]
+            entry[2] += 1
+            self._counters[key] = entry
+            self._counters.move_to_end(key)
+            while len(self._counters) > self.max_keys:
+                self._counters.popitem(last=False)
+            return _weighted(entry[1], entry[2], now, window)
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+
+
+class MongoRateLimiter:
+    """Sliding-window counters shared by all workers; expired windows are removed by a TTL index."""
+
+    COLLECTION = 'rate_limits'
+
+    def __init__(self):
+        self._indexed = False
+
+    @property
+    def collection(self):
+        from mongoengine.connection import get_db
+        collection = get_db()[self.COLLECTION]
+        if not self._indexed:
+            collection.create_index('expires_at', expireAfterSeconds=0)
+            self._indexed = True
+        return collection
+
+    def hit(self, key, limit, window):
+        now = time.time()
+        index = int(now // window)
+        current = self.collection.find_one_and_update(
+            {'_id': f"{key}|{window}|{index}"},
+            {'$inc': {'count': 1}, '$setOnInsert': {
+                'expires_at': datetime.utcnow() + timedelta(seconds=2 * window),
+            }},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        previous = self.collection.find_one({'_id': f"{key}|{window}|{index - 1}"}) or {}
+        return _weighted(previous.get('count', 0), current['count'], now, window)
+
+    def clear(self):
+        self.collection.delete_many({})
+
+
+class LoginThrottle:
+    """Rejects login/signup attempts beyond per-IP and per-username limits."""
+
+    def __init__(self):
+        self.backend = None
+        self.per_ip = 20
+        self.per_username = 10
+        self.window = 300
+        self.rejected = 0
+
+    def init_app(self, app):
+        app.config.setdefault('RATE_LIMIT_BACKEND', 'memory')
+        app.config.setdefault('RATE_LIMIT_MAX_KEYS', 10000)
+        app.config.setdefault('LOGIN_LIMIT_PER_IP', 20)
+        app.config.setdefault('LOGIN_LIMIT_PER_USERNAME', 10)
+        app.config.setdefault('LOGIN_LIMIT_WINDOW', 300)
+        self.per_ip = int(app.config['LOGIN_LIMIT_PER_IP'])
+        self.per_username = int(app.config['LOGIN_LIMIT_PER_USERNAME'])
+        self.window = int(app.config['LOGIN_LIMIT_WINDOW'])
+        kind = app.config['RATE_LIMIT_BACKEND']
+        if kind == 'mongo':
+            self.backend = MongoRateLimiter()
+        elif kind == 'memory':
+            self.backend = MemoryRateLimiter(int(app.config['RATE_LIMIT_MAX_KEYS']))
+        else:
+            self.backend = None
+
+    def check(self, scope, ip, username):
+        """
+        Count an attempt on `scope` (e.g. 'login') and decide whether to allow it.
+        Call before any user lookup or password hashing.
+        Returns: seconds the client should wait, or None if the attempt may proceed
+        """
+        if self.backend is None:
+            return None
+        rules = [(f"{scope}:ip:{ip}", self.per_ip)]
+        if username:
+            rules.append((f"{scope}:user:{username.strip().lower()}", self.per_username))
+        try:
+            over = any(self.backend.hit(key, limit, self.window) > limit for key, limit in rules)
+        except Exception as e:
+            # Never lock everyone out because the shared store is unavailable
+            print(f"⚠️  Rate limiter unavailable: {e}")
+            return None
+        if not over:
+            return None
+        self.rejected += 1
+        return int(math.ceil(self.window - time.time() % self.window))
+
+
+login_throttle = LoginThrottle()
@@ -0,0 +1,145 @@
+"""
+Reconcile payments whose M-Pesa callback never arrived.
+Stale `initiated`/`pushed` payments are read in batches (oldest first, keyset
+on created_at/id) and each one is checked with Daraja's STK push query API.
+Calls run on a small thread pool behind one shared rate limiter. Final
+results go through payments.process_callback(), so a payment settled by a
+late callback in the meantime is left alone and running the job twice
+changes nothing.
+"""
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from mongoengine.queryset.visitor import Q
+
+from .integrations import mpesa_client, RateLimiter
+from .models import Payment
+from .mpesa import token_provider, mpesa_base_url
+from .payments import stk_credentials, process_callback, transition, release_pending_celebrity
+from .payments import OPEN_STATUSES, PAYMENT_TIMEOUT_MINUTES
+
+# STK query ResultCodes that end a transaction without payment. Any other
+# non-zero code (e.g. 4999 "still under processing") leaves the payment open.
+FAILED_RESULT_CODES = {
+    1,     # insufficient balance
+    1001,  # another transaction is in progress for the subscriber
+    1019,  # transaction expired
+    1025,  # error sending the push request
+    1032,  # cancelled by the user
+    1037,  # phone unreachable / no response from the user
+    2001,  # wrong PIN
+    9999,  # error sending the push request
+}
+
+
+def query_stk_status(checkout_request_id):
+    """
+    Ask Daraja for the outcome of one STK push.
+    Returns: the response JSON; it has a ResultCode once the transaction is final
+    """
+    headers = {"Authorization": f"Bearer {token_provider.get_token()}", "Content-Type": "application/json"}
+    res = mpesa_client.post(
+        f"{mpesa_base_url()}/mpesa/stkpushquery/v1/query",
+        json={**stk_credentials(), "CheckoutRequestID": checkout_request_id},
+        headers=headers, timeout=(3.05, 15),
+    )
+    if res.status_code == 401:
+        token_provider.invalidate()
+        raise RuntimeError('M-Pesa rejected the access token')
+    return res.json()
+
+
+def reconcile_payment(payment, timeout_minutes=PAYMENT_TIMEOUT_MINUTES, dry_run=False, limiter=None):
+    """
+    Settle one stale payment.
+    Returns: outcome name - paid, failed, expired, pending, skipped or error
+    """
+    if not payment.checkout_request_id:
+        # The push never reached Safaricom; there is nothing to ask about
+        if payment.created_at > datetime.utcnow() - timedelta(minutes=timeout_minutes):
+            return 'pending'
+        if dry_run:
+            return 'expired'
+        expired = transition({'ref': payment.ref}, 'expired', result_desc='STK push was never sent')
+        if expired is not None:
+            release_pending_celebrity(expired)
+        return 'expired' if expired is not None else 'skipped'
+
+    if limiter is not None:
+        limiter.acquire()
+    try:
+        data = query_stk_status(payment.checkout_request_id)
+    except Exception as e:
+        print(f"⚠️  Status query for {payment.ref} failed: {e}")
+        return 'error'
+
+    try:
+        result_code = int(data['ResultCode'])
+    except (KeyError, TypeError, ValueError):
+        # e.g. errorCode 500.001.1001 "The transaction is being processed"
+        return 'pending'
+    if result_code != 0 and result_code not in FAILED_RESULT_CODES:
+        return 'pending'  # not final yet (e.g. 4999), or a code we cannot interpret
+    paid = result_code == 0
+    if dry_run:
+        return 'paid' if paid else 'failed'
+    settled = process_callback({
+        'CheckoutRequestID': payment.checkout_request_id,
+        'ResultCode': result_code,
+        'ResultDesc': data.get('ResultDesc', 'Reconciled'),
+    })
+    if settled is None:
+        return 'skipped'  # settled by a callback in the meantime
+    return 'paid' if paid else 'failed'
+
+
+def stale_query(cutoff, batch_size, last=None):
+    """One batch of open payments created before `cutoff`, continuing after the payment `last`."""
+    queryset = Payment.objects(status__in=OPEN_STATUSES, created_at__lt=cutoff)
+    if last is not None:
+        queryset = queryset.filter(Q(created_at__gt=last.created_at) | Q(created_at=last.created_at, id__gt=last.id))
+    return queryset.order_by('created_at', 'id').limit(batch_size)
+
+
+def stale_payments(older_than_minutes, batch_size):
+    """Yield lists of open payments created more than `older_than_minutes` ago, oldest first."""
+    cutoff = datetime.utcnow() - timedelta(minutes=older_than_minutes)
+    last = None
+    while True:
+        batch = list(stale_query(cutoff, batch_size, last))
+        if not batch:
+            return
+        yield batch
+        last = batch[-1]
+
+
+def reconcile(older_than_minutes=5, batch_size=100, concurrency=4, rate=5.0, dry_run=False,
+              timeout_minutes=PAYMENT_TIMEOUT_MINUTES):
+    """
+    Reconcile every stale open payment.
+    `rate` caps status queries per second across all `concurrency` threads.
+    Returns: Counter of outcomes plus `scanned`
+    """
+    limiter = RateLimiter(rate, burst=concurrency)
+    summary = Counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='reconcile') as pool:
+        for batch in stale_payments(older_than_minutes, batch_size):
+            summary['scanned'] += len(batch)
+            outcomes = pool.map(
+                lambda p: reconcile_payment(p, timeout_minutes=timeout_minutes, dry_run=dry_run, limiter=limiter),
+                batch,
+            )
+            summary.update(outcomes)
+    return summary
+
+
+def print_summary(summary, dry_run=False):
+    prefix = 'Would settle' if dry_run else 'Settled'
+    print(f"Scanned {summary['scanned']} stale payment(s)")
+    print(f"{prefix}: {summary['paid']} paid, {summary['failed']} failed, {summary['expired']} expired")
+    print(f"Still pending at M-Pesa: {summary['pending']}")
+    if summary['skipped']:
+        print(f"Already settled meanwhile: {summary['skipped']}")
+    if summary['error']:
+        print(f"✗ Query errors: {summary['error']}")
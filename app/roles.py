@@ -0,0 +1,91 @@
+"""
+Roles and admin access.
+A user's roles are the `roles` list stored on the User, plus `admin` for
+users flagged `is_admin` or listed in ADMIN_USERNAMES. The allow-list is
+parsed once into a frozenset when the app starts and re-read (from the
+environment and instance/.env) on SIGHUP, so role checks are a set lookup.
+
+  @role_required('admin')      # or the admin_required shortcut in routes.py
+"""
+import os
+import signal
+from functools import wraps
+
+from dotenv import load_dotenv
+from flask import flash, redirect, url_for, abort
+from flask_login import current_user
+
+ADMIN_ROLE = 'admin'
+ENV_FILE = os.path.join(os.path.dirname(__file__), '..', 'instance', '.env')
+
+_admin_usernames = frozenset()
+
+
+def parse_allow_list(value):
+    return frozenset(u.strip() for u in (value or '').split(',') if u.strip())
+
+
+def load_allow_list():
+    """Read ADMIN_USERNAMES into the allow-list. Returns the new frozenset."""
+    global _admin_usernames
+    _admin_usernames = parse_allow_list(os.getenv('ADMIN_USERNAMES', 'admin'))
+    return _admin_usernames
+
+
+def reload_allow_list(signum=None, frame=None):
+    """SIGHUP handler: pick up an edited instance/.env without a restart."""
+    load_dotenv(dotenv_path=ENV_FILE, override=True)
+    allowed = load_allow_list()
+    print(f"🔄 Admin allow-list reloaded ({len(allowed)} user(s))")
+
+
+def admin_usernames():
+    return _admin_usernames
+
+
+def init_app(app):
+    load_allow_list()
+    if hasattr(signal, 'SIGHUP'):
+        try:
+            signal.signal(signal.SIGHUP, reload_allow_list)
+        except ValueError:
+            # Not the main thread (e.g. some test runners); reload stays manual
+            pass
+
+
+def user_roles(user):
+    """All roles of `user` as a frozenset."""
+    if user is None or not getattr(user, 'is_authenticated', False):
+        return frozenset()
+    roles = frozenset(getattr(user, 'roles', None) or ())
+    if getattr(user, 'is_admin', False) or getattr(user, 'username', None) in _admin_usernames:
+        roles |= {ADMIN_ROLE}
+    return roles
+
+
+def has_role(user, role):
+    return role in user_roles(user)
+
+
+def role_required(*roles):
+    """Allow the view only to logged-in users holding at least one of `roles`."""
+    required = frozenset(roles)
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not current_user.is_authenticated:
+                flash('Please log in first', 'danger')
+                return redirect(url_for('admin.login'))
+            if not required & user_roles(current_user):
+                flash('You are not authorized to access the admin panel', 'danger')
+                abort(403)
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+
+def users_with_role(role):
+    """Users holding `role` explicitly (served by the `roles` index)."""
+    from .models import User
+    return User.objects(roles=role)
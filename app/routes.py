@@ -1,57 +1,65 @@
 import os
 import re
-from flask import Blueprint, render_template, current_app, request, redirect, url_for, flash
-from .models import Celebrity, User, CelebritySubmission, OnboardingRegistration, USE_MONGO
+import hashlib
+from flask import Blueprint, render_template, current_app, request, redirect, url_for, flash, make_response, send_from_directory, jsonify
+from .models import Celebrity, User, CelebritySubmission, OnboardingRegistration, Payment, USE_MONGO
 from . import DB, login_manager, ME, csrf
 from flask_login import login_user, login_required, logout_user, current_user
 from flask import abort
-from werkzeug.utils import secure_filename
 from .forms import LoginForm, SignupForm, CelebrityForm ,DeleteCelebrityForm,FeaturedForm,ContactForm,CelebritySubmissionForm,OnboardingForm
 from flask_mail import Message
 from app import mail
 from .utils import extract_youtube_id, extract_tiktok_id, extract_spotify_id
-from functools import wraps
+from .pagination import paginate_request, paginate_list
+from .ids import parse_id
+from .cache import response_cache, cache_tags_for
+from .images import is_content_addressed
+from .storage import store_photo, release_photo
+from .mailer import queue_email
+from .integrations import integration_metrics
+from .featured import active_featured
+from .auth import load_user_document, user_cache_metrics
+from .roles import role_required, has_role, ADMIN_ROLE
+from .ratelimit import login_throttle
+from .payments import submit_push, fail_payment, process_callback, OPEN_STATUSES
+from .search import search_celebrities, search_metrics
+from .moderation import approve_submissions, reject_submissions, MAX_BULK
 
 ALLOWED_EXT = {'png','jpg','jpeg','gif'}
+HOMEPAGE_PAGE_SIZE = 24
+ADMIN_PAGE_SIZE = 50
+MEDIA_MAX_AGE = 365 * 24 * 3600  # content-addressed files never change
 
 # Admin-required decorator
-def admin_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if not current_user.is_authenticated:
-            flash('Please log in first', 'danger')
-            return redirect(url_for('admin.login'))
-        # Check if user is admin or in ADMIN_USERNAMES
-        allowed_admins = [u.strip() for u in os.getenv('ADMIN_USERNAMES', 'admin').split(',') if u.strip()]
-        is_admin = getattr(current_user, 'is_admin', False) or current_user.username in allowed_admins
-        if not is_admin:
-            flash('You are not authorized to access the admin panel', 'danger')
-            abort(403)
-        return f(*args, **kwargs)
-    return decorated_function
+# Admin flag, `admin` role or ADMIN_USERNAMES (see roles.py)
+admin_required = role_required(ADMIN_ROLE)
 
 # Database abstraction helpers for dual-mode support
 def save_object(obj):
     """Save object to database (works for both MongoEngine and SQLAlchemy)"""
+    tags = cache_tags_for(obj)
     if USE_MONGO:
         obj.save()
     else:
         DB.session.add(obj)
         DB.session.commit()
+    response_cache.invalidate(*tags)
 
 def delete_object(obj):
     """Delete object from database (works for both MongoEngine and SQLAlchemy)"""
+    tags = cache_tags_for(obj)
     if USE_MONGO:
         obj.delete()
     else:
         DB.session.delete(obj)
         DB.session.commit()
+    response_cache.invalidate(*tags)
 
 # Query helper methods
 def get_user_by_id(user_id):
     """Get user by ID (works for both database modes)"""
     if USE_MONGO:
-        return User.objects(pk=int(user_id)).first()
+        return User.objects(pk=parse_id(user_id)).first()
     else:
         return User.query.get(int(user_id))
 
@@ -76,10 +84,25 @@ def get_celebrity_by_slug(slug):
     else:
         return Celebrity.query.filter_by(slug=slug).first()
 
+def get_celebrities_by_ids(ids):
+    """Get celebrities by id, in the order of `ids` (ids that no longer exist are skipped)"""
+    if USE_MONGO:
+        found = {c.id: c for c in Celebrity.objects(id__in=ids)}
+    else:
+        found = {c.id: c for c in Celebrity.query.filter(Celebrity.id.in_(ids))}
+    return [found[i] for i in ids if i in found]
+
+def get_celebrity_version_by_slug(slug):
+    """Get only the id/version/timestamps of a celebrity, for conditional GETs"""
+    if USE_MONGO:
+        return Celebrity.objects(slug=slug).only('id', 'version', 'updated_at', 'created_at').first()
+    else:
+        return Celebrity.query.filter_by(slug=slug).first()
+
 def get_celebrity_submissions_pending():
     """Get all pending celebrity submissions (works for both database modes)"""
     if USE_MONGO:
-        return CelebritySubmission.objects(status="pending").order_by('-created_at')
+        return CelebritySubmission.objects(status="pending")
     else:
         return CelebritySubmission.query.filter_by(status="pending").order_by(CelebritySubmission.created_at.desc()).all()
 
@@ -91,79 +114,131 @@ def get_submission_by_id(submission_id):
         return CelebritySubmission.query.get(submission_id)
 
 def get_featured_celebrities():
-    """Get all featured celebrities (works for both database modes)"""
+    """Get all featured celebrities whose listing has not expired (works for both database modes)"""
     if USE_MONGO:
-        return Celebrity.objects(featured=True)
+        return active_featured()
     else:
         return Celebrity.query.filter_by(featured=True).all()
 
+def search_featured_celebrities(q=None):
+    """Featured celebrities, optionally matched by name; filtering runs in the database and pagination adds the ordering"""
+    if USE_MONGO:
+        celebs = active_featured()
+        if q:
+            celebs = celebs.filter(name__icontains=q)
+        return celebs
+    else:
+        query = Celebrity.query.filter_by(featured=True)
+        if q:
+            query = query.filter(Celebrity.name.ilike(f'%{q}%'))
+        return query
+
 def get_onboarding_registrations_all():
     """Get all onboarding registrations (works for both database modes)"""
     if USE_MONGO:
-        return OnboardingRegistration.objects.order_by('-created_at')
+        return OnboardingRegistration.objects
     else:
         return OnboardingRegistration.query.order_by(OnboardingRegistration.created_at.desc()).all()
 
+def get_payment_by_ref(payment_ref):
+    """Get the status fields of a payment by its reference"""
+    return Payment.objects(ref=payment_ref).only('ref', 'user_id', 'status', 'result_desc').first()
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.',1)[1].lower() in ALLOWED_EXT
 
 
-def generate_unique_slug(name):
-    # Basic slugify
-    base = re.sub(r'[^a-z0-9]+', '-', (name or '').lower()).strip('-') or 'celeb'
-    candidate = base
-    idx = 1
-    # Query existing slugs that start with base
-    if USE_MONGO:
-        existing = {s.slug for s in Celebrity.objects(slug__startswith=base).only('slug')}
-    else:
-        existing = {s.slug for s in Celebrity.query.filter(Celebrity.slug.like(f'{base}%')).all()}
-    while candidate in existing:
-        idx += 1
-        candidate = f"{base}-{idx}"
-    return candidate
+def save_uploaded_photo(file_storage):
+    """Store an upload (content-addressed, one reference taken); returns the filename, or None (with a flash) if it is not an image"""
+    try:
+        return store_photo(file_storage, current_app.config['UPLOAD_FOLDER'])
+    except ValueError as e:
+        flash(str(e), 'danger')
+        return None
+
 
 main_bp = Blueprint('main', __name__)
 admin_bp = Blueprint('admin', __name__)
 
+def too_many_attempts(template, form, retry_after):
+    """429 response for a throttled login or signup form (checked before any user lookup)."""
+    flash(f'Too many attempts. Please try again in {retry_after} seconds.', 'danger')
+    response = make_response(render_template(template, form=form), 429)
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
 @login_manager.user_loader
 def load_user(user_id):
     try:
-        return get_user_by_id(user_id)
+        # Cached and without password_hash; see auth.py
+        return load_user_document(user_id)
     except Exception:
         return None
 
 @main_bp.route('/')
+@response_cache.cached(tags=['celebrity-list'])
 def index():
     q = request.args.get('q', '').strip()
 
-    # Base query: only featured celebrities
-    celebs_qs = get_featured_celebrities()
-
-    # If a search query exists, filter by name (but still featured only)
-    if q:
-        if USE_MONGO:
-            celebs_qs = [c for c in celebs_qs if q.lower() in c.name.lower()]
-        else:
-            celebs_qs = [c for c in celebs_qs if q.lower() in c.name.lower()]
-
-    # Order featured ones by newest first
-    if USE_MONGO:
-        celebs = sorted(celebs_qs, key=lambda x: x.created_at, reverse=True)
-    else:
-        celebs = sorted(celebs_qs, key=lambda x: x.created_at, reverse=True)
+    # Featured celebrities matching the search, newest first, one page per query
+    celebs = paginate_request(search_featured_celebrities(q), page_size=HOMEPAGE_PAGE_SIZE)
 
     # Provide login/signup forms on the homepage for quick access
     login_form = LoginForm()
     signup_form = SignupForm()
     return render_template('index.html', celebs=celebs, q=q, login_form=login_form, signup_form=signup_form)
 
+@main_bp.route('/search')
+def search():
+    # Ranked results come from this worker's index, so the page is not response-cached
+    q = request.args.get('q', '').strip()
+    hits = search_celebrities(q) if q else []
+    page = paginate_list(hits, request.args.get('after') or request.args.get('before'),
+                         page_size=request.args.get('per_page', type=int) or HOMEPAGE_PAGE_SIZE)
+    page.items = get_celebrities_by_ids(page.items)
+    return render_template('search.html', celebs=page, q=q, total=len(hits))
+
 @main_bp.route('/celebrity/<slug>')
+@response_cache.cached(tags=lambda slug: [f'celebrity:{slug}', 'celebrity-profiles'])
 def profile(slug):
+    # Conditional GET: compare validators from a small projection before loading and rendering
+    if request.if_none_match or request.if_modified_since:
+        stamp = get_celebrity_version_by_slug(slug)
+        if stamp:
+            response = set_profile_validators(current_app.response_class(), stamp)
+            response.make_conditional(request)
+            if response.status_code == 304:
+                return response
+
     celeb = get_celebrity_by_slug(slug)
     if not celeb:
         abort(404)
-    return render_template('profile.html', celeb=celeb)
+    response = make_response(render_template('profile.html', celeb=celeb))
+    return set_profile_validators(response, celeb).make_conditional(request)
+
+def set_profile_validators(response, celeb):
+    """
+    Weak ETag from the celebrity's content version (and auth state, which the page shows), plus Last-Modified.
+    Weak and private: the page embeds a per-session CSRF token, so it is never byte-identical
+    across sessions and must not be revalidated or served by a shared cache.
+    """
+    auth = current_user.get_id() if current_user.is_authenticated else 'anon'
+    response.set_etag(hashlib.sha1(f"{celeb.id}:{celeb.version or 0}:{auth}".encode()).hexdigest(), weak=True)
+    if celeb.last_modified:
+        response.last_modified = celeb.last_modified
+    response.cache_control.no_cache = True
+    response.cache_control.private = True
+    return response
+
+@main_bp.route('/media/<filename>')
+def media(filename):
+    """Serve content-addressed uploads; the name changes whenever the content does, so they are cached forever"""
+    if not is_content_addressed(filename):
+        abort(404)
+    response = send_from_directory(current_app.config['UPLOAD_FOLDER'], filename, max_age=MEDIA_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
 
 # User Authentication Routes
 @main_bp.route('/signup', methods=['GET', 'POST'])
@@ -172,6 +247,9 @@ def signup():
     from .forms import SignupForm
     form = SignupForm()
     if form.validate_on_submit():
+        retry_after = login_throttle.check('signup', request.remote_addr, form.email.data)
+        if retry_after:
+            return too_many_attempts('signup.html', form, retry_after)
         # Check if email already exists
         existing_email = get_user_by_username(form.email.data)
         if existing_email:
@@ -202,8 +280,12 @@ def user_login():
     from .forms import LoginForm
     form = LoginForm()
     if form.validate_on_submit():
+        retry_after = login_throttle.check('login', request.remote_addr, form.username.data)
+        if retry_after:
+            return too_many_attempts('user/login.html', form, retry_after)
         user = get_user_by_username(form.username.data)
         if user and user.check_password(form.password.data):
+            user.rehash_password_if_needed(form.password.data)
             # Make sure it's not an admin-only account
             if user.is_admin is False:
                 login_user(user)
@@ -233,8 +315,7 @@ def login():
 @login_required
 def logout():
             # Only allow users flagged as admin or listed in ADMIN_USERNAMES
-            allowed = [u.strip() for u in os.getenv('ADMIN_USERNAMES', 'admin').split(',') if u.strip()]
-            if getattr(user, 'is_admin', False) or user.username in allowed:
+            if has_role(user, ADMIN_ROLE):
                 login_user(user)
                 flash('Logged in successfully', 'success')
                 return redirect(url_for('admin.dashboard'))
@@ -249,15 +330,18 @@ def user_dashboard():
 def featured():
     return render_template('featured.html')
 @main_bp.route('/about')
+@response_cache.cached()
 def about():
     return render_template('about.html')
 import requests
 from flask import current_app
 @main_bp.route("/privacy")
+@response_cache.cached()
 def privacy():
     return render_template("privacy.html")
 
 @main_bp.route("/terms")
+@response_cache.cached()
 def terms():
     return render_template("terms.html")
 
@@ -267,41 +351,20 @@ def contact():
     form = ContactForm()
 
     if form.validate_on_submit():
-        api_key = os.getenv("BREVO_API_KEY")
-        to_email = os.getenv("MAIL_TO")
-
-        payload = {
-            "sender": {"name": form.name.data, "email": form.email.data},
-            "to": [{"email": to_email}],
-            "subject": f"New message from {form.name.data}",
-            "htmlContent": f"""
-                <h2>New Contact Message</h2>
-                <p><strong>Name:</strong> {form.name.data}</p>
-                <p><strong>Email:</strong> {form.email.data}</p>
-                <p><strong>Message:</strong><br>{form.message.data}</p>
-            """
-        }
-
-        headers = {
-            "api-key": api_key,
-            "Content-Type": "application/json",
-            "Accept": "application/json"
-        }
-
         try:
-            r = requests.post(
-                "https://api.brevo.com/v3/smtp/email",
-                json=payload,
-                headers=headers
+            # Delivered by the background worker (scripts/run_worker.py)
+            queue_email(
+                subject=f"New message from {form.name.data}",
+                html=f"""
+                    <h2>New Contact Message</h2>
+                    <p><strong>Name:</strong> {form.name.data}</p>
+                    <p><strong>Email:</strong> {form.email.data}</p>
+                    <p><strong>Message:</strong><br>{form.message.data}</p>
+                """,
+                to=os.getenv("MAIL_TO"),
+                sender={"name": form.name.data, "email": form.email.data},
             )
-
-            print("BREVO RESPONSE:", r.json())
-
-            if r.status_code == 201:
-                flash("Your message was sent successfully!", "success")
-            else:
-                flash("Failed to send email. Check logs.", "danger")
-
+            flash("Your message was sent successfully!", "success")
         except Exception as e:
             print("EMAIL ERROR:", e)
             flash("Error sending email.", "danger")
@@ -311,6 +374,7 @@ def contact():
     return render_template('contact.html', form=form)
 
 @main_bp.route('/faqs')
+@response_cache.cached()
 def faqs():
     faq_data ={
         "1. What is CelebHub?": "CelebHub is a central platform showcasing verified Kenyan celebrities, influencers, artists, content creators, and public figures. Our goal is to make it easy for fans, brands, and event planners to discover, connect, and engage with Kenyan talent.",
@@ -341,33 +405,23 @@ def onboarding():
         )
         save_object(record)
 
-        # Admin notification (Brevo)
-        api_key = os.getenv("BREVO_API_KEY")
-        admin_email = os.getenv("MAIL_TO")
-
-        payload = {
-            "sender": {"name": "CelebHub Notifications", "email": "no-reply@celebhub.co.ke"},
-            "to": [{"email": admin_email}],
-            "subject": "New User Onboarding Registration",
-            "htmlContent": f"""
-                <h2>New Onboarding Registration</h2>
-                <p><strong>Name:</strong> {form.name.data}</p>
-                <p><strong>Email:</strong> {form.email.data}</p>
-                <p><strong>Phone:</strong> {form.phone.data}</p>
-                <p><strong>Message:</strong> {form.message.data}</p>
-                <p>Submitted on: {record.created_at}</p>
-            """
-        }
-
-        headers = {
-            "api-key": api_key,
-            "Content-Type": "application/json"
-        }
-
+        # Admin notification (queued, sent by the worker)
         try:
-            requests.post("https://api.brevo.com/v3/smtp/email", json=payload, headers=headers)
-        except Exception:
-            pass  # Disable errors from breaking the page
+            queue_email(
+                subject="New User Onboarding Registration",
+                html=f"""
+                    <h2>New Onboarding Registration</h2>
+                    <p><strong>Name:</strong> {form.name.data}</p>
+                    <p><strong>Email:</strong> {form.email.data}</p>
+                    <p><strong>Phone:</strong> {form.phone.data}</p>
+                    <p><strong>Message:</strong> {form.message.data}</p>
+                    <p>Submitted on: {record.created_at}</p>
+                """,
+                to=os.getenv("MAIL_TO"),
+                sender={"name": "CelebHub Notifications", "email": "no-reply@celebhub.co.ke"},
+            )
+        except Exception as e:
+            print(f"⚠️  Could not queue onboarding notification: {e}")  # never break the page
 
         flash("Thank you! You have successfully joined our onboarding list.", "success")
         return redirect(url_for("main.onboarding"))
@@ -385,8 +439,7 @@ def submit_celeb():
         photo = form.photo.data
         filename = None
         if photo:
-            filename = secure_filename(photo.filename)
-            photo.save(os.path.join(current_app.config['UPLOAD_FOLDER'], filename))
+            filename = save_uploaded_photo(photo)
 
         # 📌 Normalize social media URLs
         youtube_id = extract_youtube_id(form.youtube.data) or form.youtube.data
@@ -407,31 +460,24 @@ def submit_celeb():
         )
         save_object(submission)
 
-        # 📩 Send admin notification (Brevo)
-        api_key = os.getenv("BREVO_API_KEY")
-        admin_email = os.getenv("MAIL_TO")
-
-        payload = {
-            "sender": {"name": "CelebHub Submission", "email": "no-reply@celebhub.co.ke"},
-            "to": [{"email": admin_email}],
-            "subject": "New Celebrity Submission",
-            "htmlContent": f"""
-                <h2>New Celebrity Submission</h2>
-                <p><strong>Name:</strong> {form.name.data}</p>
-                <p><strong>Email:</strong> {form.email.data}</p>
-                <p><strong>Phone:</strong> {form.phone.data}</p>
-                <p><strong>Category:</strong> {form.category.data}</p>
-                <p><strong>Bio:</strong> {form.bio.data}</p>
-                <p>Status: <strong>Pending Review</strong></p>
-            """
-        }
-
-        headers = {
-            "api-key": api_key,
-            "Content-Type": "application/json"
-        }
-
-        requests.post("https://api.brevo.com/v3/smtp/email", json=payload, headers=headers)
+        # 📩 Queue admin notification (sent by the worker)
+        try:
+            queue_email(
+                subject="New Celebrity Submission",
+                html=f"""
+                    <h2>New Celebrity Submission</h2>
+                    <p><strong>Name:</strong> {form.name.data}</p>
+                    <p><strong>Email:</strong> {form.email.data}</p>
+                    <p><strong>Phone:</strong> {form.phone.data}</p>
+                    <p><strong>Category:</strong> {form.category.data}</p>
+                    <p><strong>Bio:</strong> {form.bio.data}</p>
+                    <p>Status: <strong>Pending Review</strong></p>
+                """,
+                to=os.getenv("MAIL_TO"),
+                sender={"name": "CelebHub Submission", "email": "no-reply@celebhub.co.ke"},
+            )
+        except Exception as e:
+            print(f"⚠️  Could not queue submission notification: {e}")
 
         flash("Your profile has been submitted! Admin will review it shortly.", "success")
         return redirect(url_for('main.submit_celeb'))
@@ -447,12 +493,14 @@ def login():
     if form.validate_on_submit():
         username = form.username.data
         password = form.password.data
+        retry_after = login_throttle.check('admin-login', request.remote_addr, username)
+        if retry_after:
+            return too_many_attempts('admin/login.html', form, retry_after)
         user = get_user_by_username(username)
         if user and user.check_password(password):
+            user.rehash_password_if_needed(password)
             # Check if user is admin or in ADMIN_USERNAMES before login
-            allowed_admins = [u.strip() for u in os.getenv('ADMIN_USERNAMES', 'admin').split(',') if u.strip()]
-            is_admin = getattr(user, 'is_admin', False) or user.username in allowed_admins
-            if is_admin:
+            if has_role(user, ADMIN_ROLE):
                 login_user(user)
                 flash('Logged in successfully', 'success')
                 return redirect(url_for('admin.dashboard'))
@@ -465,55 +513,67 @@ def login():
 @admin_bp.route('/celebrities')
 @admin_required
 def celebrities():
-    if USE_MONGO:
-        celebs = Celebrity.objects.order_by('-created_at')
-    else:
-        celebs = Celebrity.query.order_by(Celebrity.created_at.desc()).all()
+    celebs = paginate_request(Celebrity.objects, page_size=ADMIN_PAGE_SIZE)
     return render_template('admin/celebrities.html', celebs=celebs ,form=FeaturedForm)
 @admin_bp.route('/submissions')
 @admin_required
 def submissions():
-    pending_submissions = get_celebrity_submissions_pending()
+    pending_submissions = paginate_request(get_celebrity_submissions_pending(), page_size=ADMIN_PAGE_SIZE)
     return render_template('admin/submissions.html', submissions=pending_submissions)
-@admin_bp.route('/submissions/<int:id>')
+@admin_bp.route('/submissions/<docid:id>')
 @admin_required
 def view_submission(id):
     sub = get_submission_by_id(id)
     if not sub:
         abort(404)
     return render_template('admin/view_submission.html', sub=sub)
-@admin_bp.route('/submission/<int:id>/approve', methods=['POST'])
+@admin_bp.route('/submission/<docid:id>/approve', methods=['POST'])
 @admin_required
 def approve_submission(id):
     sub = get_submission_by_id(id)
     if not sub:
         abort(404)
 
-    # Create a new Celebrity from submitted data
-    # Generate a unique, safe slug for the new celebrity
-    slug = generate_unique_slug(sub.name or f'celeb-{sub.id}')
-
-    new_celeb = Celebrity(
-        name=sub.name,
-        slug=slug,
-        category=sub.category,
-        bio=sub.bio,
-        photo_filename=sub.photo_filename,
-        youtube=sub.youtube or extract_youtube_id(sub.youtube) or sub.youtube,
-        tiktok=sub.tiktok or extract_tiktok_id(sub.tiktok) or sub.tiktok,
-        spotify=sub.spotify or extract_spotify_id(sub.spotify) or sub.spotify,
-    )
-    save_object(new_celeb)
-
-    # Update submission status
-    sub.status = "approved"
-    save_object(sub)
-
-    flash("Submission approved and added to Celebrities!", "success")
+    # Atomic and retry-safe: a repeated POST never creates a second celebrity
+    result = approve_submissions([sub.id])
+    if result['approved']:
+        flash("Submission approved and added to Celebrities!", "success")
+    elif result['failed']:
+        flash(f"Submission could not be approved: {result['failed'][0][1]}", "danger")
+    else:
+        flash("Submission was already moderated.", "warning")
     return redirect(url_for('admin.submissions'))
 
     
-@admin_bp.route('/submission/<int:id>/reject', methods=['POST'])
+@admin_bp.route('/submissions/bulk', methods=['POST'])
+@admin_required
+def bulk_moderate_submissions():
+    """Approve or reject every checked submission in one request"""
+    ids = [parse_id(i) for i in request.form.getlist('submission_ids') if i]
+    action = request.form.get('action')
+    if not ids or action not in ('approve', 'reject'):
+        flash('Select at least one submission.', 'warning')
+        return redirect(url_for('admin.submissions'))
+    if len(ids) > MAX_BULK:
+        flash(f'Only the first {MAX_BULK} selected submissions were processed.', 'warning')
+
+    if action == 'reject':
+        result = reject_submissions(ids)
+        skipped = result['skipped']
+        flash(f"{result['rejected']} submission(s) rejected.", 'danger')
+    else:
+        result = approve_submissions(ids)
+        skipped = len(result['skipped'])
+        if result['approved']:
+            flash(f"{len(result['approved'])} submission(s) approved and added to Celebrities!", 'success')
+        if result['failed']:
+            details = '; '.join(f"#{sub_id}: {error}" for sub_id, error in result['failed'][:5])
+            flash(f"{len(result['failed'])} submission(s) could not be approved and are still pending ({details}).", 'danger')
+    if skipped:
+        flash(f"{skipped} submission(s) skipped: already moderated or deleted.", 'warning')
+    return redirect(url_for('admin.submissions'))
+
+@admin_bp.route('/submission/<docid:id>/reject', methods=['POST'])
 @admin_required
 def reject_submission(id):
     sub = get_submission_by_id(id)
@@ -526,7 +586,7 @@ def reject_submission(id):
 @admin_bp.route('/onboarding-users')
 @admin_required
 def onboarding_users():
-    users = get_onboarding_registrations_all()
+    users = paginate_request(get_onboarding_registrations_all(), page_size=ADMIN_PAGE_SIZE)
     return render_template('admin/onboarding_users.html', users=users)
 
 
@@ -539,13 +599,21 @@ def logout():
 @admin_bp.route('/')
 @admin_required
 def dashboard():
-    if USE_MONGO:
-        celebs = Celebrity.objects.order_by('-created_at')
-    else:
-        celebs = Celebrity.query.order_by(Celebrity.created_at.desc()).all()
+    celebs = paginate_request(Celebrity.objects, page_size=ADMIN_PAGE_SIZE)
     form= DeleteCelebrityForm()
     return render_template('admin/dashboard.html', form=form, celebs=celebs)
 
+@admin_bp.route('/metrics')
+@admin_required
+def metrics():
+    """Runtime metrics of this worker process, as JSON."""
+    return jsonify({
+        'integrations': integration_metrics(),
+        'user_cache': user_cache_metrics(),
+        'search': search_metrics(),
+        'login_throttle': {'rejected': login_throttle.rejected},
+    })
+
 @admin_bp.route('/add', methods=['GET','POST'])
 @admin_required
 def add_celeb():
@@ -555,9 +623,7 @@ def add_celeb():
         featured=request.form.get('Featured')=='true'
         filename = None
         if photo_file and photo_file.filename and allowed_file(photo_file.filename):
-            filename = secure_filename(photo_file.filename)
-            save_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-            photo_file.save(save_path)
+            filename = save_uploaded_photo(photo_file)
         # Normalize social media URLs
         youtube_embed = extract_youtube_id(form.youtube.data) if form.youtube.data else None
         tiktok_embed = extract_tiktok_id(form.tiktok.data) if form.tiktok.data else None
@@ -572,7 +638,7 @@ def add_celeb():
         return redirect(url_for('admin.dashboard'))
     return render_template('admin/edit_profile.html', form=form)
 
-@admin_bp.route('/edit/<int:cid>', methods=['GET', 'POST'])
+@admin_bp.route('/edit/<docid:cid>', methods=['GET', 'POST'])
 @admin_required
 def edit_celeb(cid):
     celeb = get_celebrity_by_id(cid)
@@ -594,18 +660,13 @@ def edit_celeb(cid):
         # Handle photo upload
         photo_file = request.files.get('photo')
         if photo_file and photo_file.filename and allowed_file(photo_file.filename):
-            filename = secure_filename(photo_file.filename)
-            save_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-            photo_file.save(save_path)
-
-            # Remove old photo if different
-            if celeb.photo_filename and celeb.photo_filename != filename:
-                try:
-                    os.remove(os.path.join(current_app.config['UPLOAD_FOLDER'], celeb.photo_filename))
-                except Exception:
-                    pass
+            filename = save_uploaded_photo(photo_file)
 
-            celeb.photo_filename = filename
+            # Release the old photo; its files go once no other record uses them
+            if filename:
+                if celeb.photo_filename:
+                    release_photo(celeb.photo_filename, current_app.config['UPLOAD_FOLDER'])
+                celeb.photo_filename = filename
 
         # Update text fields (normalize social media URLs)
         celeb.name = form.name.data
@@ -618,6 +679,9 @@ def edit_celeb(cid):
         
         # ✅ Correctly handle 'featured' checkbox
         celeb.featured = form.featured.data  
+        if celeb.featured and celeb.featured_until and celeb.featured_until <= datetime.utcnow():
+            # Re-featured by an admin after the paid period ended: no end date
+            celeb.featured_until = None
 
         save_object(celeb)
         flash('Celebrity updated successfully!', 'success')
@@ -626,7 +690,7 @@ def edit_celeb(cid):
     return render_template('admin/edit_profile.html', form=form, celeb=celeb)
 
 
-@admin_bp.route('/delete/<int:cid>', methods=['POST'])
+@admin_bp.route('/delete/<docid:cid>', methods=['POST'])
 @admin_required
 def delete_celebrity(cid):
     form = DeleteCelebrityForm()
@@ -635,11 +699,8 @@ def delete_celebrity(cid):
         if not celeb:
             flash('Celebrity not found', 'danger')
             return redirect(url_for('admin.dashboard'))
-        try:
-            os.remove(os.path.join(current_app.config['UPLOAD_FOLDER'], celeb.photo_filename))
-        except Exception:
-            pass
         delete_object(celeb)
+        release_photo(celeb.photo_filename, current_app.config['UPLOAD_FOLDER'])
         flash(f'{celeb.name} has been deleted successfully', 'success')
     else:
         flash('Invalid delete request','danger')
@@ -664,45 +725,18 @@ def mpesa_payment():
     amount = int(data.get('amount', 1))
     celeb_slug = data.get('celebrity_slug')
 
-    # 2. Load Credentials
-    consumer_key = os.getenv('MPESA_CONSUMER_KEY')
-    consumer_secret = os.getenv('MPESA_CONSUMER_SECRET')
-    shortcode = os.getenv('MPESA_SHORTCODE')
-    passkey = os.getenv('MPESA_PASSKEY')
-    callback_url = os.getenv('MPESA_CALLBACK_URL')
-
-    mpesa_env = os.getenv('MPESA_ENV', 'sandbox')
-    base_url = 'https://api.safaricom.co.ke' if mpesa_env == 'production' else 'https://sandbox.safaricom.co.ke'
-
     try:
-        # 3. Secure Token Generation
-        token_url = f"{base_url}/oauth/v1/generate?grant_type=client_credentials"
-        r = requests.get(token_url, auth=(consumer_key, consumer_secret), timeout=10)
-        r.raise_for_status() # This prevents the "Unexpected <" error
-        access_token = r.json().get('access_token')
-
-        # 4. Prepare Security Credentials
-        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-        password_str = f"{shortcode}{passkey}{timestamp}"
-        password = base64.b64encode(password_str.encode()).decode('utf-8')
-
-        payment_ref = data.get('payment_ref') or str(uuid.uuid4())
-        headers = {"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"}
-
-        # 5. Payload Construction
-        payload = {
-            "BusinessShortCode": shortcode,
-            "Password": password,
-            "Timestamp": timestamp,
-            "TransactionType": "CustomerPayBillOnline",
-            "Amount": amount,
-            "PartyA": phone,
-            "PartyB": shortcode,
-            "PhoneNumber": phone,
-            "CallBackURL": callback_url,
-            "AccountReference": payment_ref, # M-Pesa returns this in metadata
-            "TransactionDesc": f"Payment for {celeb_slug}"
-        }
+        # 2. Record the payment intent; the STK push itself runs in the background.
+        # The ref is always ours: a client-chosen one could collide with another payment
+        payment = Payment(
+            ref=str(uuid.uuid4()),
+            user_id=str(current_user.get_id()),
+            celebrity_slug=celeb_slug,
+            phone=phone,
+            amount=amount,
+        )
+        payment.save()
+        payment_ref = payment.ref
 
         # Handle DB Pending State
         if celeb_slug:
@@ -714,85 +748,65 @@ def mpesa_payment():
                 # Ensure you have a global save_object function or use celeb.save()
                 celeb.save() if USE_MONGO else DB.session.commit()
 
-        # 6. Hit the STK Push Endpoint
-        process_url = f"{base_url}/mpesa/stkpush/v1/processrequest"
-        res = requests.post(process_url, json=payload, headers=headers, timeout=15)
-        
-        response_data = res.json()
-        response_data['payment_ref'] = payment_ref
-        return jsonify(response_data)
+        # 3. Hand the STK push to the background pool
+        if not submit_push(current_app._get_current_object(), payment_ref):
+            fail_payment({'ref': payment_ref}, result_desc='Payment service busy')
+            return jsonify({'error': 'Payment service busy, please try again shortly', 'payment_ref': payment_ref}), 503
+
+        return jsonify({
+            'payment_ref': payment_ref,
+            'status': payment.status,
+            'status_url': url_for('main.payment_status', payment_ref=payment_ref),
+        }), 202
 
-    except requests.exceptions.RequestException as e:
-        # This catches network errors and returns JSON, NOT HTML
-        return jsonify({'error': 'Safaricom connection failed', 'details': str(e)}), 503
     except Exception as e:
-        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
-    
+        print(f"❌ Could not start payment: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+
+@main_bp.route('/pay/<payment_ref>/status')
+def payment_status(payment_ref):
+    """Polled by the profile page after /pay until the payment settles."""
+    if not current_user.is_authenticated:
+        return jsonify({'error': 'Authentication required'}), 401
+    payment = get_payment_by_ref(payment_ref)
+    if payment is None or (payment.user_id != str(current_user.get_id()) and not has_role(current_user, ADMIN_ROLE)):
+        return jsonify({'error': 'Payment not found'}), 404
+    response = jsonify({
+        'payment_ref': payment.ref,
+        'status': payment.status,
+        'message': payment.result_desc,
+        'done': payment.status not in OPEN_STATUSES,
+    })
+    response.cache_control.no_store = True
+    return response
+
 @main_bp.route('/mpesa/callback', methods=['POST'])
 @csrf.exempt
 def mpesa_callback():
     """
     Handle M-Pesa payment callbacks and update celebrity featured status.
-    M-Pesa POSTs payment confirmation here after user completes STK push.
+    M-Pesa POSTs payment confirmation here after user completes STK push,
+    and repeats it when it gets no timely answer; repeats are no-ops.
     """
-    data = request.json
-    
+    data = request.json or {}
+
     # Extract callback body structure from M-Pesa response
-    body = data.get('Body', {})
-    stk_callback = body.get('stkCallback', {})
-    result_code = stk_callback.get('ResultCode', -1)
-    result_desc = stk_callback.get('ResultDesc', 'Unknown')
-    callback_metadata = stk_callback.get('CallbackMetadata', {})
-    
-    # Extract our payment reference from the callback metadata
-    payment_ref = None
-    metadata_items = callback_metadata.get('Item', [])
-    for item in metadata_items:
-        if item.get('Name') == 'AccountReference':
-            payment_ref = item.get('Value')
-            break
-    
-    print(f"M-Pesa Callback: ResultCode={result_code}, Ref={payment_ref}")
-    
-    # Only process successful payments (ResultCode 0)
-    if result_code == 0 and payment_ref:
-        try:
-            # Find the celebrity by payment_ref and mark as featured
-            if USE_MONGO:
-                celeb = Celebrity.objects(feature_payment_id=payment_ref).first()
-            else:
-                celeb = Celebrity.query.filter_by(feature_payment_id=payment_ref).first()
-            
-            if celeb:
-                # Mark as featured (30 days by default)
-                celeb.mark_featured(days=30, payment_id=payment_ref, amount=celeb.feature_amount or 500)
-                if not USE_MONGO:
-                    DB.session.commit()
-                
-                print(f"✓ Celebrity '{celeb.name}' marked as featured")
-            else:
-                print(f"⚠️  No celebrity found for payment_ref={payment_ref}")
-        except Exception as e:
-            print(f"❌ Error processing payment callback: {e}")
-    else:
-        print(f"⚠️  Payment failed or pending: {result_desc}")
-    
+    stk_callback = data.get('Body', {}).get('stkCallback', {})
+    print(f"M-Pesa Callback: ResultCode={stk_callback.get('ResultCode')}, "
+          f"CheckoutRequestID={stk_callback.get('CheckoutRequestID')}")
+
+    try:
+        payment = process_callback(stk_callback)
+        if payment is None:
+            print("⚠️  Callback matched no open payment (duplicate or unknown)")
+        elif payment.status != 'paid':
+            print(f"⚠️  Payment {payment.ref} failed: {payment.result_desc}")
+    except Exception as e:
+        print(f"❌ Error processing payment callback: {e}")
+
     # Always return success to M-Pesa so callback isn't retried
     return jsonify({
         "ResultCode": 0,
         "ResultDesc": "Callback received successfully"
     })
-
-
-@main_bp.route('/mpesa/token')
-def generate_token():
-    import requests, os
-    from requests.auth import HTTPBasicAuth
-
-    key = os.getenv("MPESA_CONSUMER_KEY")
-    secret = os.getenv("MPESA_CONSUMER_SECRET")
-
-    url = "https://sandbox.safaricom.co.ke/oauth/v1/generate?grant_type=client_credentials"
-    response = requests.get(url, auth=HTTPBasicAuth(key, secret))
-
-    return response.json()
@@ -0,0 +1,54 @@
+"""
+Periodic maintenance tasks.
+Run them from a separate process (python scripts/run_scheduler.py) or, with
+SCHEDULER_THREAD=True, from a daemon thread inside every web worker. Each
+task is a single idempotent bulk update, so several schedulers running at
+once do no harm.
+"""
+import os
+import threading
+import time
+
+from .featured import expire_featured_listings
+
+# name -> (interval in seconds, function returning a count of changed documents)
+TASKS = {
+    'expire_featured_listings': (int(os.getenv('FEATURE_EXPIRY_INTERVAL', 300)), expire_featured_listings),
+}
+
+
+def run_task(name):
+    """Run one task now. Returns its result, or None if it failed."""
+    _, fn = TASKS[name]
+    try:
+        changed = fn()
+    except Exception as e:
+        print(f"⚠️  Scheduled task {name} failed: {e}")
+        return None
+    if changed:
+        print(f"✓ {name}: {changed} updated")
+    return changed
+
+
+def run_scheduler(app, once=False, stop_event=None, tick=1.0):
+    """Run every task on its interval until stopped; with once=True run each task once and return the results."""
+    with app.app_context():
+        if once:
+            return {name: run_task(name) for name in TASKS}
+        next_run = {name: 0.0 for name in TASKS}
+        while not (stop_event and stop_event.is_set()):
+            now = time.monotonic()
+            for name, (interval, _) in TASKS.items():
+                if now >= next_run[name]:
+                    run_task(name)
+                    next_run[name] = now + interval
+            time.sleep(tick)
+
+
+def start_scheduler_thread(app):
+    stop_event = threading.Event()
+    thread = threading.Thread(
+        target=run_scheduler, args=(app,), kwargs={'stop_event': stop_event}, name='scheduler', daemon=True,
+    )
+    thread.start()
+    return stop_event
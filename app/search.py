@@ -0,0 +1,340 @@
+"""
+Full-text celebrity search over name, category and bio.
+Each worker keeps an in-process inverted index (term -> {celebrity id: weight})
+built from the celebrities collection on first use. Celebrity.save()/delete()
+update it at once; writes made by other workers (or by bulk updates) are picked
+up by a sync on `updated_at` at most every SEARCH_SYNC_INTERVAL seconds.
+
+A query term matches an indexed term exactly, as a prefix, or - when the term
+is not in the vocabulary at all - within one or two typos, with candidates
+found through a trigram index. Celebrities matching more query terms rank
+first, then by a field-weighted tf-idf score.
+"""
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import datetime, timedelta
+from heapq import nlargest
+
+SEARCH_SYNC_INTERVAL = float(os.getenv('SEARCH_SYNC_INTERVAL', 30))
+SEARCH_MAX_RESULTS = int(os.getenv('SEARCH_MAX_RESULTS', 500))
+# Re-read writes this close to the previous sync, in case their save was still in flight
+SYNC_OVERLAP = timedelta(seconds=5)
+
+# field -> weight of one occurrence of a term in that field
+FIELD_WEIGHTS = {'name': 10.0, 'category': 4.0, 'bio': 1.0}
+# score multipliers by how a query term matched; a fuzzy match costs FUZZY per typo
+EXACT = 1.0
+PREFIX = 0.8
+FUZZY = 0.6
+MIN_PREFIX_LENGTH = 2
+MAX_EXPANSIONS = 50  # indexed terms a single prefix or misspelt query term may stand for
+PHRASE_BONUS = 1.5  # query is the whole name, e.g. "sauti sol"
+FEATURED_BOOST = 1.2
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+_PROJECTION = {'name': 1, 'category': 1, 'bio': 1, 'featured': 1, 'featured_until': 1}
+
+
+def normalize(text):
+    """Lower-case and strip accents, so "Nyáshinski" and "nyashinski" index alike."""
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(normalize(text))
+
+
+def trigrams(term):
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def max_typos(term):
+    """Typos tolerated in a query term: none below 3 characters, two from 6."""
+    if len(term) < 3:
+        return 0
+    return 1 if len(term) < 6 else 2
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance counting adjacent transpositions as one edit; limit + 1 once it exceeds `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+class SearchIndex:
+    """Inverted index of celebrities; safe to query and update from several threads."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._postings = {}  # term -> {doc id: weight}
+        self._docs = {}  # doc id -> (terms, normalized name)
+        self._names = defaultdict(set)  # normalized name -> doc ids, for the whole-name bonus
+        self._featured = {}  # doc id -> featured_until, for featured celebrities
+        self._vocabulary = []  # sorted terms, for prefix lookups
+        self._trigrams = defaultdict(set)  # trigram -> terms
+        self._bulk = False  # while loading, the vocabulary is sorted once at the end
+        self.loaded = False
+        self.synced_at = None  # writes with a newer updated_at still need syncing
+        self.last_sync = 0.0
+        self.searches = 0
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, doc_id, name=None, category=None, bio=None, featured=False, featured_until=None):
+        """Index (or re-index) one celebrity."""
+        weights = defaultdict(float)
+        for field, text in (('name', name), ('category', category), ('bio', bio)):
+            for term in tokenize(text):
+                weights[term] += FIELD_WEIGHTS[field]
+        with self._lock:
+            self._remove(doc_id)
+            for term, weight in weights.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = {}
+                    self._add_term(term)
+                postings[doc_id] = weight
+            normalized = ' '.join(tokenize(name))
+            self._docs[doc_id] = (tuple(weights), normalized)
+            self._names[normalized].add(doc_id)
+            if featured:
+                self._featured[doc_id] = featured_until
+
+    def add_document(self, son):
+        """Index a raw celebrities document (as returned by pymongo)."""
+        self.add(
+            son['_id'], son.get('name'), son.get('category'), son.get('bio'),
+            son.get('featured'), son.get('featured_until'),
+        )
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        entry = self._docs.pop(doc_id, None)
+        if entry is None:
+            return
+        terms, name = entry
+        self._names[name].discard(doc_id)
+        if not self._names[name]:
+            del self._names[name]
+        self._featured.pop(doc_id, None)
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+                self._drop_term(term)
+
+    def _add_term(self, term):
+        if not self._bulk:
+            insort(self._vocabulary, term)
+        for gram in trigrams(term):
+            self._trigrams[gram].add(term)
+
+    def _drop_term(self, term):
+        i = bisect_left(self._vocabulary, term)
+        if i < len(self._vocabulary) and self._vocabulary[i] == term:
+            del self._vocabulary[i]
+        for gram in trigrams(term):
+            terms = self._trigrams.get(gram)
+            if terms is not None:
+                terms.discard(term)
+                if not terms:
+                    del self._trigrams[gram]
+
+    def _expand(self, term):
+        """Indexed terms a query term stands for, with their score multiplier."""
+        matches = {}
+        if term in self._postings:
+            matches[term] = EXACT
+        if len(term) >= MIN_PREFIX_LENGTH:
+            vocabulary = self._vocabulary
+            i = bisect_left(vocabulary, term)
+            while i < len(vocabulary) and vocabulary[i].startswith(term) and len(matches) < MAX_EXPANSIONS:
+                matches.setdefault(vocabulary[i], PREFIX)
+                i += 1
+        if not matches:
+            matches = self._fuzzy(term)
+        return matches
+
+    def _fuzzy(self, term):
+        limit = max_typos(term)
+        if not limit:
+            return {}
+        grams = trigrams(term)
+        shared = defaultdict(int)
+        for gram in grams:
+            for candidate in self._trigrams.get(gram, ()):
+                shared[candidate] += 1
+        # Two terms within `limit` edits share at least len(grams) - 3 * limit trigrams
+        threshold = len(grams) - 3 * limit
+        found = []
+        for candidate, count in shared.items():
+            if count >= threshold:
+                distance = edit_distance(term, candidate, limit)
+                if distance <= limit:
+                    found.append((distance, -count, candidate))
+        found.sort()
+        return {candidate: FUZZY ** distance for distance, _, candidate in found[:MAX_EXPANSIONS]}
+
+    def search(self, query, limit=None):
+        """
+        Ids of the celebrities matching `query`, best first.
+        Celebrities matching every query term rank above partial matches.
+        """
+        tokens = tokenize(query)
+        terms = list(dict.fromkeys(tokens))
+        if not terms:
+            return []
+        phrase = ' '.join(tokens)
+        now = datetime.utcnow()
+        with self._lock:
+            self.searches += 1
+            total = len(self._docs)
+            scores = defaultdict(float)
+            matched = defaultdict(int)
+            for term in terms:
+                best = {}
+                for candidate, factor in self._expand(term).items():
+                    postings = self._postings[candidate]
+                    factor *= math.log(1 + total / len(postings))
+                    for doc_id, weight in postings.items():
+                        score = factor * weight
+                        if score > best.get(doc_id, 0.0):
+                            best[doc_id] = score
+                for doc_id, score in best.items():
+                    scores[doc_id] += score
+                    matched[doc_id] += 1
+
+            # Bonuses touch only the few celebrities they apply to
+            for doc_id in self._names.get(phrase, ()):
+                if doc_id in scores:
+                    scores[doc_id] *= PHRASE_BONUS
+            for doc_id, featured_until in self._featured.items():
+                if doc_id in scores and (featured_until is None or featured_until > now):
+                    scores[doc_id] *= FEATURED_BOOST
+            # More matched terms always win; s / (1 + s) keeps the score below 1
+            ranked = {doc_id: matched[doc_id] + score / (1.0 + score) for doc_id, score in scores.items()}
+        return nlargest(limit or SEARCH_MAX_RESULTS, ranked, key=ranked.__getitem__)
+
+    def load(self):
+        """Rebuild the index from the celebrities collection. Returns: number of celebrities indexed"""
+        from .models import Celebrity
+        started = datetime.utcnow()
+        fresh = SearchIndex()
+        fresh._bulk = True
+        for son in Celebrity._get_collection().find({}, _PROJECTION).batch_size(1000):
+            fresh.add_document(son)
+        fresh._vocabulary = sorted(fresh._postings)
+        with self._lock:
+            self._postings, self._docs = fresh._postings, fresh._docs
+            self._names, self._featured = fresh._names, fresh._featured
+            self._vocabulary, self._trigrams = fresh._vocabulary, fresh._trigrams
+            self.synced_at = started - SYNC_OVERLAP
+            self.last_sync = time.monotonic()
+            self.loaded = True
+        return len(self._docs)
+
+    def sync(self):
+        """
+        Apply celebrity writes made outside this process since the last sync.
+        Returns: number of celebrities re-indexed or removed
+        """
+        from .models import Celebrity
+        collection = Celebrity._get_collection()
+        started = datetime.utcnow()
+        changed = 0
+        for son in collection.find({'updated_at': {'$gt': self.synced_at}}, _PROJECTION):
+            self.add_document(son)
+            changed += 1
+        # Deletes leave no updated_at behind; a count mismatch triggers a full id check
+        if collection.estimated_document_count() != len(self._docs):
+            live = {son['_id'] for son in collection.find({}, {'_id': 1})}
+            for doc_id in set(self._docs) - live:
+                self.remove(doc_id)
+                changed += 1
+            missing = live - set(self._docs)
+            if missing:
+                for son in collection.find({'_id': {'$in': list(missing)}}, _PROJECTION):
+                    self.add_document(son)
+                    changed += 1
+        with self._lock:
+            self.synced_at = started - SYNC_OVERLAP
+            self.last_sync = time.monotonic()
+        return changed
+
+    def ensure_fresh(self):
+        """Load the index on first use, then sync it once SEARCH_SYNC_INTERVAL has passed."""
+        if not self.loaded:
+            with self._sync_lock:
+                if not self.loaded:
+                    self.load()
+            return
+        if time.monotonic() - self.last_sync < SEARCH_SYNC_INTERVAL:
+            return
+        # One thread syncs; the others search the index as it is
+        if self._sync_lock.acquire(blocking=False):
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"⚠️  Search index sync failed: {e}")
+            finally:
+                self._sync_lock.release()
+
+    def stats(self):
+        return {
+            'loaded': self.loaded,
+            'documents': len(self._docs),
+            'terms': len(self._postings),
+            'searches': self.searches,
+            'seconds_since_sync': round(time.monotonic() - self.last_sync, 1) if self.loaded else None,
+        }
+
+
+search_index = SearchIndex()
+
+
+def search_celebrities(query, limit=None):
+    """Ids of the celebrities matching `query`, best first (at most SEARCH_MAX_RESULTS)."""
+    search_index.ensure_fresh()
+    return search_index.search(query, limit)
+
+
+def index_celebrity(celeb):
+    """Re-index a celebrity after a write; a no-op until this worker has loaded the index."""
+    if search_index.loaded:
+        search_index.add(celeb.pk, celeb.name, celeb.category, celeb.bio, celeb.featured, celeb.featured_until)
+
+
+def unindex_celebrity(doc_id):
+    if search_index.loaded:
+        search_index.remove(doc_id)
+
+
+def search_metrics():
+    return search_index.stats()
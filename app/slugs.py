@@ -0,0 +1,91 @@
+"""
+Unique celebrity slugs in a constant number of round trips.
+Each base slug ("john-doe") has a counter document in `slug_counters`
+holding how many slugs have been handed out for it; allocating is one `$inc`,
+giving john-doe, john-doe-2, john-doe-3... A counter is seeded once, from the
+highest suffix already stored, the first time its base is seen.
+Slugs can still collide with ones typed in by an admin or derived from another
+base ("John Doe 2"), so save_with_unique_slug() retries on the unique index.
+"""
+import re
+
+from mongoengine.connection import get_db
+from mongoengine.errors import NotUniqueError
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+COLLECTION = 'slug_counters'
+MAX_ATTEMPTS = 5
+
+
+def slugify(name):
+    return re.sub(r'[^a-z0-9]+', '-', (name or '').lower()).strip('-') or 'celeb'
+
+
+def slug_for(base, n):
+    return base if n == 1 else f"{base}-{n}"
+
+
+def _counters():
+    return get_db()[COLLECTION]
+
+
+def highest_suffix(base):
+    """Largest n such that slug_for(base, n) is taken (0 if none); scans the base's slugs once."""
+    from .models import Celebrity
+    pattern = re.compile(rf'^{re.escape(base)}(?:-(\d+))?$')
+    highest = 0
+    for slug in Celebrity.objects(slug=pattern).scalar('slug'):
+        suffix = pattern.match(slug).group(1)
+        highest = max(highest, int(suffix) if suffix else 1)
+    return highest
+
+
+def _reserve(base, count):
+    """Reserve `count` consecutive counter values for `base`; returns a range of n."""
+    counters = _counters()
+    counter = counters.find_one_and_update({'_id': base}, {'$inc': {'n': count}}, return_document=ReturnDocument.AFTER)
+    if counter is None:
+        # First allocation for this base: start after the slugs that already exist
+        try:
+            counters.update_one({'_id': base}, {'$max': {'n': highest_suffix(base)}}, upsert=True)
+        except DuplicateKeyError:
+            pass  # seeded concurrently
+        counter = counters.find_one_and_update({'_id': base}, {'$inc': {'n': count}}, return_document=ReturnDocument.AFTER)
+    return range(counter['n'] - count + 1, counter['n'] + 1)
+
+
+def allocate(name):
+    """Next free slug for `name`."""
+    base = slugify(name)
+    return slug_for(base, _reserve(base, 1)[0])
+
+
+def allocate_many(names):
+    """
+    Slugs for many names at once (imports, bulk approval): one `$inc` per distinct base.
+    Returns: list of slugs in the order of `names`
+    """
+    bases = [slugify(name) for name in names]
+    wanted = {}
+    for base in bases:
+        wanted[base] = wanted.get(base, 0) + 1
+    pools = {base: iter(_reserve(base, count)) for base, count in wanted.items()}
+    return [slug_for(base, next(pools[base])) for base in bases]
+
+
+def save_with_unique_slug(doc, name, save=None):
+    """
+    Give `doc` a freshly allocated slug and save it, allocating again if the
+    slug turns out to be taken. `save` defaults to doc.save().
+    Raises: NotUniqueError after MAX_ATTEMPTS collisions
+    """
+    save = save or (lambda d: d.save())
+    for attempt in range(MAX_ATTEMPTS):
+        doc.slug = allocate(name)
+        try:
+            return save(doc)
+        except NotUniqueError:
+            # Only a slug collision is worth another slug
+            if attempt == MAX_ATTEMPTS - 1 or not type(doc).objects(slug=doc.slug).count():
+                raise
@@ -0,0 +1,101 @@
+"""
+Content-addressed storage for uploaded photos.
+Renditions are named after the SHA-256 of the uploaded bytes, so identical
+uploads are processed and stored once, and a name never changes content -
+which lets /media/ serve them with immutable, far-future cache headers.
+Every record that points at a photo holds one reference (StoredPhoto.refs);
+the files are removed when the last reference is released.
+"""
+import hashlib
+import os
+from datetime import datetime
+
+from pymongo import ReturnDocument, UpdateOne
+
+from .images import HASH_LENGTH, process_upload, rendition_files, is_content_addressed
+from .models import StoredPhoto
+
+CHUNK_SIZE = 64 * 1024
+
+
+def content_stem(file_storage):
+    """SHA-256 of an upload's bytes (stream is rewound afterwards)."""
+    digest = hashlib.sha256()
+    stream = file_storage.stream
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def acquire_photo(photo_filename):
+    """Add a reference to a stored photo. Legacy (non content-addressed) files are not tracked."""
+    if not is_content_addressed(photo_filename):
+        return None
+    doc = StoredPhoto._get_collection().find_one_and_update(
+        {'_id': photo_filename},
+        {'$inc': {'refs': 1}, '$setOnInsert': {'created_at': datetime.utcnow()}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return doc['refs']
+
+
+def acquire_photos(photo_filenames, session=None):
+    """acquire_photo() for many records at once: one bulk write, one `$inc` per distinct photo."""
+    counts = {}
+    for name in photo_filenames:
+        if is_content_addressed(name):
+            counts[name] = counts.get(name, 0) + 1
+    if not counts:
+        return
+    StoredPhoto._get_collection().bulk_write([
+        UpdateOne({'_id': name}, {'$inc': {'refs': n}, '$setOnInsert': {'created_at': datetime.utcnow()}}, upsert=True)
+        for name, n in counts.items()
+    ], ordered=False, session=session)
+
+
+def release_photo(photo_filename, upload_folder):
+    """
+    Drop one reference; delete the files once nothing refers to them.
+    Untracked legacy files are left alone, as other records may still use them.
+    """
+    if not is_content_addressed(photo_filename):
+        return None
+    collection = StoredPhoto._get_collection()
+    doc = collection.find_one_and_update(
+        {'_id': photo_filename},
+        {'$inc': {'refs': -1}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if doc is None or doc['refs'] > 0:
+        return doc and doc['refs']
+    # Conditional delete: a concurrent acquire_photo() keeps the files alive
+    if collection.delete_one({'_id': photo_filename, 'refs': {'$lte': 0}}).deleted_count:
+        for name in rendition_files(photo_filename):
+            try:
+                os.remove(os.path.join(upload_folder, name))
+            except OSError:
+                pass
+    return 0
+
+
+def store_photo(file_storage, upload_folder):
+    """
+    Store an upload under its content hash and take one reference to it.
+    Renditions are only generated when this content has not been stored before.
+    Returns: the photo_filename to save on the record
+    Raises: ValueError if the upload is not a readable image
+    """
+    stem = content_stem(file_storage)
+    photo_filename = f"{stem}-original.jpg"
+    # Take the reference first so a concurrent release cannot delete the files we rely on
+    acquire_photo(photo_filename)
+    try:
+        if not all(os.path.exists(os.path.join(upload_folder, name)) for name in rendition_files(photo_filename)):
+            process_upload(file_storage, upload_folder, stem)
+    except ValueError:
+        release_photo(photo_filename, upload_folder)
+        raise
+    return photo_filename
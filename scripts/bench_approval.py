@@ -0,0 +1,79 @@
+"""Measure submission approval latency: the old sequential path against approve_submissions().
+
+Usage:
+  python scripts/bench_approval.py                # 50 approvals per path
+  python scripts/bench_approval.py --count 200
+
+Runs against the configured database (MONGO_URI). Throwaway submissions named
+"Bench Approval <run>" are created and removed again, with their celebrities.
+Set MONGO_TRANSACTIONS=off to time the standalone fallback on a replica set.
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.models import Celebrity, CelebritySubmission
+from app.moderation import approve_submissions, celebrity_from_submission, slug_name, transactions_supported
+from app.slugs import save_with_unique_slug, slugify, _counters
+from app.storage import acquire_photo
+
+
+def approve_sequential(sub_id):
+    """The approval as the route used to do it: one round trip per step, no atomicity."""
+    sub = CelebritySubmission.objects(id=sub_id).first()
+    celeb = celebrity_from_submission(sub)
+    celeb.source_submission_id = None
+    save_with_unique_slug(celeb, slug_name(sub))
+    acquire_photo(celeb.photo_filename)
+    sub.status = 'approved'
+    sub.save()
+
+
+def seed(name, count):
+    subs = [CelebritySubmission(name=name, email='bench@test.com', phone='0700000000', bio='Benchmark') for _ in range(count)]
+    for sub in subs:
+        sub.save()
+    return [sub.id for sub in subs]
+
+
+def timed(approve, ids):
+    """Returns: milliseconds per approval"""
+    started = time.perf_counter()
+    approve(ids)
+    return (time.perf_counter() - started) * 1000 / len(ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=50, help='approvals per path')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        name = f"Bench Approval {uuid.uuid4().hex[:6]}"
+        base = slugify(name)
+        mode = 'transaction' if transactions_supported() else 'idempotency key'
+        print(f"Approval mode: {mode}, {args.count} approvals per path\n")
+        paths = [
+            ('sequential (old route)', lambda ids: [approve_sequential(i) for i in ids]),
+            ('approve_submissions x1', lambda ids: [approve_submissions([i]) for i in ids]),
+            ('approve_submissions bulk', approve_submissions),
+        ]
+        try:
+            approve_sequential(seed(name, 1)[0])  # warm up
+            print(f"{'path':<26} {'ms/approval':>12}")
+            for label, approve in paths:
+                ms = timed(approve, seed(name, args.count))
+                print(f"{label:<26} {ms:>12.2f}")
+        finally:
+            CelebritySubmission.objects(name=name).delete()
+            Celebrity.objects(name=name).delete()
+            _counters().delete_one({'_id': base})
+
+
+if __name__ == '__main__':
+    main()
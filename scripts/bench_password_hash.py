@@ -0,0 +1,67 @@
+"""Measure login cost (password verifications per second per core) for hashing settings.
+
+Usage:
+  python scripts/bench_password_hash.py                       # compare the built-in candidates
+  python scripts/bench_password_hash.py pbkdf2:sha256:600000  # only the given method(s)
+  python scripts/bench_password_hash.py --seconds 5            # longer run per method
+
+Runs single-threaded, so the rate is what one core can serve. Set the chosen
+method as PASSWORD_HASH_METHOD; existing hashes upgrade on the next login.
+"""
+import argparse
+import os
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.passwords import normalize_method, hash_password, verify_password
+
+CANDIDATES = [
+    'scrypt:32768:8:1',      # Werkzeug default (32 MiB per hash)
+    'scrypt:16384:8:1',
+    'scrypt:8192:8:1',
+    'pbkdf2:sha256:600000',  # Werkzeug pbkdf2 default
+    'pbkdf2:sha256:310000',
+    'pbkdf2:sha256:100000',
+]
+
+
+def memory_per_hash(method):
+    parts = method.split(':')
+    if parts[0] == 'scrypt':
+        n, r = int(parts[1]), int(parts[2])
+        return f"{128 * n * r // (1024 * 1024)} MiB"
+    return '-'
+
+
+def bench(method, seconds):
+    """Returns: (verifications per second, milliseconds per verification)"""
+    stored = hash_password('correct horse battery staple', method=method)
+    verify_password(stored, 'correct horse battery staple')  # warm up
+    count = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        verify_password(stored, 'correct horse battery staple')
+        count += 1
+    elapsed = time.perf_counter() - started
+    return count / elapsed, elapsed * 1000 / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('methods', nargs='*', help='Werkzeug method strings (default: built-in candidates)')
+    parser.add_argument('--seconds', type=float, default=2.0, help='time spent per method')
+    args = parser.parse_args()
+
+    current = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+    print(f"Current PASSWORD_HASH_METHOD: {normalize_method(current)}")
+    print(f"CPU cores: {os.cpu_count()}\n")
+    print(f"{'method':<24} {'ms/login':>9} {'logins/s/core':>14} {'memory':>8}")
+    for method in args.methods or CANDIDATES:
+        method = normalize_method(method)
+        rate, ms = bench(method, args.seconds)
+        print(f"{method:<24} {ms:>9.1f} {rate:>14.1f} {memory_per_hash(method):>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""Compare declared MongoDB indexes with the live ones and explain every query helper.
+
+Usage:
+  python scripts/check_indexes.py            # report missing / undeclared / unused indexes
+  python scripts/check_indexes.py --create   # create missing declared indexes first
+  python scripts/check_indexes.py --explain  # also print the query plan of each helper in routes.py
+
+Exits with status 1 if an index is missing or a query helper scans a whole collection.
+"""
+import argparse
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.indexes import ensure_all_indexes, index_report, print_index_report, explain_report, print_explain_report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--create', action='store_true', help='create missing declared indexes')
+    parser.add_argument('--explain', action='store_true', help='explain the query behind each routes.py helper')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if args.create:
+            ensure_all_indexes()
+            print('✓ Declared indexes ensured')
+
+        print('\n--- Index comparison ---')
+        ok = print_index_report(index_report())
+
+        if args.explain:
+            print('\n--- Query plans ---')
+            ok = print_explain_report(explain_report()) and ok
+
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,50 @@
+"""Migration helper for the primary key strategies in app/ids.py.
+
+Usage:
+  python scripts/migrate_ids.py status   # id types per collection and current counter values
+  python scripts/migrate_ids.py sync     # raise every counter to the largest stored integer id
+
+Switching ID_STRATEGY between `sequence` and `block` needs no data changes: both
+draw from the same mongoengine.counters documents. Run `sync` first if documents
+were ever inserted with explicit ids (e.g. scripts/migrate_sqlite_to_mongo.py),
+otherwise new ids could collide with imported ones.
+
+Switching to `objectid` needs no rewrite either: documents keep their integer ids,
+the <docid:...> routes and the user loader accept both kinds, and only new
+documents get ObjectIds.
+"""
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.ids import ID_STRATEGY, sync_counter
+from app.indexes import MODELS
+
+
+def status():
+    print(f"ID_STRATEGY={ID_STRATEGY}")
+    for model in MODELS:
+        collection = model._get_collection()
+        ints = collection.count_documents({'_id': {'$type': 'number'}})
+        oids = collection.count_documents({'_id': {'$type': 'objectId'}})
+        print(f"  {model._get_collection_name()}: {ints} integer ids, {oids} ObjectIds")
+
+
+def sync():
+    for model in MODELS:
+        value = sync_counter(model)
+        if value is None:
+            print(f"  {model._get_collection_name()}: ObjectId keys, no counter")
+        else:
+            print(f"✓ {model._get_collection_name()}: counter at {value}")
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'status'
+    if command not in ('status', 'sync'):
+        print(__doc__)
+        sys.exit(2)
+    app = create_app()
+    with app.app_context():
+        status() if command == 'status' else sync()
@@ -0,0 +1,43 @@
+"""Settle payments whose M-Pesa callback never arrived, using the STK push query API.
+
+Usage:
+  python scripts/reconcile_payments.py                    # payments open for more than 5 minutes
+  python scripts/reconcile_payments.py --older-than 60    # only payments older than an hour
+  python scripts/reconcile_payments.py --dry-run          # report what would change, write nothing
+
+Safe to run repeatedly (e.g. from cron): settled payments are never touched twice.
+Exits with status 1 if any status query failed.
+"""
+import argparse
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.reconcile import reconcile, print_summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--older-than', type=int, default=5, metavar='MINUTES', help='only payments open longer than this')
+    parser.add_argument('--batch-size', type=int, default=100, help='payments read from MongoDB per batch')
+    parser.add_argument('--concurrency', type=int, default=4, help='parallel status queries')
+    parser.add_argument('--rate', type=float, default=5.0, help='maximum status queries per second')
+    parser.add_argument('--dry-run', action='store_true', help='query M-Pesa but do not update payments')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        summary = reconcile(
+            older_than_minutes=args.older_than,
+            batch_size=args.batch_size,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            dry_run=args.dry_run,
+        )
+    print_summary(summary, dry_run=args.dry_run)
+    sys.exit(1 if summary['error'] else 0)
+
+
+if __name__ == '__main__':
+    main()
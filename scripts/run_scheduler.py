@@ -0,0 +1,39 @@
+"""Run periodic maintenance: expire featured listings.
+
+Usage:
+  python scripts/run_scheduler.py          # run every task on its interval until interrupted
+  python scripts/run_scheduler.py --once   # run each task once and exit (cron)
+
+Interval: FEATURE_EXPIRY_INTERVAL (seconds, default 300).
+Unanswered payments are settled by scripts/reconcile_payments.py, which asks M-Pesa first.
+"""
+import argparse
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.scheduler import run_scheduler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--once', action='store_true', help='run each task once and exit')
+    args = parser.parse_args()
+
+    app = create_app()
+    if args.once:
+        for name, changed in run_scheduler(app, once=True).items():
+            status = '✗' if changed is None else '✓'
+            print(f"{status} {name}: {changed if changed is not None else 'failed'}")
+        return
+
+    print("⏱️  Scheduler started")
+    try:
+        run_scheduler(app)
+    except KeyboardInterrupt:
+        print("\n👋 Scheduler stopped")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""Run the background job worker (outbound email and other queued jobs).
+
+Usage:
+  python scripts/run_worker.py            # poll for jobs until interrupted
+  python scripts/run_worker.py --once     # process the jobs that are due, then exit
+  python scripts/run_worker.py --kind send_email   # a worker dedicated to outbound email
+
+Start one or more of these next to the web process; jobs are claimed
+atomically, so several workers never run the same job twice.
+"""
+import argparse
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.jobs import work
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--once', action='store_true', help='process due jobs and exit')
+    parser.add_argument('--poll-interval', type=float, default=1.0, help='seconds to sleep when the queue is empty')
+    parser.add_argument('--kind', action='append', dest='kinds', help='only run jobs of this kind (repeatable)')
+    args = parser.parse_args()
+
+    app = create_app()
+    print("👷 Job worker started")
+    try:
+        processed = work(app, once=args.once, poll_interval=args.poll_interval, kinds=args.kinds)
+    except KeyboardInterrupt:
+        print("\n👋 Job worker stopped")
+        return
+    print(f"✓ Processed {processed} job(s)")
+
+
+if __name__ == '__main__':
+    main()
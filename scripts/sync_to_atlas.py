@@ -0,0 +1,48 @@
+"""Push changes from a local MongoDB database to Atlas without deleting and re-inserting everything.
+
+Usage:
+  python scripts/sync_to_atlas.py --dry-run                  # show what would change
+  python scripts/sync_to_atlas.py                            # apply new, changed and deleted documents
+  python scripts/sync_to_atlas.py --collections celebrities users
+  python scripts/sync_to_atlas.py --full                     # re-send everything, drop target-only documents
+
+Credentials are read from the environment or instance/.env (see app/dbsync.py):
+SYNC_SOURCE_URI, SYNC_TARGET_URI (default MONGO_URI), SYNC_SOURCE_DB, SYNC_TARGET_DB.
+"""
+import argparse
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.dbsync import DEFAULT_BATCH_SIZE, connect_from_env, sync_databases, print_summary
+
+
+def main(argv=None, source_db=None, target_db=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--collections', nargs='+', help='collections to sync (default: all)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='documents read and written per batch')
+    parser.add_argument('--source-db', default=source_db, help='source database name (default: SYNC_SOURCE_DB)')
+    parser.add_argument('--target-db', default=target_db, help='target database name (default: SYNC_TARGET_DB)')
+    parser.add_argument('--dry-run', action='store_true', help='report the diff without writing anything')
+    parser.add_argument('--full', action='store_true', help='ignore previous runs and delete target-only documents')
+    args = parser.parse_args(argv)
+
+    try:
+        source, target, key = connect_from_env(args.source_db, args.target_db)
+    except Exception as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print(f"--- Syncing {source.name} → {target.name}{' (dry run)' if args.dry_run else ''} ---")
+    summary = sync_databases(
+        source, target, key,
+        collections=args.collections,
+        batch_size=args.batch_size,
+        dry_run=args.dry_run,
+        full=args.full,
+    )
+    print_summary(summary, dry_run=args.dry_run)
+
+
+if __name__ == '__main__':
+    main()
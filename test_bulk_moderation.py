@@ -0,0 +1,94 @@
+"""Test bulk approval and rejection of celebrity submissions"""
+import uuid
+from app import create_app
+from app.models import User, Celebrity, CelebritySubmission
+from app.moderation import approve_submissions, reject_submissions
+from app.slugs import _counters
+
+
+def make_submissions(name, count):
+    subs = [CelebritySubmission(name=name, email='bulk@test.com', phone='0700000000', bio='Bulk test') for _ in range(count)]
+    for sub in subs:
+        sub.save()
+    return subs
+
+
+def reset(name, base):
+    CelebritySubmission.objects(name=name).delete()
+    Celebrity.objects(slug__startswith=base).delete()
+    _counters().delete_one({'_id': base})
+
+
+def test_bulk_approve():
+    app = create_app()
+    with app.app_context():
+        reset('Bulk John', 'bulk-john')
+        subs = make_submissions('Bulk John', 20)
+        # Taken outside the counter, so one insert collides and is retried
+        Celebrity(name='Other', slug='bulk-john-3').save()
+
+        report = approve_submissions([s.id for s in subs] + [999999999])
+        assert len(report['approved']) == 20 and not report['failed']
+        assert report['skipped'] == [999999999]
+        slugs = [slug for _, slug in report['approved']]
+        assert len(set(slugs)) == 20 and 'bulk-john-3' not in slugs
+        assert CelebritySubmission.objects(name='Bulk John', status='approved').count() == 20
+        celeb = Celebrity.objects.get(slug=slugs[0])
+        assert celeb.version == 1 and celeb.updated_at
+        print("   ✓ 20 submissions approved with unique slugs, collision retried")
+
+        again = approve_submissions([s.id for s in subs])
+        assert not again['approved'] and len(again['skipped']) == 20
+        print("   ✓ Already approved submissions are skipped")
+
+
+def test_retry_after_interrupted_approval():
+    app = create_app()
+    with app.app_context():
+        reset('Bulk Retry', 'bulk-retry')
+        subs = make_submissions('Bulk Retry', 3)
+        # An earlier approval created the first celebrity, then died before marking the submission
+        Celebrity(name='Bulk Retry', slug='bulk-retry-old', source_submission_id=subs[0].id).save()
+
+        report = approve_submissions([s.id for s in subs])
+        assert len(report['approved']) == 3 and not report['failed']
+        assert dict(report['approved'])[subs[0].id] == 'bulk-retry-old'
+        assert Celebrity.objects(source_submission_id=subs[0].id).count() == 1
+        assert Celebrity.objects(slug__startswith='bulk-retry').count() == 3
+        assert CelebritySubmission.objects(name='Bulk Retry', status='approved').count() == 3
+        print("   ✓ Retried approval reuses the celebrity of the interrupted one")
+
+
+def test_bulk_reject_and_route():
+    app = create_app()
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        reset('Bulk Jane', 'bulk-jane')
+        subs = make_submissions('Bulk Jane', 6)
+        assert reject_submissions([s.id for s in subs[:2]]) == {'rejected': 2, 'skipped': 0}
+
+        username = f"bulk_{uuid.uuid4().hex[:8]}"
+        admin = User(username=username, email=f"{username}@test.com", roles=['admin'])
+        admin.set_password('secret123')
+        admin.save()
+
+    client = app.test_client()
+    client.post('/admin/login', data={'username': username, 'password': 'secret123'})
+    response = client.post('/admin/submissions/bulk', data={
+        'action': 'approve', 'submission_ids': [str(s.id) for s in subs],
+    }, follow_redirects=True)
+    assert response.status_code == 200
+    assert b'4 submission(s) approved' in response.data
+    assert b'2 submission(s) skipped' in response.data
+    with app.app_context():
+        assert Celebrity.objects(slug__startswith='bulk-jane').count() == 4
+    print("   ✓ Bulk route approves the selection and reports skipped ones")
+
+
+if __name__ == '__main__':
+    print("\n=== Bulk Moderation Tests ===\n")
+    test_bulk_approve()
+    test_retry_after_interrupted_approval()
+    test_bulk_reject_and_route()
+    print("\n✅ All bulk moderation tests passed!")
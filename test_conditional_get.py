@@ -0,0 +1,43 @@
+"""Test conditional GETs of celebrity profiles: weak, private ETags and 304s"""
+import uuid
+from app import create_app
+from app.models import Celebrity
+from app.routes import save_object
+
+
+def test_profile_revalidation():
+    app = create_app()
+    app.config['TESTING'] = True
+    slug = f"etag-test-{uuid.uuid4().hex[:8]}"
+    with app.app_context():
+        Celebrity(name='ETag Test', slug=slug, bio='Before').save()
+    client = app.test_client()
+    try:
+        first = client.get(f'/celebrity/{slug}')
+        assert first.status_code == 200
+        etag = first.headers['ETag']
+        assert etag.startswith('W/'), "The page embeds a CSRF token, so its ETag must be weak"
+        assert first.cache_control.private and first.cache_control.no_cache
+        print("   ✓ Profile has a weak ETag and private, no-cache Cache-Control")
+
+        again = client.get(f'/celebrity/{slug}', headers={'If-None-Match': etag})
+        assert again.status_code == 304 and not again.data
+        print("   ✓ Unchanged profile answers If-None-Match with 304")
+
+        with app.app_context():
+            celeb = Celebrity.objects.get(slug=slug)
+            celeb.bio = 'After'
+            save_object(celeb)
+        changed = client.get(f'/celebrity/{slug}', headers={'If-None-Match': etag})
+        assert changed.status_code == 200 and b'After' in changed.data
+        assert changed.headers['ETag'] != etag
+        print("   ✓ Saving the celebrity changes the ETag")
+    finally:
+        with app.app_context():
+            Celebrity.objects(slug=slug).delete()
+
+
+if __name__ == '__main__':
+    print("\n=== Conditional GET Tests ===\n")
+    test_profile_revalidation()
+    print("\n✅ All conditional GET tests passed!")
@@ -0,0 +1,79 @@
+"""Test the incremental database sync between two throwaway databases"""
+import uuid
+from mongoengine.connection import get_db
+from app import create_app
+from app.dbsync import sync_collection, sync_databases, STATE_COLLECTION
+
+
+def throwaway_databases():
+    client = get_db().client
+    name = f"test_dbsync_{uuid.uuid4().hex[:8]}"
+    return client[f"{name}_source"], client[f"{name}_target"]
+
+
+def drop(*databases):
+    for db in databases:
+        db.client.drop_database(db.name)
+
+
+def test_incremental_sync():
+    app = create_app()
+    with app.app_context():
+        source, target = throwaway_databases()
+        try:
+            source.items.insert_many([{'_id': i, 'name': f'item {i}'} for i in range(10)])
+            first = sync_collection(source, target, 'items', 'test-target', batch_size=3)
+            assert first['inserted'] == 10 and first['scanned'] == 10 and not first['deleted']
+            assert target.items.count_documents({}) == 10
+            print("   ✓ First run copies every document")
+
+            again = sync_collection(source, target, 'items', 'test-target', batch_size=3)
+            assert again['unchanged'] == 10 and not (again['inserted'] or again['updated'] or again['deleted'])
+            print("   ✓ Run without changes writes nothing")
+
+            source.items.update_one({'_id': 3}, {'$set': {'name': 'changed'}})
+            source.items.delete_one({'_id': 7})
+            source.items.insert_one({'_id': 10, 'name': 'item 10'})
+            preview = sync_collection(source, target, 'items', 'test-target', dry_run=True)
+            assert (preview['inserted'], preview['updated'], preview['deleted']) == (1, 1, 1)
+            assert target.items.find_one({'_id': 3})['name'] == 'item 3'
+            assert target.items.count_documents({}) == 10 and not target.items.find_one({'_id': 10})
+            print("   ✓ Dry run reports the changes without writing them")
+
+            applied = sync_collection(source, target, 'items', 'test-target')
+            assert (applied['inserted'], applied['updated'], applied['deleted'], applied['unchanged']) == (1, 1, 1, 8)
+            assert target.items.find_one({'_id': 3})['name'] == 'changed'
+            assert not target.items.find_one({'_id': 7}) and target.items.find_one({'_id': 10})
+            assert sorted(d['_id'] for d in target.items.find()) == sorted(d['_id'] for d in source.items.find())
+            print("   ✓ Change, insert and delete applied to the target")
+        finally:
+            drop(source, target)
+
+
+def test_full_sync_removes_target_only_documents():
+    app = create_app()
+    with app.app_context():
+        source, target = throwaway_databases()
+        try:
+            source.items.insert_many([{'_id': i} for i in range(3)])
+            source.others.insert_one({'_id': 'a'})
+            target.items.insert_one({'_id': 'written-on-target'})
+
+            summary = sync_databases(source, target, 'test-target', report=lambda message: None)
+            assert set(summary) == {'items', 'others'}, "The state collection must not be synced"
+            assert target.items.find_one({'_id': 'written-on-target'}), "Incremental runs leave target documents alone"
+
+            full = sync_collection(source, target, 'items', 'test-target', full=True)
+            assert full['deleted'] == 1 and full['inserted'] == 3
+            assert not target.items.find_one({'_id': 'written-on-target'})
+            assert source[STATE_COLLECTION].count_documents({'t': 'test-target', 'c': 'items'}) == 3
+            print("   ✓ Full sync removes documents missing from the source")
+        finally:
+            drop(source, target)
+
+
+if __name__ == '__main__':
+    print("\n=== Database Sync Tests ===\n")
+    test_incremental_sync()
+    test_full_sync_removes_target_only_documents()
+    print("\n✅ All database sync tests passed!")
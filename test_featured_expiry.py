@@ -0,0 +1,49 @@
+"""Test that paid featured listings stop showing and are un-featured once they expire"""
+from datetime import datetime, timedelta
+from app import create_app
+from app.models import Celebrity
+from app.routes import get_featured_celebrities
+from app.featured import expire_featured_listings
+
+
+def make_celeb(slug, featured_until):
+    Celebrity.objects(slug=slug).delete()
+    celeb = Celebrity(name=slug.replace('-', ' ').title(), slug=slug, bio='Expiry test',
+                      featured=True, featured_until=featured_until)
+    celeb.save()
+    return celeb
+
+
+def test_featured_query_excludes_expired():
+    app = create_app()
+    with app.app_context():
+        make_celeb('expiry-past', datetime.utcnow() - timedelta(days=1))
+        make_celeb('expiry-future', datetime.utcnow() + timedelta(days=1))
+        make_celeb('expiry-none', None)
+        slugs = {c.slug for c in get_featured_celebrities()}
+        assert 'expiry-past' not in slugs
+        assert {'expiry-future', 'expiry-none'} <= slugs
+        print("   ✓ Expired listing hidden before the sweep runs")
+
+
+def test_expiry_sweep_unfeatures_in_bulk():
+    app = create_app()
+    with app.app_context():
+        expired = make_celeb('expiry-past', datetime.utcnow() - timedelta(days=1))
+        make_celeb('expiry-future', datetime.utcnow() + timedelta(days=1))
+        version = expired.version
+
+        assert expire_featured_listings() >= 1
+        expired.reload()
+        assert not expired.featured and expired.feature_status == 'expired'
+        assert expired.version == version + 1, "Profile ETag must change"
+        assert Celebrity.objects.get(slug='expiry-future').featured
+        assert expire_featured_listings() == 0
+        print("   ✓ Sweep un-featured only the expired listing")
+
+
+if __name__ == '__main__':
+    print("\n=== Featured Expiry Tests ===\n")
+    test_featured_query_excludes_expired()
+    test_expiry_sweep_unfeatures_in_bulk()
+    print("\n✅ All featured expiry tests passed!")
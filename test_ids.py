@@ -0,0 +1,85 @@
+"""Test primary key allocation: hi/lo blocks, bulk reservation and counter sync"""
+from bson import ObjectId
+from mongoengine import Document, StringField
+from mongoengine.connection import get_db
+from app import create_app
+from app.ids import BlockSequenceField, allocate_ids, sync_counter, parse_id
+
+
+class IdTestDoc(Document):
+    meta = {'collection': 'test_block_ids'}
+    id = BlockSequenceField(primary_key=True, block_size=5)
+    name = StringField()
+
+
+def reset():
+    IdTestDoc.drop_collection()
+    field = IdTestDoc._fields['id']
+    get_db()[field.collection_name].delete_one({'_id': f"{field.get_sequence_name()}.{field.name}"})
+    # Forget the block held in memory, like a freshly started worker
+    field._next, field._last = 1, 0
+
+
+def save_many(count):
+    docs = [IdTestDoc(name=str(i)) for i in range(count)]
+    for doc in docs:
+        doc.save()
+    return [doc.id for doc in docs]
+
+
+def test_block_ids_unique_and_increasing():
+    app = create_app()
+    with app.app_context():
+        reset()
+        try:
+            first = save_many(12)  # spans three blocks of 5
+            assert first == sorted(first) and len(set(first)) == 12
+            print("   ✓ Ids from consecutive blocks are unique and increasing")
+
+            reserved = allocate_ids(IdTestDoc, 7)
+            assert reserved == list(range(reserved[0], reserved[0] + 7)) and reserved[0] > first[-1]
+            later = save_many(4)
+            assert not set(later) & set(first + reserved)
+            print("   ✓ Bulk reservation does not overlap ids handed out from blocks")
+
+            # Another worker starts with an empty block
+            IdTestDoc._fields['id']._next, IdTestDoc._fields['id']._last = 1, 0
+            restarted = save_many(3)
+            assert min(restarted) > max(first + reserved + later)
+            print("   ✓ A new worker continues after every id already reserved")
+        finally:
+            reset()
+
+
+def test_sync_counter_moves_past_imported_ids():
+    app = create_app()
+    with app.app_context():
+        reset()
+        try:
+            save_many(2)
+            # An import writes explicit ids without touching the counter
+            IdTestDoc._get_collection().insert_many([{'_id': 500, 'name': 'imported'}, {'_id': 1000, 'name': 'imported'}])
+            assert sync_counter(IdTestDoc) == 1000
+            IdTestDoc._fields['id']._next, IdTestDoc._fields['id']._last = 1, 0
+            assert save_many(1)[0] > 1000
+            assert sync_counter(IdTestDoc) >= 1000, "sync_counter never lowers a counter"
+            print("   ✓ sync_counter moves the counter past imported ids")
+        finally:
+            reset()
+
+
+def test_parse_id():
+    oid = ObjectId()
+    assert parse_id('42') == 42
+    assert parse_id(str(oid)) == oid
+    assert parse_id(7) == 7
+    assert parse_id('not-an-id') == 'not-an-id'
+    print("   ✓ parse_id handles integer, ObjectId and other values")
+
+
+if __name__ == '__main__':
+    print("\n=== Id Allocation Tests ===\n")
+    test_block_ids_unique_and_increasing()
+    test_sync_counter_moves_past_imported_ids()
+    test_parse_id()
+    print("\n✅ All id allocation tests passed!")
@@ -0,0 +1,68 @@
+"""Test upload renditions and the widths advertised in srcset"""
+import io
+import os
+import tempfile
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+from app.images import RENDITIONS, process_upload, photo_srcset, rendition_width
+
+
+def upload(width, height):
+    data = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 80, 40)).save(data, 'PNG')
+    data.seek(0)
+    return FileStorage(stream=data, filename='photo.png')
+
+
+def test_srcset_uses_real_widths():
+    with tempfile.TemporaryDirectory() as folder:
+        large = process_upload(upload(2000, 1000), folder, 'large')
+        assert photo_srcset(large, upload_folder=folder) == (
+            '/static/uploads/large-card.jpg 480w, '
+            '/static/uploads/large-profile.jpg 640w, '
+            '/static/uploads/large-original.jpg 1600w'
+        )
+
+        # Smaller than every target: nothing is upscaled, so one width is listed once
+        small = process_upload(upload(300, 300), folder, 'small')
+        assert photo_srcset(small, 'webp', upload_folder=folder) == '/static/uploads/small-card.webp 300w'
+        print("   ✓ srcset describes the files that were written")
+
+
+def test_profile_not_narrower_than_card():
+    assert RENDITIONS['profile'] >= RENDITIONS['card']
+    print("   ✓ Profile rendition is at least as wide as the card")
+
+
+def test_unreadable_width_not_cached():
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'late-card.jpg')
+        assert rendition_width(path) is None  # not written yet
+        Image.new('RGB', (320, 200)).save(path, 'JPEG')
+        assert rendition_width(path) == 320
+        print("   ✓ A failed read is retried once the file exists")
+
+
+def test_decompression_bomb_rejected():
+    limit = Image.MAX_IMAGE_PIXELS
+    Image.MAX_IMAGE_PIXELS = 1000  # a 100x100 upload now counts as a bomb
+    try:
+        with tempfile.TemporaryDirectory() as folder:
+            try:
+                process_upload(upload(100, 100), folder, 'bomb')
+                assert False, "A decompression bomb must be rejected"
+            except ValueError:
+                pass
+            assert not os.listdir(folder)
+        print("   ✓ Decompression bomb rejected as an unreadable image")
+    finally:
+        Image.MAX_IMAGE_PIXELS = limit
+
+
+if __name__ == '__main__':
+    print("\n=== Image Rendition Tests ===\n")
+    test_srcset_uses_real_widths()
+    test_profile_not_narrower_than_card()
+    test_unreadable_width_not_cached()
+    test_decompression_bomb_rejected()
+    print("\n✅ All image rendition tests passed!")
@@ -0,0 +1,97 @@
+"""Test the pooled upstream clients: keep-alive, retry policy and metrics"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app.integrations import Upstream, RateLimiter
+
+
+class FlakyUpstream(BaseHTTPRequestHandler):
+    """Answers 503 to the first `failures` requests of each path, then 200"""
+    protocol_version = 'HTTP/1.1'
+    failures = 1
+    seen = {}
+    client_ports = set()
+    lock = threading.Lock()
+
+    def _handle(self):
+        cls = type(self)
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        with cls.lock:
+            cls.client_ports.add(self.client_address[1])
+            cls.seen[self.path] = cls.seen.get(self.path, 0) + 1
+            status = 503 if cls.seen[self.path] <= cls.failures else 200
+        body = b'{}'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = _handle
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server():
+    FlakyUpstream.seen, FlakyUpstream.client_ports = {}, set()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FlakyUpstream)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def test_retry_policy():
+    server, base = start_server()
+    client = Upstream('test', timeout=(1, 2), retries=2, backoff_factor=0)
+    try:
+        assert client.get(f'{base}/get').status_code == 200
+        assert FlakyUpstream.seen['/get'] == 2, "GET is retried after a 503"
+        assert client.post(f'{base}/post').status_code == 503
+        assert FlakyUpstream.seen['/post'] == 1, "POST must not be repeated: it may not be idempotent"
+        print("   ✓ Only idempotent requests are retried")
+    finally:
+        client.close()
+        server.shutdown()
+
+
+def test_connections_kept_alive_and_metrics():
+    server, base = start_server()
+    FlakyUpstream.failures = 0
+    client = Upstream('test', timeout=(1, 2), retries=0)
+    try:
+        for i in range(5):
+            client.get(f'{base}/item/{i}')
+        assert len(FlakyUpstream.client_ports) == 1, "Calls must reuse one pooled connection"
+        print("   ✓ Five calls went over one kept-alive connection")
+
+        FlakyUpstream.failures = 1
+        client.post(f'{base}/fails')
+        metrics = client.metrics.snapshot()
+        assert metrics['calls'] == 6 and metrics['errors'] == 1
+        assert metrics['p50_ms'] is not None and metrics['max_ms'] >= metrics['p50_ms']
+        print("   ✓ Metrics count calls, 5xx errors and latency")
+    finally:
+        FlakyUpstream.failures = 1
+        client.close()
+        server.shutdown()
+
+
+def test_rate_limiter():
+    limiter = RateLimiter(rate=20, burst=2)
+    started = time.monotonic()
+    for _ in range(6):
+        limiter.acquire()
+    elapsed = time.monotonic() - started
+    # Two calls from the burst, four more at 20 per second
+    assert elapsed >= 0.18, f"Rate limit not applied ({elapsed:.3f}s)"
+    print(f"   ✓ 6 calls at 20/s with a burst of 2 took {elapsed:.2f}s")
+
+
+if __name__ == '__main__':
+    print("\n=== Integration Client Tests ===\n")
+    test_retry_policy()
+    test_connections_kept_alive_and_metrics()
+    test_rate_limiter()
+    print("\n✅ All integration client tests passed!")
@@ -0,0 +1,108 @@
+"""Test the background job queue and the queued contact email"""
+import uuid
+from datetime import datetime, timedelta
+from app import create_app
+from app import jobs, mailer
+from app.models import Job
+
+
+def make_app():
+    app = create_app()
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['MAIL_BACKEND'] = 'fake'
+    return app
+
+
+def unique_kind():
+    """A job kind of its own, so the tests never claim or delete jobs of the live queue"""
+    return f"test_{uuid.uuid4().hex[:8]}"
+
+
+def test_contact_form_enqueues_email():
+    app = make_app()
+    name = f"Queue Tester {uuid.uuid4().hex[:6]}"
+    with app.app_context():
+        mailer.outbox.clear()
+
+    client = app.test_client()
+    response = client.post('/contact', data={
+        'name': name,
+        'email': 'queue@test.com',
+        'message': 'Testing the background mail queue',
+    })
+    assert response.status_code == 302
+
+    with app.app_context():
+        job = Job.objects(kind='send_email', payload__subject=f'New message from {name}').first()
+        try:
+            assert job is not None and job.status == 'pending'
+            assert not mailer.outbox, "Email must not be sent inside the request"
+            print("   ✓ Contact form only enqueues the email")
+
+            # Oldest due job, so it is claimed ahead of any real email waiting in the queue
+            Job.objects(id=job.id).update_one(set__run_at=datetime(2000, 1, 1))
+            claimed = jobs.claim_next(kinds=['send_email'])
+            assert claimed.id == job.id
+            jobs.run_job(claimed)
+            assert Job.objects.get(id=job.id).status == 'done'
+            assert mailer.outbox[-1]['subject'] == f'New message from {name}'
+            print("   ✓ Worker delivered it to the fake mail sink")
+        finally:
+            Job.objects(kind='send_email', payload__subject=f'New message from {name}').delete()
+
+
+def test_failed_job_is_retried_with_backoff():
+    app = make_app()
+    kind = unique_kind()
+
+    @jobs.job_handler(kind)
+    def always_fails(payload):
+        raise RuntimeError('upstream down')
+
+    with app.app_context():
+        job = jobs.enqueue(kind, {}, max_attempts=2)
+
+    try:
+        assert jobs.work(app, once=True, kinds=[kind]) == 1
+        with app.app_context():
+            job.reload()
+            assert job.status == 'pending' and job.attempts == 1
+            assert job.run_at > datetime.utcnow(), "Retry must be scheduled in the future"
+            print("   ✓ First failure scheduled a retry")
+
+            Job.objects(id=job.id).update_one(set__run_at=datetime.utcnow() - timedelta(seconds=1))
+        jobs.work(app, once=True, kinds=[kind])
+        with app.app_context():
+            job.reload()
+            assert job.status == 'failed' and job.attempts == 2
+            print("   ✓ Job marked failed after max_attempts")
+    finally:
+        with app.app_context():
+            Job.objects(kind=kind).delete()
+        jobs.HANDLERS.pop(kind, None)
+
+
+def test_expired_lease_is_reclaimed():
+    app = make_app()
+    kind = unique_kind()
+    with app.app_context():
+        try:
+            job = jobs.enqueue(kind, {})
+            assert jobs.claim_next(kinds=[kind]).id == job.id
+            assert jobs.claim_next(kinds=[kind]) is None, "A running job must not be claimed twice"
+
+            Job.objects(id=job.id).update_one(set__locked_until=datetime.utcnow() - timedelta(seconds=1))
+            reclaimed = jobs.claim_next(kinds=[kind])
+            assert reclaimed.id == job.id and reclaimed.attempts == 2
+            print("   ✓ Job of a dead worker is picked up again")
+        finally:
+            Job.objects(kind=kind).delete()
+
+
+if __name__ == '__main__':
+    print("\n=== Job Queue Tests ===\n")
+    test_contact_form_enqueues_email()
+    test_failed_job_is_retried_with_backoff()
+    test_expired_lease_is_reclaimed()
+    print("\n✅ All job queue tests passed!")
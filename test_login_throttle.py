@@ -0,0 +1,69 @@
+"""Test that repeated login attempts are throttled before any user lookup"""
+import uuid
+from unittest import mock
+from app import create_app
+from app import routes
+from app.ratelimit import login_throttle, MemoryRateLimiter
+
+
+def make_app():
+    app = create_app()
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    login_throttle.backend.clear()
+    return app
+
+
+def teardown_function(function):
+    # Other test modules log in from the same address
+    login_throttle.backend.clear()
+
+
+def test_username_limit_returns_429_before_lookup():
+    app = make_app()
+    client = app.test_client()
+    username = f"victim_{uuid.uuid4().hex[:8]}"
+    for _ in range(login_throttle.per_username):
+        r = client.post('/user/login', data={'username': username, 'password': 'guess'})
+        assert r.status_code == 200
+
+    with mock.patch.object(routes, 'get_user_by_username', wraps=routes.get_user_by_username) as lookup:
+        r = client.post('/user/login', data={'username': username, 'password': 'guess'})
+        assert r.status_code == 429
+        assert int(r.headers['Retry-After']) > 0
+        assert lookup.call_count == 0, "Throttled attempts must not reach the database"
+    print(f"   ✓ Attempt {login_throttle.per_username + 1} for one username rejected with 429")
+
+
+def test_ip_limit_covers_admin_login_and_signup():
+    app = make_app()
+    client = app.test_client()
+    statuses = [
+        client.post('/admin/login', data={'username': f"u{i}", 'password': 'guess'}).status_code
+        for i in range(login_throttle.per_ip + 1)
+    ]
+    assert statuses[-1] == 429 and 429 not in statuses[:-1]
+    print("   ✓ One IP trying many usernames is throttled")
+
+    signup = client.post('/signup', data={
+        'full_name': 'Throttle Test', 'email': f"{uuid.uuid4().hex[:8]}@test.com",
+        'password': 'secret123', 'password_confirm': 'secret123', 'agree_terms': 'y',
+    })
+    assert signup.status_code != 429, "Scopes are counted separately"
+
+
+def test_memory_backend_is_bounded():
+    limiter = MemoryRateLimiter(max_keys=100)
+    for i in range(1000):
+        limiter.hit(f"ip:{i}", 5, 60)
+    assert len(limiter._counters) == 100
+    print("   ✓ In-memory limiter keeps at most max_keys keys")
+
+
+if __name__ == '__main__':
+    print("\n=== Login Throttle Tests ===\n")
+    for test in (test_username_limit_returns_429_before_lookup, test_ip_limit_covers_admin_login_and_signup,
+                 test_memory_backend_is_bounded):
+        test()
+        teardown_function(test)
+    print("\n✅ All login throttle tests passed!")
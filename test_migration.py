@@ -0,0 +1,92 @@
+"""Test the SQLite to MongoDB migration: resuming from a checkpoint and copying into a fresh database"""
+import os
+import tempfile
+import uuid
+from datetime import datetime
+from flask import Flask
+from mongoengine.connection import get_db, register_connection
+from mongoengine.context_managers import switch_db
+from app import create_app, DB
+from app.legacy_models import LegacyOnboardingRegistration
+from app.migration import migrate, load_checkpoint
+from app.models import OnboardingRegistration
+
+
+class Interrupted(Exception):
+    pass
+
+
+def legacy_app(folder, rows):
+    """A Flask app bound to a throwaway SQLite file holding `rows` onboarding registrations."""
+    legacy = Flask(__name__)
+    legacy.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(folder, 'legacy.db')}"
+    DB.init_app(legacy)
+    with legacy.app_context():
+        DB.create_all()
+        for i in range(1, rows + 1):
+            DB.session.add(LegacyOnboardingRegistration(
+                id=i, name=f'Legacy {i}', email=f'legacy{i}@test.com', phone='0700000000', created_at=datetime.utcnow(),
+            ))
+        DB.session.commit()
+    return legacy
+
+
+def throwaway_alias():
+    """A connection alias for a new, empty database on the server the app uses."""
+    client = get_db().client
+    alias = f"test_migration_{uuid.uuid4().hex[:8]}"
+    register_connection(alias, db=alias, mongo_client_class=lambda **settings: client)
+    return alias
+
+
+def interrupt_after_first_batch(message):
+    raise Interrupted(message)
+
+
+def run(checkpoint, report=lambda message: None):
+    return migrate(tables=['onboarding'], batch_size=2, checkpoint_path=checkpoint, report=report)['onboarding']
+
+
+def test_resume_then_copy_into_fresh_database():
+    create_app()
+    first, second = throwaway_alias(), throwaway_alias()
+    with tempfile.TemporaryDirectory() as folder:
+        checkpoint = os.path.join(folder, 'checkpoint.json')
+        legacy = legacy_app(folder, 5)
+        try:
+            with legacy.app_context(), switch_db(OnboardingRegistration, first):
+                try:
+                    run(checkpoint, report=interrupt_after_first_batch)
+                    assert False, "The first batch should have been interrupted"
+                except Interrupted:
+                    pass
+                assert load_checkpoint(checkpoint)['onboarding']['after'] == 2
+                resumed = run(checkpoint)
+                assert resumed['rows'] == 3 and resumed['inserted'] == 3
+                assert OnboardingRegistration.objects.count() == 5
+                assert not os.path.exists(checkpoint)
+                print("   ✓ Interrupted run resumes after the checkpoint, which is removed on completion")
+
+                # Interrupted again, then pointed at another database
+                try:
+                    run(checkpoint, report=interrupt_after_first_batch)
+                except Interrupted:
+                    pass
+                assert os.path.exists(checkpoint)
+
+            with legacy.app_context(), switch_db(OnboardingRegistration, second):
+                fresh = run(checkpoint)
+                assert fresh['rows'] == 5 and fresh['inserted'] == 5
+                assert OnboardingRegistration.objects.count() == 5
+                assert not os.path.exists(checkpoint)
+                print("   ✓ A checkpoint from another database is ignored; every row is copied")
+        finally:
+            client = get_db().client
+            client.drop_database(first)
+            client.drop_database(second)
+
+
+if __name__ == '__main__':
+    print("\n=== Migration Tests ===\n")
+    test_resume_then_copy_into_fresh_database()
+    print("\n✅ All migration tests passed!")
@@ -0,0 +1,84 @@
+"""Test the cached, single-flight M-Pesa OAuth token provider"""
+import threading
+import time
+from datetime import datetime, timedelta
+from app import create_app
+from app.mpesa import TokenProvider, MongoTokenStore
+
+
+def slow_fetcher(calls, lifetime=3599):
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)  # Daraja round trip
+        return f"TOKEN-{len(calls)}", datetime.utcnow() + timedelta(seconds=lifetime)
+    return fetch
+
+
+def test_concurrent_requests_fetch_once():
+    calls = []
+    provider = TokenProvider(fetch=slow_fetcher(calls))
+    tokens = []
+    threads = [threading.Thread(target=lambda: tokens.append(provider.get_token())) for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1, f"Expected one token request, got {len(calls)}"
+    assert set(tokens) == {'TOKEN-1'}
+    print("   ✓ 20 concurrent payments shared one token request")
+
+
+def test_token_shared_between_workers():
+    app = create_app()
+    with app.app_context():
+        store = MongoTokenStore('test-token-store')
+        store.collection.delete_many({'_id': 'test-token-store'})
+        calls = []
+        # Two providers with one store behave like two gunicorn workers
+        worker_a = TokenProvider(fetch=slow_fetcher(calls), store=store)
+        worker_b = TokenProvider(fetch=slow_fetcher(calls), store=store)
+        assert worker_a.get_token() == worker_b.get_token() == 'TOKEN-1'
+        assert len(calls) == 1
+        print("   ✓ Second worker reused the token from MongoDB")
+        store.collection.delete_many({'_id': 'test-token-store'})
+
+
+def test_failed_fetch_not_retried():
+    app = create_app()
+    with app.app_context():
+        store = MongoTokenStore('test-token-failure')
+        store.collection.delete_many({'_id': 'test-token-failure'})
+        calls = []
+
+        def failing_fetch():
+            calls.append(1)
+            raise RuntimeError('Daraja returned 503')
+
+        provider = TokenProvider(fetch=failing_fetch, store=store)
+        try:
+            provider.get_token()
+            assert False, "A failed token request must raise"
+        except RuntimeError:
+            pass
+        assert len(calls) == 1, f"Expected one token request, got {len(calls)}"
+        assert store.acquire_lease('next-worker', 5), "The lease must be released after a failure"
+        print("   ✓ Failed token request raised once and released the lease")
+        store.collection.delete_many({'_id': 'test-token-failure'})
+
+
+def test_token_refreshed_before_expiry():
+    calls = []
+    provider = TokenProvider(fetch=slow_fetcher(calls, lifetime=60), margin=120)
+    provider.get_token()
+    provider.get_token()
+    assert len(calls) == 2, "A token inside the refresh margin must not be reused"
+    print("   ✓ Token close to expiry is refreshed")
+
+
+if __name__ == '__main__':
+    print("\n=== M-Pesa Token Provider Tests ===\n")
+    test_concurrent_requests_fetch_once()
+    test_token_shared_between_workers()
+    test_failed_fetch_not_retried()
+    test_token_refreshed_before_expiry()
+    print("\n✅ All token provider tests passed!")
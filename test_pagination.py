@@ -0,0 +1,72 @@
+"""Test keyset pagination forwards and backwards over documents sharing created_at"""
+import uuid
+from datetime import datetime, timedelta
+from app import create_app
+from app.models import Celebrity
+from app.pagination import paginate, encode_cursor, decode_cursor
+
+
+def make_celebrities(tag):
+    # Seven of the ten share one created_at, so pages must split ties on id
+    tied = datetime(2020, 1, 1, 12, 0, 0)
+    times = [tied + timedelta(minutes=1)] + [tied] * 7 + [tied - timedelta(minutes=1)] * 2
+    for i, created_at in enumerate(times):
+        Celebrity(name=f'Page {tag} {i}', slug=f'page-{tag}-{i}', category=tag, created_at=created_at).save()
+    return Celebrity.objects(category=tag)
+
+
+def expected_order(queryset):
+    return [c.id for c in sorted(queryset, key=lambda c: (c.created_at, c.id), reverse=True)]
+
+
+def test_forward_and_back_over_ties():
+    app = create_app()
+    tag = f"pagetest{uuid.uuid4().hex[:8]}"
+    with app.app_context():
+        try:
+            queryset = make_celebrities(tag)
+            expected = expected_order(queryset)
+
+            pages, page = [], paginate(queryset, page_size=3)
+            assert not page.has_prev
+            pages.append(page)
+            while page.has_next:
+                page = paginate(queryset, after=page.next_cursor, page_size=3)
+                assert page.has_prev
+                pages.append(page)
+            assert [len(p) for p in pages] == [3, 3, 3, 1]
+            assert [c.id for p in pages for c in p] == expected
+            print("   ✓ Forward pages cover every document once, in order, across tied created_at")
+
+            back = pages[-1]
+            for earlier in reversed(pages[:-1]):
+                back = paginate(queryset, before=back.prev_cursor, page_size=3)
+                assert [c.id for c in back] == [c.id for c in earlier]
+            assert not back.has_prev and back.has_next
+            print("   ✓ Backward pages return the same pages in reverse")
+        finally:
+            Celebrity.objects(category=tag).delete()
+
+
+def test_malformed_cursor():
+    app = create_app()
+    tag = f"pagetest{uuid.uuid4().hex[:8]}"
+    with app.app_context():
+        try:
+            queryset = make_celebrities(tag)
+            first = paginate(queryset, page_size=4)
+            for cursor in ('not-a-cursor', '!!!', encode_cursor(first.items[0])[:-4]):
+                assert decode_cursor(cursor) is None
+                page = paginate(queryset, after=cursor, page_size=4)
+                assert [c.id for c in page] == [c.id for c in first] and not page.has_prev
+            assert [c.id for c in paginate(queryset, before='garbage', page_size=4)] == [c.id for c in first]
+            print("   ✓ Malformed cursors fall back to the first page")
+        finally:
+            Celebrity.objects(category=tag).delete()
+
+
+if __name__ == '__main__':
+    print("\n=== Pagination Tests ===\n")
+    test_forward_and_back_over_ties()
+    test_malformed_cursor()
+    print("\n✅ All pagination tests passed!")
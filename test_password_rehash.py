@@ -0,0 +1,70 @@
+"""Test configurable password hashing and rehash on login"""
+import uuid
+from app import create_app
+from app import passwords
+from app.models import User
+
+OLD_METHOD = 'pbkdf2:sha256:1000'
+NEW_METHOD = 'pbkdf2:sha256:2000'
+
+
+def test_hash_upgraded_on_login():
+    app = create_app()
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    try:
+        with app.app_context():
+            passwords.configure(OLD_METHOD)
+            username = f"rehash_{uuid.uuid4().hex[:8]}"
+            user = User(username=username, email=f"{username}@test.com")
+            user.set_password('secret123')
+            user.save()
+            assert user.password_hash.startswith(OLD_METHOD + '$')
+
+            passwords.configure(NEW_METHOD)
+            assert passwords.needs_rehash(user.password_hash)
+
+        client = app.test_client()
+        client.post('/user/login', data={'username': 'wrong-' + username, 'password': 'secret123'})
+        client.post('/user/login', data={'username': username, 'password': 'nope'})
+        with app.app_context():
+            assert User.objects.get(username=username).password_hash.startswith(OLD_METHOD + '$'), \
+                "Failed logins must not touch the hash"
+
+        response = client.post('/user/login', data={'username': username, 'password': 'secret123'})
+        assert response.status_code == 302
+        with app.app_context():
+            stored = User.objects.get(username=username)
+            assert stored.password_hash.startswith(NEW_METHOD + '$')
+            assert stored.check_password('secret123')
+            assert not passwords.needs_rehash(stored.password_hash)
+            print("   ✓ Hash upgraded to the configured method on login")
+    finally:
+        passwords.configure()
+
+
+def test_concurrent_password_change_wins():
+    app = create_app()
+    try:
+        with app.app_context():
+            passwords.configure(OLD_METHOD)
+            username = f"rehash_{uuid.uuid4().hex[:8]}"
+            user = User(username=username, email=f"{username}@test.com")
+            user.set_password('secret123')
+            user.save()
+
+            # The password changes after this login checked it but before the rehash
+            User.objects(id=user.id).update_one(set__password_hash=passwords.hash_password('changed'))
+            passwords.configure(NEW_METHOD)
+            assert not user.rehash_password_if_needed('secret123')
+            assert User.objects.get(id=user.id).check_password('changed')
+            print("   ✓ Rehash never overwrites a newer password")
+    finally:
+        passwords.configure()
+
+
+if __name__ == '__main__':
+    print("\n=== Password Rehash Tests ===\n")
+    test_hash_upgraded_on_login()
+    test_concurrent_password_change_wins()
+    print("\n✅ All password rehash tests passed!")
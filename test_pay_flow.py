@@ -85,34 +85,55 @@ with app.app_context():
     # Use same csrf token for JSON header
     headers = {'Content-Type':'application/json', 'X-CSRFToken': csrf}
 
-    # Mock external Safaricom requests to avoid real network calls during test
+    # Mock external Safaricom requests to avoid real network calls during test.
+    # Integrations go through pooled sessions (app/integrations.py), so patch Session.request
+    import uuid
     import requests as _requests
     class MockResp:
+        status_code = 200
         def __init__(self, data):
             self._data = data
         def json(self):
             return self._data
+        def raise_for_status(self):
+            pass
 
-    _orig_get = _requests.get
-    _orig_post = _requests.post
-    _requests.get = lambda *a, **k: MockResp({'access_token': 'MOCK_TOKEN'})
-    _requests.post = lambda *a, **k: MockResp({'ResponseCode': '0', 'ResponseDescription': 'Success'})
+    def _mock_request(self, method, url, *a, **k):
+        if method == 'GET':
+            return MockResp({'access_token': 'MOCK_TOKEN'})
+        return MockResp({'ResponseCode': '0', 'ResponseDescription': 'Success', 'CheckoutRequestID': 'ws_CO_' + uuid.uuid4().hex})
+
+    _orig_request = _requests.Session.request
+    _requests.Session.request = _mock_request
 
     # Call /pay
     import json
     payload = {'phone':'254700000000','amount':500,'celebrity_slug':slug}
     r = client.post('/pay', data=json.dumps(payload), headers=headers)
-    # Restore requests
-    _requests.get = _orig_get
-    _requests.post = _orig_post
     print('/pay ->', r.status_code)
-    if r.status_code != 200:
+    if r.status_code != 202:
         print('PAY failed', r.data)
         sys.exit(4)
     result = r.get_json()
     payment_ref = result.get('payment_ref')
     print('Payment ref:', payment_ref)
 
+    # The STK push runs in the background: poll the status endpoint until it was sent
+    import time
+    status = None
+    for _ in range(50):
+        status = client.get(result['status_url']).get_json()['status']
+        if status != 'initiated':
+            break
+        time.sleep(0.1)
+    print('Payment status after push:', status)
+    assert status == 'pushed'
+    # Restore requests
+    _requests.Session.request = _orig_request
+    # Don't leave the mock token in the shared M-Pesa token cache
+    from app.mpesa import token_provider
+    token_provider.invalidate()
+
     # Verify celeb status pending
     celeb.reload() if USE_MONGO else None
     if USE_MONGO:
@@ -152,6 +173,7 @@ with app.app_context():
         celeb.reload()
     else:
         DB.session.refresh(celeb)
+    print('Payment status after callback:', client.get(result['status_url']).get_json()['status'])
     print('Feature status after callback:', celeb.feature_status)
     print('Featured flag:', celeb.featured)
     print('Featured until:', celeb.featured_until)
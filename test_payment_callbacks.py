@@ -0,0 +1,195 @@
+"""Test the Payment state machine and idempotent M-Pesa callback handling"""
+import threading
+import uuid
+from datetime import datetime, timedelta
+import requests
+from urllib3.exceptions import NewConnectionError, MaxRetryError
+from app import create_app
+from app import routes
+from app.models import Celebrity, Payment, User
+from app.mpesa import token_provider
+from app.payments import process_callback, expire_stale_payments, transition, push_stk
+
+
+def make_app():
+    app = create_app()
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    return app
+
+
+def make_payment(slug='callback-test-artist'):
+    if not Celebrity.objects(slug=slug).first():
+        Celebrity(name='Callback Test Artist', slug=slug, bio='Callback test').save()
+    payment = Payment(ref=str(uuid.uuid4()), celebrity_slug=slug, phone='254700000000', amount=500)
+    payment.save()
+    checkout_id = 'ws_CO_' + uuid.uuid4().hex
+    transition({'ref': payment.ref}, 'pushed', checkout_request_id=checkout_id)
+    return payment.ref, checkout_id
+
+
+def success_callback(checkout_id, receipt='RCPT123'):
+    return {
+        'CheckoutRequestID': checkout_id,
+        'ResultCode': 0,
+        'ResultDesc': 'The service request is processed successfully.',
+        'CallbackMetadata': {'Item': [
+            {'Name': 'Amount', 'Value': 500},
+            {'Name': 'MpesaReceiptNumber', 'Value': receipt},
+        ]},
+    }
+
+
+def test_duplicate_callbacks_are_noops():
+    app = make_app()
+    with app.app_context():
+        ref, checkout_id = make_payment()
+        assert process_callback(success_callback(checkout_id)) is not None
+        celeb = Celebrity.objects.get(slug='callback-test-artist')
+        featured_until, version = celeb.featured_until, celeb.version
+
+        # Safaricom retries the same callback several times, concurrently
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(process_callback(success_callback(checkout_id))))
+                   for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert results == [None] * 5
+        celeb.reload()
+        assert celeb.featured_until == featured_until and celeb.version == version
+        payment = Payment.objects.get(ref=ref)
+        assert payment.status == 'paid' and payment.mpesa_receipt == 'RCPT123'
+        print("   ✓ Repeated callbacks did not extend the featured period")
+
+
+def test_failed_callback_without_metadata():
+    app = make_app()
+    with app.app_context():
+        ref, checkout_id = make_payment()
+        payment = process_callback({'CheckoutRequestID': checkout_id, 'ResultCode': 1032,
+                                    'ResultDesc': 'Request cancelled by user'})
+        assert payment.status == 'failed' and payment.result_code == 1032
+        # A late success for a cancelled payment must not resurrect it
+        assert process_callback(success_callback(checkout_id)) is None
+        assert Payment.objects.get(ref=ref).status == 'failed'
+        print("   ✓ Failure found by CheckoutRequestID and is final")
+
+
+def test_stale_payments_expire():
+    app = make_app()
+    with app.app_context():
+        slug = 'callback-expiry-artist'
+        if not Celebrity.objects(slug=slug).first():
+            Celebrity(name='Callback Expiry Artist', slug=slug, bio='Callback test').save()
+        # The push never reached Safaricom, so there is nothing to ask M-Pesa about
+        payment = Payment(ref=str(uuid.uuid4()), celebrity_slug=slug, phone='254700000000', amount=500,
+                          created_at=datetime.utcnow() - timedelta(hours=1))
+        payment.save()
+        Celebrity.objects(slug=slug).update_one(set__feature_status='pending', set__feature_payment_id=payment.ref)
+        assert expire_stale_payments(older_than_minutes=15) >= 1
+        assert Payment.objects.get(ref=payment.ref).status == 'expired'
+        assert Celebrity.objects.get(slug=slug).feature_status == 'failed'
+        print("   ✓ Unanswered payment expired and its celebrity released")
+
+        # A success reported after the timeout still counts: the customer was charged
+        late = success_callback('ws_CO_unknown', receipt='RCPTLATE')
+        late['CallbackMetadata']['Item'].append({'Name': 'AccountReference', 'Value': payment.ref})
+        assert process_callback(late) is not None
+        assert Payment.objects.get(ref=payment.ref).status == 'paid'
+        assert Celebrity.objects.get(slug=slug).featured
+        assert process_callback({'CheckoutRequestID': 'ws_CO_unknown', 'ResultCode': 1032,
+                                 'ResultDesc': 'Request cancelled by user'}) is None
+        print("   ✓ Late success settles an expired payment")
+
+
+class FakeResponse:
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self._data = data
+
+    def json(self):
+        return self._data
+
+    def raise_for_status(self):
+        pass
+
+
+def pending_payment(slug):
+    """An `initiated` payment whose celebrity waits on it, as /pay leaves them"""
+    if not Celebrity.objects(slug=slug).first():
+        Celebrity(name='Push Test Artist', slug=slug, bio='Push test').save()
+    payment = Payment(ref=str(uuid.uuid4()), celebrity_slug=slug, phone='254700000000', amount=500)
+    payment.save()
+    Celebrity.objects(slug=slug).update_one(set__feature_status='pending', set__feature_payment_id=payment.ref)
+    return payment
+
+
+def test_push_outcomes():
+    app = make_app()
+    refused = requests.ConnectionError(MaxRetryError(None, '/', NewConnectionError(None, 'Connection refused')))
+    outcomes = {
+        'timeout': (requests.ReadTimeout('read timed out'), 'initiated', 'pending'),
+        'gateway': (FakeResponse(502, {}), 'initiated', 'pending'),
+        'refused': (refused, 'failed', 'failed'),
+        'rejected': (FakeResponse(200, {'ResponseCode': '1', 'ResponseDescription': 'Rejected'}), 'failed', 'failed'),
+        'bad_phone': (FakeResponse(400, {'errorCode': '400.002.02', 'errorMessage': 'Invalid PhoneNumber'}), 'failed', 'failed'),
+    }
+    original = requests.Session.request
+    try:
+        with app.app_context():
+            token_provider.invalidate()
+            for name, (answer, status, feature_status) in outcomes.items():
+                def fake_request(self, method, url, *args, answer=answer, **kwargs):
+                    if method == 'GET':
+                        return FakeResponse(200, {'access_token': 'FAKE_TOKEN', 'expires_in': '3599'})
+                    if isinstance(answer, Exception):
+                        raise answer
+                    return answer
+                requests.Session.request = fake_request
+
+                slug = f'push-test-{name.replace("_", "-")}'
+                payment = pending_payment(slug)
+                push_stk(payment.ref)
+                assert Payment.objects.get(ref=payment.ref).status == status, name
+                assert Celebrity.objects.get(slug=slug).feature_status == feature_status, name
+        print("   ✓ Only a rejected or unsent push fails; unknown outcomes stay open")
+    finally:
+        requests.Session.request = original
+        with app.app_context():
+            token_provider.invalidate()
+
+
+def test_pay_ignores_client_ref():
+    app = make_app()
+    with app.app_context():
+        taken, _ = make_payment()
+        username = f"pay_{uuid.uuid4().hex[:8]}"
+        user = User(username=username, email=f"{username}@test.com")
+        user.set_password('secret123')
+        user.save()
+
+    original = routes.submit_push
+    routes.submit_push = lambda app, ref: True  # no STK push from a test
+    try:
+        client = app.test_client()
+        client.post('/user/login', data={'username': username, 'password': 'secret123'})
+        response = client.post('/pay', json={'phone': '254700000000', 'amount': 500, 'payment_ref': taken})
+        assert response.status_code == 202, response.data
+        assert response.get_json()['payment_ref'] != taken
+        print("   ✓ /pay always generates its own payment ref")
+    finally:
+        routes.submit_push = original
+        with app.app_context():
+            User.objects(username=username).delete()
+
+
+if __name__ == '__main__':
+    print("\n=== Payment Callback Tests ===\n")
+    test_duplicate_callbacks_are_noops()
+    test_failed_callback_without_metadata()
+    test_stale_payments_expire()
+    test_push_outcomes()
+    test_pay_ignores_client_ref()
+    print("\n✅ All payment callback tests passed!")
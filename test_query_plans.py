@@ -0,0 +1,45 @@
+"""Check that every query helper in routes.py is served by an index (no COLLSCAN)"""
+import inspect
+from app import create_app
+from app import routes
+from app.indexes import ensure_all_indexes, index_report, query_plans, explain_report, print_explain_report
+
+
+def test_every_query_helper_has_a_plan():
+    """New get_*/search_* helpers in routes.py must be added to app.indexes.query_plans()"""
+    app = create_app()
+    with app.app_context():
+        helpers = {
+            name for name, fn in inspect.getmembers(routes, inspect.isfunction)
+            if fn.__module__ == routes.__name__ and name.startswith(('get_', 'search_'))
+        }
+        missing = helpers - set(query_plans())
+        assert not missing, f"Query helpers without an explain plan: {sorted(missing)}"
+        print(f"   ✓ {len(helpers)} query helpers covered")
+
+
+def test_declared_indexes_exist():
+    app = create_app()
+    with app.app_context():
+        ensure_all_indexes()
+        for entry in index_report():
+            assert not entry['missing'], f"{entry['collection']} is missing {entry['missing']}"
+        print("   ✓ All declared indexes exist")
+
+
+def test_no_collection_scans():
+    app = create_app()
+    with app.app_context():
+        ensure_all_indexes()
+        report = explain_report()
+        print_explain_report(report)
+        scans = [entry['helper'] for entry in report if entry['collscan']]
+        assert not scans, f"Collection scans in: {scans}"
+
+
+if __name__ == '__main__':
+    print("\n=== Query Plan Tests ===\n")
+    test_every_query_helper_has_a_plan()
+    test_declared_indexes_exist()
+    test_no_collection_scans()
+    print("\n✅ All query plan tests passed!")
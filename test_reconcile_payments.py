@@ -0,0 +1,164 @@
+"""Test payment reconciliation against a local stand-in for the Daraja API"""
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app import create_app
+from app.models import Celebrity, Payment
+from app.mpesa import token_provider
+from app.payments import expire_stale_payments
+from app.reconcile import reconcile
+
+# CheckoutRequestID prefix -> how the stand-in answers the status query
+OUTCOMES = {
+    'ws_PAID_': (200, {'ResponseCode': '0', 'ResultCode': '0', 'ResultDesc': 'The service request is processed successfully.'}),
+    'ws_CANCEL_': (200, {'ResponseCode': '0', 'ResultCode': '1032', 'ResultDesc': 'Request cancelled by user'}),
+    'ws_WAIT_': (500, {'errorCode': '500.001.1001', 'errorMessage': 'The transaction is being processed'}),
+    'ws_BUSY_': (200, {'ResponseCode': '0', 'ResultCode': '4999', 'ResultDesc': 'The transaction is still under processing'}),
+}
+
+
+class FakeDaraja(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    queries = []
+    checked = []
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._reply(200, {'access_token': 'STAND_IN_TOKEN', 'expires_in': '3599'})
+
+    def do_POST(self):
+        cls = type(self)
+        with cls.lock:
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+            cls.queries.append(time.monotonic())
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        time.sleep(0.05)
+        with cls.lock:
+            cls.active -= 1
+        checkout_id = body.get('CheckoutRequestID', '')
+        cls.checked.append(checkout_id)
+        status, reply = next((v for k, v in OUTCOMES.items() if checkout_id.startswith(k)), (400, {}))
+        self._reply(status, reply)
+
+    def log_message(self, *args):
+        pass
+
+
+# Refs of the payments created here; only these are deleted afterwards
+created_refs = []
+
+
+def make_payment(slug, prefix, minutes_old=30):
+    payment = Payment(ref=str(uuid.uuid4()), celebrity_slug=slug, phone='254700000000', amount=500,
+                      status='pushed', checkout_request_id=prefix + uuid.uuid4().hex if prefix else None,
+                      created_at=datetime.utcnow() - timedelta(minutes=minutes_old))
+    payment.save()
+    created_refs.append(payment.ref)
+    Celebrity.objects(slug=slug).update_one(set__feature_status='pending', set__feature_payment_id=payment.ref)
+    return payment
+
+
+def delete_created_payments():
+    Payment.objects(ref__in=created_refs).delete()
+    created_refs.clear()
+
+
+def test_reconcile_against_stand_in():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeDaraja)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ['MPESA_BASE_URL'] = f'http://127.0.0.1:{server.server_port}'
+    app = create_app()
+    try:
+        with app.app_context():
+            token_provider.invalidate()
+            slug = 'reconcile-test-artist'
+            if not Celebrity.objects(slug=slug).first():
+                Celebrity(name='Reconcile Test Artist', slug=slug, bio='Reconcile test').save()
+
+            paid = make_payment(slug, 'ws_PAID_')
+            for _ in range(6):
+                make_payment(slug, 'ws_CANCEL_')
+            waiting = make_payment(slug, 'ws_WAIT_')
+            processing = make_payment(slug, 'ws_BUSY_')
+            never_pushed = make_payment(slug, None)
+            fresh = make_payment(slug, 'ws_PAID_', minutes_old=1)
+
+            summary = reconcile(older_than_minutes=5, batch_size=3, concurrency=3, rate=20)
+            print(f"   {dict(summary)}")
+            # Other open payments in the database may be counted too
+            assert summary['scanned'] >= 10
+            assert summary['paid'] >= 1 and summary['failed'] >= 6 and summary['expired'] >= 1 and summary['pending'] >= 2
+            assert Payment.objects(ref__in=created_refs, status='failed').count() == 6
+            assert Payment.objects.get(id=paid.id).status == 'paid'
+            assert Payment.objects.get(id=waiting.id).status == 'pushed'
+            assert Payment.objects.get(id=processing.id).status == 'pushed', "4999 means M-Pesa is still processing"
+            assert Payment.objects.get(id=never_pushed.id).status == 'expired'
+            assert Payment.objects.get(id=fresh.id).status == 'pushed', "Recent payments are left to their callback"
+            assert Celebrity.objects.get(slug=slug).featured
+            print("   ✓ Stale payments settled from the status API")
+
+            assert FakeDaraja.max_active <= 3, "Concurrency bound exceeded"
+            print(f"   ✓ At most {FakeDaraja.max_active} status queries in flight")
+
+            FakeDaraja.checked.clear()
+            reconcile(older_than_minutes=5, batch_size=3, concurrency=3, rate=20)
+            ours = {p.checkout_request_id for p in Payment.objects(ref__in=created_refs) if p.checkout_request_id}
+            assert sorted(c for c in FakeDaraja.checked if c in ours) == sorted([waiting.checkout_request_id, processing.checkout_request_id])
+            assert Payment.objects.get(id=waiting.id).status == 'pushed'
+            print("   ✓ Second run only re-checks the still pending payments")
+    finally:
+        with app.app_context():
+            token_provider.invalidate()
+            delete_created_payments()
+        del os.environ['MPESA_BASE_URL']
+        server.shutdown()
+
+
+def test_timeout_asks_mpesa_first():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeDaraja)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ['MPESA_BASE_URL'] = f'http://127.0.0.1:{server.server_port}'
+    app = create_app()
+    try:
+        with app.app_context():
+            token_provider.invalidate()
+            slug = 'reconcile-timeout-artist'
+            if not Celebrity.objects(slug=slug).first():
+                Celebrity(name='Reconcile Timeout Artist', slug=slug, bio='Reconcile test').save()
+
+            # Paid at M-Pesa, but the callback was lost
+            lost = make_payment(slug, 'ws_PAID_')
+            waiting = make_payment(slug, 'ws_WAIT_')
+            assert expire_stale_payments(older_than_minutes=15) >= 1
+            assert Payment.objects.get(id=lost.id).status == 'paid'
+            assert Payment.objects.get(id=waiting.id).status == 'pushed'
+            assert Celebrity.objects.get(slug=slug).featured
+            print("   ✓ Timed-out payments are checked with M-Pesa before expiring")
+    finally:
+        with app.app_context():
+            token_provider.invalidate()
+            delete_created_payments()
+        del os.environ['MPESA_BASE_URL']
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    print("\n=== Payment Reconciliation Tests ===\n")
+    test_reconcile_against_stand_in()
+    test_timeout_asks_mpesa_first()
+    print("\n✅ All reconciliation tests passed!")
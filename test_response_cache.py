@@ -0,0 +1,86 @@
+"""Test the server-side response cache through real routes"""
+import re
+import uuid
+from app import create_app
+from app.cache import CSRF_PLACEHOLDER
+from app.models import Celebrity
+from app.routes import save_object
+
+CSRF_RE = re.compile(rb'name="csrf_token" type="hidden" value="([^"]+)"')
+
+
+def make_app():
+    app = create_app()
+    app.config['TESTING'] = True
+    app.config['RESPONSE_CACHE_BACKEND'] = 'memory'
+    from app.cache import response_cache
+    response_cache.init_app(app)
+    return app
+
+
+def test_hit_miss_and_vary():
+    app = make_app()
+    client = app.test_client()
+    first = client.get('/about')
+    assert first.status_code == 200 and first.headers['X-Cache'] == 'MISS'
+    assert 'Cookie' in first.headers['Vary']
+    second = client.get('/about')
+    assert second.headers['X-Cache'] == 'HIT' and second.data == first.data
+    print("   ✓ Second request served from the cache, varying on Cookie")
+
+
+def test_csrf_token_is_per_session():
+    app = make_app()
+    first = app.test_client().get('/')
+    second = app.test_client().get('/')
+    assert second.headers['X-Cache'] == 'HIT'
+    tokens = CSRF_RE.findall(first.data), CSRF_RE.findall(second.data)
+    assert tokens[0] and tokens[1] and tokens[0][0] != tokens[1][0], "Each session needs its own CSRF token"
+    assert CSRF_PLACEHOLDER.encode() not in second.data
+    print("   ✓ Cached page carries the CSRF token of the session that reads it")
+
+
+def test_flashed_and_error_responses_not_cached():
+    app = make_app()
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_flashes'] = [('info', 'Welcome back')]
+    flashed = client.get('/privacy')
+    assert 'X-Cache' not in flashed.headers
+    assert client.get('/privacy').headers['X-Cache'] == 'MISS', "A page showing a flash must not be stored"
+
+    missing = f'/celebrity/missing-{uuid.uuid4().hex[:8]}'
+    assert client.get(missing).status_code == 404
+    assert client.get(missing).headers.get('X-Cache') != 'HIT'
+    print("   ✓ Pages with flash messages and non-200 responses are not stored")
+
+
+def test_invalidated_after_save():
+    app = make_app()
+    slug = f"cache-test-{uuid.uuid4().hex[:8]}"
+    with app.app_context():
+        Celebrity(name='Cache Test', slug=slug, bio='Original bio').save()
+    client = app.test_client()
+    try:
+        assert client.get(f'/celebrity/{slug}').headers['X-Cache'] == 'MISS'
+        assert client.get(f'/celebrity/{slug}').headers['X-Cache'] == 'HIT'
+
+        with app.app_context():
+            celeb = Celebrity.objects.get(slug=slug)
+            celeb.bio = 'Updated bio'
+            save_object(celeb)
+        response = client.get(f'/celebrity/{slug}')
+        assert response.headers['X-Cache'] == 'MISS' and b'Updated bio' in response.data
+        print("   ✓ Saving a celebrity drops its cached profile")
+    finally:
+        with app.app_context():
+            Celebrity.objects(slug=slug).delete()
+
+
+if __name__ == '__main__':
+    print("\n=== Response Cache Tests ===\n")
+    test_hit_miss_and_vary()
+    test_csrf_token_is_per_session()
+    test_flashed_and_error_responses_not_cached()
+    test_invalidated_after_save()
+    print("\n✅ All response cache tests passed!")
@@ -0,0 +1,70 @@
+"""Test the shared role check used by every admin route"""
+import os
+import uuid
+from app import create_app
+from app.models import User
+from app import roles
+
+
+def make_user(**fields):
+    username = f"role_{uuid.uuid4().hex[:8]}"
+    user = User(username=username, email=f"{username}@test.com", **fields)
+    user.set_password('secret123')
+    user.save()
+    return user
+
+
+def login(app, user):
+    client = app.test_client()
+    client.post('/admin/login', data={'username': user.username, 'password': 'secret123'})
+    return client
+
+
+def test_admin_routes_use_roles():
+    app = create_app()
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        by_role = make_user(roles=['admin'])
+        by_flag = make_user(is_admin=True)
+        plain = make_user()
+
+    assert login(app, by_role).get('/admin/').status_code == 200
+    assert login(app, by_flag).get('/admin/').status_code == 200
+    print("   ✓ Admin role and is_admin flag both grant access")
+
+    client = app.test_client()
+    client.post('/user/login', data={'username': plain.username, 'password': 'secret123'})
+    assert client.get('/admin/').status_code == 403
+    print("   ✓ Users without the role get 403")
+
+
+def test_allow_list_reload():
+    app = create_app()
+    old = os.environ.get('ADMIN_USERNAMES')
+    try:
+        with app.app_context():
+            user = make_user()
+            os.environ['ADMIN_USERNAMES'] = 'someone_else'
+            roles.load_allow_list()
+            assert isinstance(roles.admin_usernames(), frozenset)
+            assert not roles.has_role(user, roles.ADMIN_ROLE)
+
+            os.environ['ADMIN_USERNAMES'] = f'someone_else, {user.username}'
+            assert not roles.has_role(user, roles.ADMIN_ROLE), "Env is only read on load/reload"
+            roles.load_allow_list()
+            assert roles.has_role(user, roles.ADMIN_ROLE)
+            print("   ✓ Allow-list changes apply after reload")
+    finally:
+        if old is None:
+            os.environ.pop('ADMIN_USERNAMES', None)
+        else:
+            os.environ['ADMIN_USERNAMES'] = old
+        roles.load_allow_list()
+
+
+if __name__ == '__main__':
+    print("\n=== Role Tests ===\n")
+    test_admin_routes_use_roles()
+    test_allow_list_reload()
+    print("\n✅ All role tests passed!")
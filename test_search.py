@@ -0,0 +1,112 @@
+"""Test full-text celebrity search: ranking, prefixes, typos and index updates"""
+from datetime import datetime
+from app import create_app
+from app.models import Celebrity
+from app.search import search_index, search_celebrities, edit_distance
+
+SLUGS = ['search-sauti-sol', 'search-sol-generation', 'search-nyashinski']
+
+
+def make_celeb(slug, name, category, bio):
+    Celebrity.objects(slug=slug).delete()
+    celeb = Celebrity(name=name, slug=slug, category=category, bio=bio)
+    celeb.save()
+    return celeb
+
+
+def seed():
+    Celebrity.objects(slug__in=SLUGS).delete()
+    return [
+        make_celeb('search-sauti-sol', 'Sauti Sol', 'Afro-pop', 'Kenyan boy band formed in Nairobi'),
+        make_celeb('search-sol-generation', 'Sol Generation', 'Record label', 'Label founded by Sauti Sol'),
+        make_celeb('search-nyashinski', 'Nyáshinski', 'Hip hop', 'Rapper from Mombasa'),
+    ]
+
+
+def slugs_for(query):
+    ids = search_celebrities(query)
+    by_id = {c.id: c.slug for c in Celebrity.objects(id__in=ids)}
+    return [by_id[i] for i in ids if i in by_id]
+
+
+def test_edit_distance():
+    assert edit_distance('sauti', 'sauti', 2) == 0
+    assert edit_distance('sauty', 'sauti', 2) == 1
+    assert edit_distance('suati', 'sauti', 2) == 1, "Transposition is one edit"
+    assert edit_distance('kenya', 'nairobi', 2) == 3
+    print("   ✓ Edit distance with transpositions")
+
+
+def test_ranking_prefix_and_typos():
+    app = create_app()
+    with app.app_context():
+        seed()
+        search_index.load()
+
+        results = slugs_for('sauti sol')
+        assert results[:2] == ['search-sauti-sol', 'search-sol-generation'], results
+        print("   ✓ Name match ranks above a bio mention")
+
+        assert slugs_for('nyash')[0] == 'search-nyashinski'
+        assert slugs_for('nyashinski')[0] == 'search-nyashinski', "Accents are ignored"
+        print("   ✓ Prefix and accent-insensitive matches")
+
+        assert slugs_for('sauty sool')[0] == 'search-sauti-sol'
+        assert slugs_for('nyahsinski')[0] == 'search-nyashinski'
+        assert 'search-nyashinski' in slugs_for('hip hop')
+        print("   ✓ Misspelt names still find the celebrity")
+
+
+def test_index_follows_writes():
+    app = create_app()
+    with app.app_context():
+        celebs = seed()
+        search_index.load()
+
+        celeb = celebs[2]
+        celeb.name = 'Khaligraph Jones'
+        celeb.save()
+        assert 'search-nyashinski' in slugs_for('khaligraph')
+        assert 'search-nyashinski' not in slugs_for('nyashinski')
+        celeb.delete()
+        assert 'search-nyashinski' not in slugs_for('khaligraph')
+        print("   ✓ Saves and deletes update the index at once")
+
+        # A write made by another worker only reaches this one through sync()
+        Celebrity._get_collection().update_one(
+            {'_id': celebs[0].id}, {'$set': {'bio': 'Benga revival', 'updated_at': datetime.utcnow()}}
+        )
+        Celebrity._get_collection().delete_one({'_id': celebs[1].id})
+        assert search_index.sync() >= 2
+        assert 'search-sauti-sol' in slugs_for('benga')
+        assert 'search-sol-generation' not in slugs_for('sol generation')
+        print("   ✓ Sync picks up writes from other workers")
+
+
+def test_search_page():
+    app = create_app()
+    client = app.test_client()
+    with app.app_context():
+        seed()
+        search_index.load()
+
+    response = client.get('/search?q=sauti+sool')
+    assert response.status_code == 200
+    assert b'Sauti Sol' in response.data
+
+    response = client.get('/search?q=sauti&per_page=1')
+    assert b'Next' in response.data and b'after=1' in response.data
+    response = client.get('/search?q=sauti&per_page=1&after=1')
+    assert b'Previous' in response.data
+
+    assert client.get('/search').status_code == 200
+    print("   ✓ /search renders ranked, paginated results")
+
+
+if __name__ == '__main__':
+    print("\n=== Search Tests ===\n")
+    test_edit_distance()
+    test_ranking_prefix_and_typos()
+    test_index_follows_writes()
+    test_search_page()
+    print("\n✅ All search tests passed!")
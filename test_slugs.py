@@ -0,0 +1,58 @@
+"""Test slug allocation: per-base counters, seeding, collision retries and bulk mode"""
+from app import create_app
+from app.models import Celebrity
+from app.slugs import allocate, allocate_many, save_with_unique_slug, _counters
+
+
+def reset(base):
+    Celebrity.objects(slug__startswith=base).delete()
+    _counters().delete_one({'_id': base})
+
+
+def test_allocate_sequence_and_seed():
+    app = create_app()
+    with app.app_context():
+        reset('slugtest-john')
+        assert allocate('Slugtest John') == 'slugtest-john'
+        assert allocate('Slugtest  JOHN!') == 'slugtest-john-2'
+        print("   ✓ Suffixes come from the per-base counter")
+
+        # Slugs created before the counter existed are skipped over
+        reset('slugtest-mary')
+        Celebrity(name='Slugtest Mary', slug='slugtest-mary').save()
+        Celebrity(name='Slugtest Mary', slug='slugtest-mary-4').save()
+        assert allocate('Slugtest Mary') == 'slugtest-mary-5'
+        print("   ✓ New counter seeded from the highest existing suffix")
+
+
+def test_save_retries_on_collision():
+    app = create_app()
+    with app.app_context():
+        reset('slugtest-ann')
+        allocate('Slugtest Ann')
+        # Taken behind the counter's back (e.g. typed in by an admin)
+        Celebrity(name='Other', slug='slugtest-ann-2').save()
+        celeb = Celebrity(name='Slugtest Ann')
+        save_with_unique_slug(celeb, celeb.name)
+        assert celeb.slug == 'slugtest-ann-3'
+        assert Celebrity.objects(slug='slugtest-ann-3').count() == 1
+        print("   ✓ Collision with an existing slug allocates the next one")
+
+
+def test_allocate_many():
+    app = create_app()
+    with app.app_context():
+        reset('slugtest-kim')
+        reset('slugtest-joe')
+        slugs = allocate_many(['Slugtest Kim', 'Slugtest Joe', 'Slugtest Kim', 'Slugtest Kim'])
+        assert slugs == ['slugtest-kim', 'slugtest-joe', 'slugtest-kim-2', 'slugtest-kim-3']
+        assert allocate('Slugtest Kim') == 'slugtest-kim-4'
+        print("   ✓ Bulk allocation reserves one range per base")
+
+
+if __name__ == '__main__':
+    print("\n=== Slug Tests ===\n")
+    test_allocate_sequence_and_seed()
+    test_save_retries_on_collision()
+    test_allocate_many()
+    print("\n✅ All slug tests passed!")
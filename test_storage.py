@@ -0,0 +1,73 @@
+"""Test reference-counted photo storage shared between a submission and a celebrity"""
+import io
+import os
+import tempfile
+import uuid
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+from app import create_app
+from app.images import rendition_files
+from app.models import Celebrity, CelebritySubmission, StoredPhoto
+from app.moderation import approve_submissions
+from app.storage import store_photo, release_photo
+
+
+def unique_upload():
+    # Random pixels give content, and so a photo name, that no real upload shares
+    data = io.BytesIO()
+    Image.frombytes('RGB', (8, 8), uuid.uuid4().bytes * 12).save(data, 'PNG')
+    data.seek(0)
+    return FileStorage(stream=data, filename='photo.png')
+
+
+def refs(photo):
+    stored = StoredPhoto.objects(id=photo).first()
+    return stored and stored.refs
+
+
+def files_exist(folder, photo):
+    return all(os.path.exists(os.path.join(folder, name)) for name in rendition_files(photo))
+
+
+def test_shared_photo_survives_until_last_release():
+    app = create_app()
+    name = f"Storage Test {uuid.uuid4().hex[:8]}"
+    with tempfile.TemporaryDirectory() as folder, app.app_context():
+        app.config['UPLOAD_FOLDER'] = folder
+        photo = None
+        try:
+            upload = unique_upload()
+            photo = store_photo(upload, folder)
+            assert refs(photo) == 1 and files_exist(folder, photo)
+            assert store_photo(upload, folder) == photo and refs(photo) == 2
+            release_photo(photo, folder)
+            print("   ✓ Identical uploads share one stored photo")
+
+            sub = CelebritySubmission(name=name, email='storage@test.com', phone='0700000000',
+                                      bio='Storage test', photo_filename=photo)
+            sub.save()
+            report = approve_submissions([sub.id])
+            assert len(report['approved']) == 1
+            celeb = Celebrity.objects.get(slug=report['approved'][0][1])
+            assert celeb.photo_filename == photo and refs(photo) == 2
+            print("   ✓ Approval takes a second reference for the celebrity")
+
+            release_photo(photo, folder)  # the submission lets go
+            assert refs(photo) == 1 and files_exist(folder, photo)
+            print("   ✓ Files survive while the celebrity still uses them")
+
+            assert release_photo(photo, folder) == 0
+            assert refs(photo) is None
+            assert not any(os.path.exists(os.path.join(folder, f)) for f in rendition_files(photo))
+            print("   ✓ Last release deletes the files and the reference count")
+        finally:
+            CelebritySubmission.objects(name=name).delete()
+            Celebrity.objects(name=name).delete()
+            if photo:
+                StoredPhoto.objects(id=photo).delete()
+
+
+if __name__ == '__main__':
+    print("\n=== Photo Storage Tests ===\n")
+    test_shared_photo_survives_until_last_release()
+    print("\n✅ All photo storage tests passed!")
@@ -0,0 +1,57 @@
+"""Test that the user_loader serves logged-in users from its cache"""
+import uuid
+from app import create_app
+from app.models import User
+from app.auth import load_user_document, user_cache_metrics, clear_user_cache
+
+
+def make_user():
+    username = f"cache_{uuid.uuid4().hex[:8]}"
+    user = User(username=username, email=f"{username}@test.com")
+    user.set_password('secret123')
+    user.save()
+    return user
+
+
+def test_authenticated_requests_skip_database():
+    app = create_app()
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        user = make_user()
+        clear_user_cache()
+
+    client = app.test_client()
+    client.post('/user/login', data={'username': user.username, 'password': 'secret123'})
+    before = user_cache_metrics()['db_loads']
+    for _ in range(10):
+        assert client.get('/user/dashboard').status_code in (200, 302)
+    loads = user_cache_metrics()['db_loads'] - before
+    assert loads <= 1, f"Expected at most one user lookup for 10 requests, got {loads}"
+    print(f"   ✓ 10 authenticated requests, {loads} user lookup(s)")
+
+
+def test_projection_and_invalidation():
+    app = create_app()
+    with app.app_context():
+        user = make_user()
+        loaded = load_user_document(str(user.id))
+        assert loaded.username == user.username
+        assert loaded.password_hash is None, "password_hash must not be loaded per request"
+        print("   ✓ password_hash excluded")
+
+        user.full_name = 'Renamed In Cache Test'
+        user.save()
+        assert load_user_document(str(user.id)).full_name == 'Renamed In Cache Test'
+        print("   ✓ Saving a user drops its cache entry")
+
+        loaded.full_name = 'Changed by one request'
+        assert load_user_document(str(user.id)).full_name == 'Renamed In Cache Test'
+        print("   ✓ Requests get their own User instance")
+
+
+if __name__ == '__main__':
+    print("\n=== User Loader Cache Tests ===\n")
+    test_authenticated_requests_skip_database()
+    test_projection_and_invalidation()
+    print("\n✅ All user loader cache tests passed!")